@@ -0,0 +1,71 @@
+import hashlib
+
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from users.backends import AUTH_USER_CACHE_TIMEOUT, get_cached_user
+
+TOKEN_KEY = "auth:token:{}"
+
+
+def token_cache_key(key):
+    # сам токен в ключ кеша не попадает
+    return TOKEN_KEY.format(hashlib.sha256(key.encode()).hexdigest())
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication без запроса к authtoken_token на каждый вызов:
+    владелец токена и дата создания берутся из кеша. Запись сбрасывается
+    при удалении (отзыве) токена.
+    """
+
+    def authenticate_credentials(self, key):
+        model = self.get_model()
+        cached = cache.get(token_cache_key(key))
+        if cached is None:
+            cached = (
+                model.objects.filter(key=key)
+                .values_list("user_id", "created")
+                .first()
+            )
+            if cached is None:
+                raise exceptions.AuthenticationFailed(_("Invalid token."))
+            cache.set(token_cache_key(key), cached, AUTH_USER_CACHE_TIMEOUT)
+        user_id, created = cached
+        user = get_cached_user(user_id)
+        if user is None or not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _("User inactive or deleted.")
+            )
+        return user, model(key=key, user=user, created=created)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication, который берёт пользователя из того же кеша,
+    что и сессии.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(
+                _("Token contained no recognizable user identification")
+            )
+        user = get_cached_user(user_id)
+        if user is None:
+            raise exceptions.AuthenticationFailed(
+                _("User not found"), code="user_not_found"
+            )
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _("User is inactive"), code="user_inactive"
+            )
+        return user
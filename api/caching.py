@@ -0,0 +1,60 @@
+import hashlib
+import uuid
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+from rest_framework.response import Response
+
+VERSION_KEY = "api:anonymous:version"
+RESPONSE_KEY = "api:anonymous:{}:{}"
+
+ANONYMOUS_CACHE_TIMEOUT = getattr(
+    settings, "API_ANONYMOUS_CACHE_TIMEOUT", 60 * 5
+)
+
+
+def _version():
+    return cache.get_or_set(VERSION_KEY, lambda: uuid.uuid4().hex, None)
+
+
+def invalidate_anonymous_responses():
+    cache.delete(VERSION_KEY)
+
+
+def request_key(request):
+    # ?group=1&page=2 и ?page=2&group=1 дают один и тот же ключ
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    digest = hashlib.md5(f"{request.path}?{query}".encode()).hexdigest()
+    return RESPONSE_KEY.format(_version(), digest)
+
+
+class AnonymousListCacheMixin:
+    """
+    Кеширует ответы list для неавторизованных клиентов: они одинаковы для
+    всех анонимов. Кеш сбрасывается при изменении постов, комментариев и
+    групп; авторизованные запросы всегда выполняются заново.
+    """
+
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+        key = request_key(request)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, ANONYMOUS_CACHE_TIMEOUT)
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        if self.action == "list":
+            # промежуточные кеши не должны отдавать анонимный ответ
+            # клиенту с токеном или сессией
+            patch_vary_headers(response, ("Authorization", "Cookie"))
+        return response
@@ -1,7 +1,16 @@
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
-from posts.models import Post, Comment, Group, Follow, User
+from posts.models import (
+    ArchivedComment,
+    ArchivedPost,
+    Comment,
+    Follow,
+    Group,
+    Post,
+    Recommendation,
+    User,
+)
 
 
 class PostSerializer(serializers.ModelSerializer):
@@ -24,6 +33,19 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+class ArchivedPostSerializer(PostSerializer):
+    # используется только для чтения: архив через API не меняется
+    class Meta:
+        model = ArchivedPost
+        fields = "__all__"
+
+
+class ArchivedCommentSerializer(CommentSerializer):
+    class Meta:
+        model = ArchivedComment
+        fields = "__all__"
+
+
 class GroupSerializer(serializers.ModelSerializer):
     class Meta:
         model = Group
@@ -48,3 +70,17 @@ class FollowSerializer(serializers.ModelSerializer):
                 queryset=Follow.objects.all(), fields=("user", "following")
             )
         ]
+
+
+class ProfileUserSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ("id", "username", "first_name", "last_name")
+
+
+class RecommendationSerializer(serializers.ModelSerializer):
+    author = ProfileUserSerializer(read_only=True)
+
+    class Meta:
+        model = Recommendation
+        fields = ("author", "score", "via_follows", "shared_groups")
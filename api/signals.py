@@ -0,0 +1,27 @@
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from posts.models import Comment, Group, Post
+from posts.signals import data_imported, posts_removed
+
+from .authentication import token_cache_key
+from .caching import invalidate_anonymous_responses
+
+
+@receiver(post_delete, sender=Token)
+def forget_revoked_token(sender, instance, **kwargs):
+    cache.delete(token_cache_key(instance.key))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(data_imported)
+@receiver(posts_removed)
+def invalidate_api_cache(sender, **kwargs):
+    invalidate_anonymous_responses()
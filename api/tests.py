@@ -0,0 +1,99 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.profiles import build_profile
+
+
+class TestAnonymousListCache(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="api_user", password="1")
+        self.group = Group.objects.create(
+            title="group", slug="group", description="group"
+        )
+        Post.objects.create(author=self.user, text="first", group=self.group)
+        self.url = "/api/v1/posts/"
+
+    def test_anonymous_list_cached(self):
+        """ Повторный анонимный запрос отдаётся из кеша без запросов к базе """
+        response = self.client.get(self.url, {"group": self.group.pk})
+        self.assertContains(response, "first")
+        self.assertIn("Authorization", response["Vary"])
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {"group": self.group.pk})
+        self.assertContains(response, "first")
+
+    def test_cache_invalidated_on_new_post(self):
+        """ Новый пост сразу виден анонимному клиенту """
+        self.client.get(self.url)
+        Post.objects.create(author=self.user, text="second")
+        self.assertContains(self.client.get(self.url), "second")
+
+    def test_authorized_not_served_from_cache(self):
+        """ Запрос с токеном не использует анонимный кеш """
+        self.client.get(self.url)
+        token = Token.objects.create(user=self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                self.url, HTTP_AUTHORIZATION=f"Token {token.key}"
+            )
+        self.assertContains(response, "first")
+        self.assertTrue(
+            any("posts_post" in query["sql"] for query in queries)
+        )
+
+
+class TestProfileBundle(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="author", password="1")
+        self.reader = User.objects.create_user(username="reader", password="1")
+        Follow.objects.create(user=self.reader, author=self.author)
+        for number in range(5):
+            post = Post.objects.create(
+                author=self.author, text=f"post {number}"
+            )
+        Comment.objects.create(post=post, author=self.reader, text="comment")
+        self.url = "/api/v1/profile/author/"
+
+    def test_bundle_matches_profile_page(self):
+        """ Эндпоинт отдаёт те же данные, что и HTML-страница профиля """
+        token = Token.objects.create(user=self.reader)
+        data = self.client.get(
+            self.url,
+            {"include": "comments"},
+            HTTP_AUTHORIZATION=f"Token {token.key}",
+        ).json()
+        self.client.force_login(self.reader)
+        context = self.client.get("/author/").context
+        self.assertEqual(data["posts_count"], context["count"])
+        self.assertEqual(data["followers_count"], 1)
+        self.assertEqual(data["following_count"], 0)
+        self.assertTrue(data["is_following"])
+        self.assertEqual(data["num_pages"], 2)
+        self.assertEqual(data["posts"][0]["comments"][0]["text"], "comment")
+
+    def test_comments_limited_in_query(self):
+        """ Из базы читаются только последние комментарии каждого поста """
+        post = Post.objects.filter(author=self.author).first()
+        for number in range(5):
+            Comment.objects.create(
+                post=post, author=self.reader, text=f"later {number}"
+            )
+        profile = build_profile(self.author, comments=3)
+        first = profile["page"][0]
+        self.assertEqual(
+            [comment.text for comment in first.comments.all()],
+            ["later 4", "later 3", "later 2"],
+        )
+        self.assertEqual(len(first._prefetched_objects_cache["comments"]), 3)
+
+    def test_fixed_number_of_queries(self):
+        """ Число запросов не зависит от числа постов и комментариев """
+        self.client.get(self.url)
+        with self.assertNumQueries(3):
+            self.client.get(self.url, {"include": "comments"})
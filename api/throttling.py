@@ -0,0 +1,79 @@
+from rest_framework.throttling import BaseThrottle
+
+from posts.throttling import get_counter, hashed
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Базовый класс: счётчик скользящего окна в кеше "throttle" с лимитом
+    из THROTTLE_RATES[scope]. Наследники определяют, кого считать.
+    """
+
+    scope = None
+
+    def get_cache_ident(self, request, view):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        ident = self.get_cache_ident(request, view)
+        if ident is None:
+            return True
+        self.wait_time = get_counter(self.scope).hit(ident)
+        return self.wait_time is None
+
+    def wait(self):
+        return self.wait_time
+
+
+class UserThrottle(SlidingWindowThrottle):
+    scope = "user"
+
+    def get_cache_ident(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return None
+
+
+class TokenThrottle(SlidingWindowThrottle):
+    """
+    Отдельный лимит на каждый токен (authtoken или JWT), чтобы один
+    утёкший токен не расходовал лимит всех сессий пользователя.
+    """
+
+    scope = "token"
+
+    def get_cache_ident(self, request, view):
+        if request.auth is None:
+            return None
+        return hashed(getattr(request.auth, "key", None) or str(request.auth))
+
+
+class IPThrottle(SlidingWindowThrottle):
+    scope = "ip"
+
+    def get_cache_ident(self, request, view):
+        return self.get_ident(request)
+
+
+class LoginThrottle(IPThrottle):
+    """
+    Строгий лимит для выдачи токенов: подбор паролей идёт с одного адреса.
+    """
+
+    scope = "login"
+
+
+class WriteThrottle(SlidingWindowThrottle):
+    """
+    Лимит на создание объектов (например POST /api/v1/posts/) для
+    пользователя или, если он не вошёл, для IP.
+    """
+
+    scope = "write"
+
+    def get_cache_ident(self, request, view):
+        if request.method in ("GET", "HEAD", "OPTIONS"):
+            return None
+        if request.user and request.user.is_authenticated:
+            return f"user:{request.user.pk}"
+        return f"ip:{self.get_ident(request)}"
@@ -6,7 +6,16 @@ from rest_framework_simplejwt.views import (
     TokenRefreshView,
 )
 
-from .views import PostViewSet, CommentViewSet, FollowViewSet, GroupViewSet
+from .throttling import LoginThrottle
+from .views import (
+    PostViewSet,
+    CommentViewSet,
+    FollowViewSet,
+    GroupViewSet,
+    ProfileBundleView,
+    RecommendationsView,
+    TrendingView,
+)
 
 v1_router = DefaultRouter()
 v1_router.register("posts", PostViewSet, basename="posts")
@@ -18,9 +27,29 @@ v1_router.register("group", GroupViewSet, basename="group")
 
 urlpatterns = [
     path("v1/", include(v1_router.urls),),
-    path("v1/api-token-auth/", views.obtain_auth_token),
-    path("v1/token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
     path(
-        "v1/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"
+        "v1/profile/<str:username>/",
+        ProfileBundleView.as_view(),
+        name="profile_bundle",
+    ),
+    path("v1/trending/", TrendingView.as_view(), name="trending_api"),
+    path(
+        "v1/recommendations/",
+        RecommendationsView.as_view(),
+        name="recommendations",
+    ),
+    path(
+        "v1/api-token-auth/",
+        views.ObtainAuthToken.as_view(throttle_classes=[LoginThrottle]),
+    ),
+    path(
+        "v1/token/",
+        TokenObtainPairView.as_view(throttle_classes=[LoginThrottle]),
+        name="token_obtain_pair",
+    ),
+    path(
+        "v1/token/refresh/",
+        TokenRefreshView.as_view(throttle_classes=[LoginThrottle]),
+        name="token_refresh",
     ),
 ]
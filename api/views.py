@@ -1,21 +1,43 @@
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.permissions import (
+    AllowAny,
+    IsAuthenticated,
+    IsAuthenticatedOrReadOnly,
+)
 from rest_framework import viewsets, generics
 from rest_framework import filters
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import ViewSetMixin
 
+from api.caching import AnonymousListCacheMixin
 from api.serializers import (
+    ArchivedCommentSerializer,
+    ArchivedPostSerializer,
     PostSerializer,
     CommentSerializer,
     GroupSerializer,
     FollowSerializer,
+    ProfileUserSerializer,
+    RecommendationSerializer,
 )
 from api.permissions import IsOwnerOrReadOnly, IsAuthenticatedGetPost
-from posts.models import Post, Group, Follow
+from posts.activity import (
+    record_view,
+    trending_groups,
+    trending_posts,
+    view_count,
+)
+from posts.deletion import schedule_post_deletion
+from posts.models import ArchivedPost, Post, Group, Follow
+from posts.profiles import build_profile
+from posts.recommendations import recommendations_for
+from posts.usernames import get_author_or_404
 
 
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(AnonymousListCacheMixin, viewsets.ModelViewSet):
     """
     Выводим все посты. Делаем проверку на аутентификацию.
     Используем класс ModelViewSet, чтобы получить полный набор
@@ -36,8 +58,23 @@ class PostViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def perform_destroy(self, instance):
+        schedule_post_deletion([instance.pk])
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            post = self.get_object()
+        except Http404:
+            # старые посты переехали в архив и доступны только для чтения
+            post = get_object_or_404(ArchivedPost, pk=kwargs["pk"])
+            return Response(ArchivedPostSerializer(post).data)
+        record_view(post)
+        data = self.get_serializer(post).data
+        data["views"] = view_count(post)
+        return Response(data)
 
-class CommentViewSet(viewsets.ModelViewSet):
+
+class CommentViewSet(AnonymousListCacheMixin, viewsets.ModelViewSet):
     """
     Выводим комментарий поста по ключу. Делаем проверку на аутентификацию.
     Используем класс ModelViewSet, чтобы получить полный набор операций
@@ -76,7 +113,9 @@ class FollowViewSet(ViewSetMixin, generics.ListCreateAPIView):
         serializer.save(user=self.request.user)
 
 
-class GroupViewSet(ViewSetMixin, generics.ListCreateAPIView):
+class GroupViewSet(
+    AnonymousListCacheMixin, ViewSetMixin, generics.ListCreateAPIView
+):
     """
     Выводим все группы. Делаем проверку на аутентификацию.
     Используем класс ListCreateAPIView для
@@ -86,3 +125,85 @@ class GroupViewSet(ViewSetMixin, generics.ListCreateAPIView):
     queryset = Group.objects.all()
     serializer_class = GroupSerializer
     permission_classes = (IsAuthenticatedGetPost,)
+
+
+class ProfileBundleView(APIView):
+    """
+    Всё, что нужно экрану профиля, одним запросом: автор, число постов,
+    подписчиков и подписок, подписан ли на него текущий пользователь и
+    первая (или ?page=N) страница постов. С ?include=comments к каждому
+    посту добавляются последние комментарии.
+    """
+
+    permission_classes = (AllowAny,)
+    comments_preview = 3
+
+    def get(self, request, username):
+        author = get_author_or_404(username)
+        include = request.query_params.get("include", "").split(",")
+        with_comments = "comments" in include
+        profile = build_profile(
+            author,
+            request.user,
+            request.query_params.get("page"),
+            comments=self.comments_preview if with_comments else 0,
+        )
+        page = profile["page"]
+        posts = list(page)
+        serialized = []
+        for post in posts:
+            if isinstance(post, ArchivedPost):
+                serializers = ArchivedPostSerializer, ArchivedCommentSerializer
+            else:
+                serializers = PostSerializer, CommentSerializer
+            item = serializers[0](post).data
+            if with_comments:
+                item["comments"] = serializers[1](
+                    post.comments.all(), many=True
+                ).data
+            serialized.append(item)
+        return Response(
+            {
+                "user": ProfileUserSerializer(author).data,
+                "posts_count": profile["posts_count"],
+                "followers_count": profile["followers_count"],
+                "following_count": profile["following_count"],
+                "is_following": profile["is_following"],
+                "page": page.number,
+                "num_pages": profile["paginator"].num_pages,
+                "posts": serialized,
+            }
+        )
+
+
+class TrendingView(APIView):
+    """
+    Популярные посты и группы из рейтинга, который раз в несколько минут
+    пересчитывает задача refresh_trending.
+    """
+
+    permission_classes = (AllowAny,)
+
+    def get(self, request):
+        return Response(
+            {
+                "posts": PostSerializer(trending_posts(), many=True).data,
+                "groups": GroupSerializer(trending_groups(), many=True).data,
+            }
+        )
+
+
+class RecommendationsView(APIView):
+    """
+    «Кого почитать» для текущего пользователя: заранее посчитанные
+    рекомендации, одним запросом по индексу.
+    """
+
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        return Response(
+            RecommendationSerializer(
+                recommendations_for(request.user), many=True
+            ).data
+        )
@@ -0,0 +1,63 @@
+# Настройки gunicorn: gunicorn yatube.wsgi (файл подхватывается сам).
+#
+# Приложение загружается и прогревается в главном процессе до fork
+# (preload_app), поэтому воркеры стартуют уже с импортированным Django,
+# разобранными URL и скомпилированными шаблонами и делят эту память
+# с главным процессом, пока её не изменят.
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(
+    os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1)
+)
+threads = int(os.environ.get("GUNICORN_THREADS", 1))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 30))
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 2000))
+max_requests_jitter = max_requests // 10
+preload_app = True
+wsgi_app = "yatube.wsgi:application"
+
+
+def close_db_pools():
+    from django.conf import settings
+
+    if any(
+        config["ENGINE"] == "yatube.db_pool"
+        for config in settings.DATABASES.values()
+    ):
+        from yatube.db_pool.base import close_pools
+
+        close_pools()
+
+
+def when_ready(server):
+    from yatube.wsgi import warmup_report
+    from yatube.warmup import format_report
+
+    server.log.info("Прогрев приложения:\n%s", format_report(warmup_report))
+    # соединения пула, открытые при прогреве, воркерам не передаются
+    close_db_pools()
+    # всё, что создано при загрузке, живёт до конца процесса: убираем его
+    # из-под сборщика мусора, иначе обход поколений в воркере трогает эти
+    # объекты и копирует страницы памяти главного процесса
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # соединения и клиенты кеша главного процесса воркеру не годятся
+    from django.core.cache import caches
+    from django.db import connections
+
+    connections.close_all()
+    for cache in caches.all():
+        cache.close()
+
+
+def worker_exit(server, worker):
+    # несохранённые просмотры и счётчики активности не должны пропасть
+    # при плановом перезапуске воркера (max_requests, HUP)
+    from posts.activity import flush_all
+
+    flush_all()
@@ -0,0 +1,290 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import (
+    Case,
+    F,
+    PositiveIntegerField,
+    Q,
+    Value,
+    When,
+)
+from django.utils import timezone
+
+from tasks.queue import task
+
+from .models import ActivityCounter, Group, Post, TrendingEntry
+
+logger = logging.getLogger(__name__)
+
+CONFIG = getattr(settings, "TRENDING", {})
+FLUSH_SIZE = CONFIG.get("FLUSH_SIZE", 500)
+FLUSH_INTERVAL = CONFIG.get("FLUSH_INTERVAL", 30)
+WINDOW_HOURS = CONFIG.get("WINDOW_HOURS", 48)
+HALF_LIFE_HOURS = CONFIG.get("HALF_LIFE_HOURS", 6)
+WEIGHTS = CONFIG.get(
+    "WEIGHTS", {ActivityCounter.VIEW: 1, ActivityCounter.COMMENT: 5}
+)
+SIZE = CONFIG.get("SIZE", 50)
+REFRESH = CONFIG.get("REFRESH", 60 * 10)
+
+
+class CounterBuffer:
+    """
+    Копит приращения счётчиков в памяти процесса и передаёт их функции
+    save пачками не больше max_size ключей: когда набралось max_size
+    разных ключей или с прошлого сброса прошло interval секунд. Если
+    сохранить не удалось, несохранённые приращения возвращаются в буфер
+    до следующей попытки.
+
+    После start() буфер сбрасывает фоновый поток (даже если новых
+    приращений нет) и выход из процесса, так что при аварийной остановке
+    теряется не больше чем за interval секунд. Запрос, заполнивший буфер,
+    только будит поток и не ждёт записи в базу; без фонового потока
+    сбрасывает тот, кто добавил приращение.
+    """
+
+    def __init__(self, save, max_size=FLUSH_SIZE, interval=FLUSH_INTERVAL):
+        self.save = save
+        self.max_size = max_size
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        self.flushed_at = time.monotonic()
+        self.background = False
+        self.wake = threading.Event()
+        # процесс, в котором работает фоновый поток; после fork поток
+        # в дочернем процессе не существует и запускается заново
+        self.pid = None
+
+    def add(self, key, amount=1):
+        if self.background and self.pid != os.getpid():
+            self.start()
+        with self.lock:
+            self.counts[key] += amount
+            due = (
+                len(self.counts) >= self.max_size
+                or time.monotonic() - self.flushed_at >= self.interval
+            )
+        if not due:
+            return
+        if self.background:
+            self.wake.set()
+        else:
+            self.flush()
+
+    def pending(self, key):
+        # ещё не сохранённые приращения этого процесса
+        with self.lock:
+            return self.counts.get(key, 0)
+
+    def flush(self):
+        with self.lock:
+            counts, self.counts = self.counts, Counter()
+            self.flushed_at = time.monotonic()
+        keys = list(counts)
+        for start in range(0, len(keys), self.max_size):
+            batch = keys[start : start + self.max_size]
+            try:
+                self.save({key: counts[key] for key in batch})
+            except Exception:
+                logger.exception(
+                    "Не удалось сохранить %d счётчиков", len(keys) - start
+                )
+                with self.lock:
+                    for key in keys[start:]:
+                        self.counts[key] += counts[key]
+                return start
+        return len(keys)
+
+    def enable(self):
+        """
+        Включает фоновый сброс, не запуская поток: он стартует при первом
+        приращении в процессе. Так поток не работает в главном процессе
+        gunicorn (preload_app) и воркер не наследует захваченный им lock.
+        """
+        self.background = True
+
+    def start(self):
+        with self.lock:
+            if self.pid == os.getpid():
+                return
+            self.background, self.pid = True, os.getpid()
+        threading.Thread(
+            target=self.run, name="counter-buffer", daemon=True
+        ).start()
+        atexit.register(self.flush)
+
+    def run(self):
+        while True:
+            woken = self.wake.wait(self.interval)
+            self.wake.clear()
+            if woken or self.flushed_at + self.interval <= time.monotonic():
+                if self.flush():
+                    # у потока своё соединение; между сбросами оно не нужно
+                    connections.close_all()
+
+
+def save_activity(counts):
+    """
+    Прибавляет накопленное к почасовым счётчикам: недостающие строки
+    создаются одним INSERT, затем все увеличиваются одним UPDATE с CASE,
+    как в save_views. Ключи идут в одном порядке во всех процессах, чтобы
+    параллельные сбросы не блокировали друг друга.
+    """
+    keys = sorted(counts, key=lambda key: (key[0], key[2], key[3]))
+    with transaction.atomic():
+        ActivityCounter.objects.bulk_create(
+            [
+                ActivityCounter(
+                    post_id=post_id, group_id=group_id, kind=kind, hour=hour
+                )
+                for post_id, group_id, kind, hour in keys
+            ],
+            ignore_conflicts=True,
+        )
+        rows = []
+        for key in keys:
+            post_id, _, kind, hour = key
+            rows.append(Q(post_id=post_id, kind=kind, hour=hour))
+        ActivityCounter.objects.filter(reduce(or_, rows)).update(
+            count=F("count")
+            + Case(
+                *[
+                    When(row, then=Value(counts[key]))
+                    for row, key in zip(rows, keys)
+                ],
+                output_field=PositiveIntegerField(),
+            )
+        )
+
+
+def save_views(counts):
+    # один UPDATE на пачку: views = views + CASE id WHEN ... END
+    post_ids = sorted(counts)
+    Post.all_objects.filter(pk__in=post_ids).update(
+        views=F("views")
+        + Case(
+            *[When(pk=pk, then=Value(counts[pk])) for pk in post_ids],
+            output_field=PositiveIntegerField(),
+        )
+    )
+
+
+activity_buffer = CounterBuffer(save_activity)
+view_buffer = CounterBuffer(save_views)
+BUFFERS = (activity_buffer, view_buffer)
+
+
+def start_flushers():
+    """
+    Включает фоновый сброс буферов. Вызывается при загрузке
+    WSGI-приложения; потоки запускаются в каждом воркере при первом
+    приращении.
+    """
+    for buffer in BUFFERS:
+        buffer.enable()
+
+
+def flush_all():
+    for buffer in BUFFERS:
+        buffer.flush()
+
+
+def record_activity(post, kind):
+    hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+    activity_buffer.add((post.pk, post.group_id, kind, hour))
+
+
+def record_view(post):
+    record_activity(post, ActivityCounter.VIEW)
+    view_buffer.add(post.pk)
+
+
+def view_count(post):
+    # сохранённые просмотры плюс ещё не сброшенные в этом процессе
+    return post.views + view_buffer.pending(post.pk)
+
+
+def compute_scores(now):
+    """
+    Оценка поста — сумма событий за окно с весами WEIGHTS, где вклад
+    каждого часа убывает вдвое за HALF_LIFE_HOURS. Оценка группы — сумма
+    оценок её постов.
+    """
+    posts, groups = Counter(), Counter()
+    rows = ActivityCounter.objects.filter(
+        hour__gte=now - timedelta(hours=WINDOW_HOURS)
+    ).values_list("post_id", "group_id", "kind", "hour", "count")
+    for post_id, group_id, kind, hour, count in rows.iterator():
+        age = (now - hour).total_seconds() / 3600
+        score = count * WEIGHTS.get(kind, 0) * 0.5 ** (age / HALF_LIFE_HOURS)
+        posts[post_id] += score
+        if group_id is not None:
+            groups[group_id] += score
+    return posts, groups
+
+
+def top(scores, queryset):
+    # в рейтинг попадают только существующие и не скрытые объекты
+    candidates = scores.most_common(SIZE * 2)
+    existing = set(
+        queryset.filter(pk__in=[pk for pk, _ in candidates]).values_list(
+            "pk", flat=True
+        )
+    )
+    return [(pk, score) for pk, score in candidates if pk in existing][:SIZE]
+
+
+@task(every=REFRESH)
+def refresh_trending():
+    """
+    Пересчитывает рейтинг популярного и удаляет счётчики старше окна.
+    Страница и API читают готовую таблицу TrendingEntry.
+    """
+    now = timezone.now()
+    posts, groups = compute_scores(now)
+    entries = [
+        TrendingEntry(
+            kind=kind, rank=rank, object_id=pk, score=score, computed=now
+        )
+        for kind, ranking in (
+            (TrendingEntry.POST, top(posts, Post.objects)),
+            (TrendingEntry.GROUP, top(groups, Group.objects)),
+        )
+        for rank, (pk, score) in enumerate(ranking, 1)
+    ]
+    with transaction.atomic():
+        TrendingEntry.objects.all().delete()
+        TrendingEntry.objects.bulk_create(entries)
+    ActivityCounter.objects.filter(
+        hour__lt=now - timedelta(hours=WINDOW_HOURS)
+    ).delete()
+
+
+def ranked(kind, queryset, limit=None):
+    ids = list(
+        TrendingEntry.objects.filter(kind=kind).values_list(
+            "object_id", flat=True
+        )[:limit]
+    )
+    objects = queryset.in_bulk(ids)
+    return [objects[pk] for pk in ids if pk in objects]
+
+
+def trending_posts(limit=None):
+    posts = Post.objects.select_related("author", "group")
+    return ranked(TrendingEntry.POST, posts, limit)
+
+
+def trending_groups(limit=None):
+    return ranked(TrendingEntry.GROUP, Group.objects, limit)
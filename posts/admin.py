@@ -1,23 +1,190 @@
+import hashlib
+import json
+from itertools import islice
+
 from django.contrib import admin
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+from .deletion import schedule_post_deletion
+from .models import Post, Group, Comment, Follow
+
+# до какого числа строк считать точно: дальше полный COUNT(*) дороже,
+# чем польза от точной цифры в админке
+EXACT_COUNT_LIMIT = 10000
+# сколько секунд помнить последний pk показанной страницы, чтобы
+# следующую читать условием pk < последний
+PAGE_BOUNDARY_TIMEOUT = 60 * 10
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор для больших таблиц. Число строк без фильтров (кроме
+    условия менеджера по умолчанию, например hidden=False у постов)
+    берётся из статистики PostgreSQL (pg_class.reltuples). С фильтрами
+    строки считаются точно до EXACT_COUNT_LIMIT, а дальше берётся оценка
+    планировщика, так что последние страницы остаются доступны.
+
+    При сортировке по -pk следующая страница читается от последнего pk
+    предыдущей (он запоминается в кеше на PAGE_BOUNDARY_TIMEOUT): условие
+    pk < граница без OFFSET. Если на страницу перешли не с предыдущей,
+    граница ищется смещением по индексу первичного ключа.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if self.is_unfiltered(queryset):
+            estimate = self.estimated_count(queryset)
+            if estimate is not None and estimate > EXACT_COUNT_LIMIT:
+                return estimate
+        exact = queryset.order_by()[: EXACT_COUNT_LIMIT + 1].count()
+        if exact <= EXACT_COUNT_LIMIT:
+            return exact
+        planned = self.planned_count(queryset)
+        if planned is None:
+            return queryset.count()
+        return max(planned, exact)
+
+    @staticmethod
+    def is_unfiltered(queryset):
+        # условия сравниваются в виде SQL: узлы WHERE не сравнимы между собой
+        default = queryset.model._default_manager.get_queryset()
+        compiler = queryset.query.get_compiler(queryset.db)
+        return compiler.compile(queryset.query.where) == compiler.compile(
+            default.query.where
+        )
+
+    @staticmethod
+    def estimated_count(queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        return int(row[0]) if row else None
+
+    @staticmethod
+    def planned_count(queryset):
+        # оценка числа строк из плана запроса PostgreSQL
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def boundary_key(self, queryset, number):
+        query = hashlib.md5(str(queryset.query).encode()).hexdigest()
+        return f"admin:page:{query}:{self.per_page}:{number}"
+
+    def page(self, number):
+        number = self.validate_number(number)
+        queryset = self.object_list
+        if list(queryset.query.order_by) != ["-pk"]:
+            return super().page(number)
+        rows = queryset
+        if number > 1:
+            after = cache.get(self.boundary_key(queryset, number - 1))
+            if after is not None:
+                rows = queryset.filter(pk__lt=after)
+            else:
+                offset = (number - 1) * self.per_page
+                boundary = queryset.values_list("pk", flat=True)[offset:][:1]
+                rows = queryset.filter(pk__lte=boundary)
+        objects = list(rows[: self.per_page])
+        if objects:
+            cache.set(
+                self.boundary_key(queryset, number),
+                objects[-1].pk,
+                PAGE_BOUNDARY_TIMEOUT,
+            )
+        return self._get_page(objects, number, self)
+
 
-from .models import Post, Group, Comment
+class DeferredDeletionMixin:
+    """
+    Удаление из админки без Collector: объекты скрываются, а связанные
+    строки удаляются фоновой задачей, которую ставит в очередь
+    schedule_deletion наследника. Страница подтверждения не перечисляет
+    все зависимые объекты, а показывает сами удаляемые.
+    """
 
+    deletion_preview = 100
 
-class PostAdmin(admin.ModelAdmin):
+    def schedule_deletion(self, pks):
+        # модель без фонового удаления удаляется сразу, обычным delete()
+        self.model._default_manager.filter(pk__in=list(pks)).delete()
+
+    def get_deleted_objects(self, objs, request):
+        preview = [str(obj) for obj in islice(objs, self.deletion_preview)]
+        count = len(objs) if isinstance(objs, list) else objs.count()
+        perms_needed = set()
+        if not self.has_delete_permission(request):
+            perms_needed.add(self.opts.verbose_name)
+        model_count = {self.opts.verbose_name_plural: count}
+        return preview, model_count, perms_needed, []
+
+    def delete_model(self, request, obj):
+        self.schedule_deletion([obj.pk])
+
+    def delete_queryset(self, request, queryset):
+        self.schedule_deletion(queryset.values_list("pk", flat=True))
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Список без полного COUNT(*) и с сортировкой по первичному ключу,
+    чтобы работал поиск страницы по индексу.
+    """
+
+    ordering = ("-pk",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class PostAdmin(DeferredDeletionMixin, LargeTableAdmin):
     list_display = ("pk", "text", "pub_date", "author")
+    list_select_related = ("author",)
     search_fields = ("text",)
     list_filter = ("pub_date",)
+    autocomplete_fields = ("author", "group")
     empty_value_display = "-пусто-"
 
+    def schedule_deletion(self, pks):
+        schedule_post_deletion(pks)
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ("title", "slug", "description")
+    search_fields = ("title", "slug")
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(LargeTableAdmin):
     list_display = ("post", "author", "text", "created")
+    list_select_related = ("post", "author")
+    search_fields = ("text",)
+    autocomplete_fields = ("post", "author")
+
+
+class FollowAdmin(LargeTableAdmin):
+    list_display = ("user", "author")
+    list_select_related = ("user", "author")
+    search_fields = ("user__username", "author__username")
+    autocomplete_fields = ("user", "author")
 
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
 admin.site.register(Comment, CommentAdmin)
+admin.site.register(Follow, FollowAdmin)
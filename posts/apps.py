@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class PostsConfig(AppConfig):
     name = "posts"
+
+    def ready(self):
+        from . import signals  # noqa
+
+        # фоновые задачи регистрируются при импорте модулей
+        from . import activity, archive, deletion, recommendations  # noqa
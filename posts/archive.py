@@ -0,0 +1,81 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from tasks.queue import task
+
+from .caching import bump_post_cards
+from .models import ArchivedComment, ArchivedPost, Comment, Post
+from .signals import posts_removed
+
+# посты старше стольких дней переносятся в архив
+ARCHIVE_AFTER_DAYS = getattr(settings, "POST_ARCHIVE_AFTER_DAYS", 365 * 2)
+ARCHIVE_BATCH_SIZE = getattr(settings, "POST_ARCHIVE_BATCH_SIZE", 500)
+
+POST_FIELDS = (
+    "id",
+    "text",
+    "pub_date",
+    "author_id",
+    "group_id",
+    "image",
+    "views",
+)
+COMMENT_FIELDS = ("id", "post_id", "author_id", "text", "created")
+
+
+def archive_batch(cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    """
+    Переносит в архив одну пачку постов старше cutoff вместе с
+    комментариями. Копирование и удаление идут в одной транзакции, так что
+    пост всегда виден ровно в одной из таблиц. Возвращает число постов.
+    """
+    with transaction.atomic():
+        posts = list(
+            Post.all_objects.filter(pub_date__lt=cutoff, hidden=False)
+            .order_by("pk")
+            .values(*POST_FIELDS)[:batch_size]
+        )
+        if not posts:
+            return 0
+        post_ids = [post["id"] for post in posts]
+        ArchivedPost.objects.bulk_create(
+            [ArchivedPost(**post) for post in posts], ignore_conflicts=True
+        )
+        comments = Comment.objects.filter(post_id__in=post_ids)
+        ArchivedComment.objects.bulk_create(
+            [
+                ArchivedComment(**comment)
+                for comment in comments.values(*COMMENT_FIELDS).iterator()
+            ],
+            batch_size=batch_size,
+            ignore_conflicts=True,
+        )
+        # у скопированных строк нет других зависимостей, Collector с его
+        # сигналами на каждую строку не нужен
+        comments._raw_delete(comments.db)
+        moved = Post.all_objects.filter(pk__in=post_ids)
+        moved._raw_delete(moved.db)
+    bump_post_cards(post_ids)
+    return len(post_ids)
+
+
+def archive_posts(days=None, batch_size=ARCHIVE_BATCH_SIZE):
+    days = ARCHIVE_AFTER_DAYS if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    total = 0
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        if not moved:
+            break
+        total += moved
+    if total:
+        posts_removed.send(sender=Post, post_ids=[])
+    return total
+
+
+@task(every=60 * 60 * 24)
+def archive_old_posts():
+    archive_posts()
@@ -0,0 +1,29 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+# ключ, под которым хранится текущая версия карточки поста
+POST_CARD_VERSION_KEY = "post_card:version:{}"
+# сколько хранится отрисованная карточка; смена версии видна другим
+# воркерам только с общим кешем, см. POST_CARD_CACHE_TIMEOUT в настройках
+POST_CARD_CACHE_TIMEOUT = getattr(settings, "POST_CARD_CACHE_TIMEOUT", 3600)
+
+
+def post_card_version(post_id):
+    """
+    Возвращает текущую версию карточки поста. Версия входит в ключ
+    фрагментного кеша, поэтому смена версии делает старый фрагмент
+    недоступным без явного удаления.
+    """
+    return cache.get_or_set(
+        POST_CARD_VERSION_KEY.format(post_id), lambda: uuid.uuid4().hex, None
+    )
+
+
+def bump_post_cards(post_ids):
+    """
+    Сбрасывает версии карточек переданных постов: при следующем рендере
+    они будут отрисованы заново и сохранены под новым ключом.
+    """
+    cache.delete_many([POST_CARD_VERSION_KEY.format(pk) for pk in post_ids])
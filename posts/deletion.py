@@ -0,0 +1,167 @@
+import logging
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from sorl.thumbnail import delete as delete_image
+
+from tasks.queue import task
+
+from .caching import bump_post_cards
+from .models import (
+    ArchivedComment,
+    ArchivedPost,
+    Comment,
+    Follow,
+    Post,
+    Recommendation,
+)
+from .signals import posts_removed
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+# сколько строк удаляется одним запросом и сколько таких запросов делает
+# один запуск задачи; остаток доделывает следующая задача в очереди
+DELETE_CHUNK_SIZE = getattr(settings, "DELETE_CHUNK_SIZE", 500)
+DELETE_CHUNKS_PER_RUN = getattr(settings, "DELETE_CHUNKS_PER_RUN", 50)
+
+
+def schedule_post_deletion(post_ids):
+    """
+    Скрывает посты одним UPDATE и ставит их удаление в очередь. Посты
+    сразу пропадают с сайта и из API, строки удаляются в фоне.
+    """
+    post_ids = list(post_ids)
+    Post.all_objects.filter(pk__in=post_ids).update(hidden=True)
+    bump_post_cards(post_ids)
+    posts_removed.send(sender=Post, post_ids=post_ids)
+    purge_hidden_posts.enqueue_on_commit()
+
+
+def schedule_user_deletion(user_ids):
+    """
+    Блокирует пользователей, скрывает их посты и ставит удаление в
+    очередь. Сохранение через save() сбрасывает кеши пользователя.
+    """
+    for user in User.objects.filter(pk__in=user_ids):
+        user.is_active = False
+        user.save(update_fields=["is_active"])
+        purge_user.enqueue_on_commit(user.pk)
+    Post.all_objects.filter(author_id__in=user_ids).update(hidden=True)
+    posts_removed.send(sender=Post, post_ids=[])
+
+
+def delete_chunks(queryset, budget):
+    """
+    Удаляет строки queryset пачками по DELETE_CHUNK_SIZE, не больше
+    budget пачек. Возвращает неизрасходованный остаток.
+
+    Строки удаляются без Collector: у комментариев, подписок и постов
+    (после удаления их комментариев) нет зависимых строк, а сигналы на
+    каждую строку заменяет один сброс кешей в конце.
+    """
+    model = queryset.model
+    while budget:
+        pks = list(queryset.values_list("pk", flat=True)[:DELETE_CHUNK_SIZE])
+        if not pks:
+            break
+        model._base_manager.filter(pk__in=pks)._raw_delete(queryset.db)
+        budget -= 1
+    return budget
+
+
+def remove_images(post_ids, model=Post):
+    names = (
+        model._base_manager.filter(pk__in=post_ids)
+        .exclude(image="")
+        .exclude(image=None)
+        .values_list("image", flat=True)
+    )
+    for name in names:
+        try:
+            # удаляет и миниатюры, и сам файл
+            delete_image(name)
+        except Exception:
+            logger.exception("Не удалось удалить изображение %s", name)
+
+
+def purge_posts(posts, budget, removed=None):
+    """
+    Удаляет посты из queryset posts вместе с комментариями, картинками и
+    миниатюрами. Возвращает остаток budget; ноль значит, что работа
+    могла остаться. id удалённых постов добавляются в список removed.
+    """
+    while budget:
+        pks = list(posts.values_list("pk", flat=True)[:DELETE_CHUNK_SIZE])
+        if not pks:
+            break
+        budget = delete_chunks(Comment.objects.filter(post_id__in=pks), budget)
+        if not budget:
+            break
+        remove_images(pks)
+        Post.all_objects.filter(pk__in=pks)._raw_delete(posts.db)
+        bump_post_cards(pks)
+        if removed is not None:
+            removed += pks
+        budget -= 1
+    return budget
+
+
+def purge_archived_posts(user_id, budget):
+    # архивные посты удаляются так же: комментарии, картинки, строки
+    for queryset in (
+        ArchivedComment.objects.filter(author_id=user_id),
+        ArchivedComment.objects.filter(post__author_id=user_id),
+    ):
+        budget = delete_chunks(queryset, budget)
+    posts = ArchivedPost.objects.filter(author_id=user_id)
+    while budget:
+        pks = list(posts.values_list("pk", flat=True)[:DELETE_CHUNK_SIZE])
+        if not pks:
+            break
+        remove_images(pks, ArchivedPost)
+        ArchivedPost.objects.filter(pk__in=pks)._raw_delete(posts.db)
+        budget -= 1
+    return budget
+
+
+@task(every=60 * 60)
+def purge_hidden_posts():
+    removed = []
+    budget = purge_posts(
+        Post.all_objects.filter(hidden=True), DELETE_CHUNKS_PER_RUN, removed
+    )
+    if removed:
+        posts_removed.send(sender=Post, post_ids=removed)
+    if not budget:
+        purge_hidden_posts.enqueue()
+
+
+@task()
+def purge_user(user_id):
+    """
+    Удаляет подписки, комментарии и посты (в том числе архивные)
+    пользователя пачками, а когда их не осталось — самого пользователя.
+    Повторный запуск безопасен.
+    """
+    user = User.objects.filter(pk=user_id).first()
+    if user is None:
+        return
+    budget = DELETE_CHUNKS_PER_RUN
+    for queryset in (
+        Follow.objects.filter(user_id=user_id),
+        Follow.objects.filter(author_id=user_id),
+        Comment.objects.filter(author_id=user_id),
+        Recommendation.objects.filter(user_id=user_id),
+        Recommendation.objects.filter(author_id=user_id),
+    ):
+        budget = delete_chunks(queryset, budget)
+    budget = purge_posts(Post.all_objects.filter(author_id=user_id), budget)
+    budget = purge_archived_posts(user_id, budget)
+    if not budget:
+        purge_user.enqueue(user_id)
+        return
+    # связанных строк не осталось, каскад удалит только сессии и токены
+    user.delete()
+    posts_removed.send(sender=Post, post_ids=[])
@@ -0,0 +1,167 @@
+import csv
+import datetime
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import ArchivedComment, ArchivedPost, Comment, Follow, Group, Post
+
+# колонки выгрузки: имя колонки -> поле для values_list. Авторы и группы
+# выгружаются естественными ключами (username, slug), чтобы выгрузку
+# можно было загрузить в другую базу. Порядок моделей — порядок загрузки.
+EXPORT_MODELS = {
+    "group": (
+        Group,
+        {
+            "id": "id",
+            "title": "title",
+            "slug": "slug",
+            "description": "description",
+        },
+    ),
+    "post": (
+        Post,
+        {
+            "id": "id",
+            "text": "text",
+            "pub_date": "pub_date",
+            "author": "author__username",
+            "group": "group__slug",
+            "image": "image",
+        },
+    ),
+    "comment": (
+        Comment,
+        {
+            "id": "id",
+            "post": "post_id",
+            "author": "author__username",
+            "text": "text",
+            "created": "created",
+        },
+    ),
+    "follow": (
+        Follow,
+        {"id": "id", "user": "user__username", "author": "author__username"},
+    ),
+}
+FORMATS = ("jsonl", "csv")
+EXPORT_CHUNK_SIZE = 2000
+
+
+def export_querysets(name):
+    """
+    Откуда выгружаются строки модели: горячая таблица, затем архив.
+    Скрытые посты ждут удаления и не выгружаются, как и их комментарии,
+    иначе комментарии ссылались бы на отсутствующие в выгрузке посты.
+    """
+    if name == "post":
+        return [
+            Post.all_objects.filter(hidden=False),
+            ArchivedPost.objects.all(),
+        ]
+    if name == "comment":
+        return [
+            Comment.objects.filter(post__hidden=False),
+            ArchivedComment.objects.all(),
+        ]
+    model, _ = EXPORT_MODELS[name]
+    return [model.objects.all()]
+
+
+def _iter_rows(querysets, fields, chunk_size):
+    for queryset in querysets:
+        yield from (
+            queryset.order_by("pk")
+            .values_list(*fields)
+            .iterator(chunk_size=chunk_size)
+        )
+
+
+def export_rows(name, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Строки одной модели кортежами в порядке колонок. iterator() читает
+    пачками по chunk_size (в PostgreSQL — серверным курсором), так что
+    в памяти никогда не оказывается вся таблица.
+    """
+    _, columns = EXPORT_MODELS[name]
+    rows = _iter_rows(
+        export_querysets(name), list(columns.values()), chunk_size
+    )
+    return columns.keys(), rows
+
+
+class ExportEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder обрезает время до миллисекунд, выгрузке нужна
+    # точная копия
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def iter_jsonl(names, chunk_size=EXPORT_CHUNK_SIZE):
+    encoder = ExportEncoder(ensure_ascii=False)
+    for name in names:
+        columns, rows = export_rows(name, chunk_size)
+        columns = list(columns)
+        for row in rows:
+            record = dict(zip(columns, row), model=name)
+            yield encoder.encode(record) + "\n"
+
+
+def _csv_value(value):
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+class _Line:
+    # csv.writer пишет в объект с write(); строку сразу отдаём наружу
+    def write(self, value):
+        return value
+
+
+def iter_csv(name, chunk_size=EXPORT_CHUNK_SIZE):
+    writer = csv.writer(_Line())
+    columns, rows = export_rows(name, chunk_size)
+    yield writer.writerow(columns)
+    for row in rows:
+        yield writer.writerow([_csv_value(value) for value in row])
+
+
+def iter_export(names, fmt="jsonl", chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Выгрузка текстовыми кусками. В JSON Lines помещаются все модели
+    (поле model в каждой строке), CSV — всегда одна модель.
+    """
+    if fmt == "csv":
+        if len(names) != 1:
+            raise ValueError("CSV выгружает ровно одну модель")
+        return iter_csv(names[0], chunk_size)
+    return iter_jsonl(names, chunk_size)
+
+
+def iter_encoded(chunks, compress=False, buffer_size=64 * 1024):
+    """
+    Кодирует куски в UTF-8 и, если нужно, сжимает их gzip на лету.
+    Мелкие строки собираются в блоки около buffer_size байт.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    buffer = []
+    size = 0
+    for chunk in chunks:
+        data = chunk.encode()
+        buffer.append(data)
+        size += len(data)
+        if size < buffer_size:
+            continue
+        block = b"".join(buffer)
+        buffer, size = [], 0
+        if compressor is not None:
+            block = compressor.compress(block)
+        if block:
+            yield block
+    block = b"".join(buffer)
+    if compressor is not None:
+        block = compressor.compress(block) + compressor.flush()
+    if block:
+        yield block
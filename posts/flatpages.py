@@ -0,0 +1,117 @@
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.flatpages.models import FlatPage
+from django.contrib.flatpages.views import render_flatpage
+from django.contrib.sites.shortcuts import get_current_site
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.http import Http404, HttpRequest, HttpResponse
+from django.utils.cache import patch_cache_control
+
+FLATPAGES_VERSION_KEY = "flatpages:version"
+FLATPAGE_KEY = "flatpages:{}:page:{}:{}"
+FLATPAGE_HTML_KEY = "flatpages:{}:html:{}:{}"
+
+# страницы меняются только через админку, поэтому храним их сутки,
+# а промежуточным кешам разрешаем держать ответ час. Сброс сменой версии
+# виден всем воркерам только с общим кешем, см. FLATPAGE_CACHE_TIMEOUT в
+# настройках.
+FLATPAGE_CACHE_TIMEOUT = getattr(
+    settings, "FLATPAGE_CACHE_TIMEOUT", 60 * 60 * 24
+)
+FLATPAGE_MAX_AGE = getattr(settings, "FLATPAGE_MAX_AGE", 60 * 60)
+
+
+def _version():
+    return cache.get_or_set(
+        FLATPAGES_VERSION_KEY, lambda: uuid.uuid4().hex, None
+    )
+
+
+def _anonymous_request(url):
+    request = HttpRequest()
+    request.method = "GET"
+    request.path = request.path_info = url
+    request.user = AnonymousUser()
+    return request
+
+
+def _render_anonymous(flatpage):
+    request = _anonymous_request(flatpage.url)
+    response = render_flatpage(request, flatpage)
+    if response.status_code == 200 and not flatpage.registration_required:
+        return response.content
+    return None
+
+
+def get_flatpage(url, site_id):
+    """
+    Возвращает FlatPage из кеша, обращаясь к базе только при промахе.
+    """
+    key = FLATPAGE_KEY.format(_version(), site_id, url)
+    flatpage = cache.get(key)
+    if flatpage is None:
+        flatpage = FlatPage.objects.filter(url=url, sites=site_id).first()
+        # отсутствие страницы тоже запоминаем, чтобы не ходить в базу
+        cache.set(key, flatpage or False, FLATPAGE_CACHE_TIMEOUT)
+    return flatpage or None
+
+
+def warm_flatpages(site_id=None):
+    """
+    Загружает в кеш все страницы сайта вместе с отрисованным для анонимного
+    посетителя HTML. Вызывается при старте и после изменения страниц.
+    """
+    site_id = site_id or settings.SITE_ID
+    version = _version()
+    try:
+        flatpages = list(FlatPage.objects.filter(sites=site_id))
+    except DatabaseError:
+        # база ещё не готова (например, до применения миграций)
+        return 0
+    entries = {}
+    for flatpage in flatpages:
+        key = FLATPAGE_KEY.format(version, site_id, flatpage.url)
+        entries[key] = flatpage
+        content = _render_anonymous(flatpage)
+        if content is not None:
+            key = FLATPAGE_HTML_KEY.format(version, site_id, flatpage.url)
+            entries[key] = content
+    cache.set_many(entries, FLATPAGE_CACHE_TIMEOUT)
+    return len(flatpages)
+
+
+def invalidate_flatpages():
+    cache.delete(FLATPAGES_VERSION_KEY)
+
+
+def cached_flatpage(request, url):
+    """
+    Замена django.contrib.flatpages.views.flatpage: анонимным посетителям
+    отдаётся готовый HTML из кеша, авторизованным страница рендерится
+    заново (в шапке есть имя пользователя), но без запроса к базе.
+    """
+    site_id = get_current_site(request).id
+    anonymous = not request.user.is_authenticated
+    html_key = FLATPAGE_HTML_KEY.format(_version(), site_id, url)
+    if anonymous:
+        content = cache.get(html_key)
+        if content is not None:
+            response = HttpResponse(content)
+            patch_cache_control(
+                response, public=True, max_age=FLATPAGE_MAX_AGE
+            )
+            return response
+
+    flatpage = get_flatpage(url, site_id)
+    if flatpage is None:
+        raise Http404
+    response = render_flatpage(request, flatpage)
+    if not anonymous:
+        patch_cache_control(response, private=True, max_age=0)
+    elif response.status_code == 200 and not flatpage.registration_required:
+        cache.set(html_key, response.content, FLATPAGE_CACHE_TIMEOUT)
+        patch_cache_control(response, public=True, max_age=FLATPAGE_MAX_AGE)
+    return response
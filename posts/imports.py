@@ -0,0 +1,279 @@
+import csv
+import gzip
+import json
+import os
+
+from django.db import transaction
+from django.db.models import Case, DateTimeField, Value, When
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .export import EXPORT_MODELS
+from .models import Comment, Follow, Group, Post, User
+from .signals import data_imported
+
+IMPORT_BATCH_SIZE = 1000
+
+
+def open_source(path):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def read_records(source, fmt="jsonl", model=None):
+    """
+    Записи в формате выгрузки export_data. В CSV одна модель, её имя
+    передаётся явно; пустые ячейки считаются отсутствующим значением.
+    """
+    if fmt == "csv":
+        for row in csv.DictReader(source):
+            record = {key: value or None for key, value in row.items()}
+            record["model"] = model
+            yield record
+        return
+    for line in source:
+        if line.strip():
+            yield json.loads(line)
+
+
+def rows_inserted(model, count):
+    """
+    Первичные ключи последних count строк, вставленных в этой транзакции,
+    в порядке вставки. PostgreSQL возвращает их из bulk_create сам, на
+    остальных базах записывающая транзакция держит блокировку, и новые
+    строки — последние по id.
+    """
+    pks = model._base_manager.order_by("-pk").values_list("pk", flat=True)
+    return list(pks[:count])[::-1]
+
+
+def set_dates(model, field, dates):
+    """
+    Проставляет даты из выгрузки одним UPDATE: bulk_create заполняет поля
+    с auto_now_add текущим временем.
+    """
+    if not dates:
+        return
+    model._base_manager.filter(pk__in=list(dates)).update(
+        **{
+            field: Case(
+                *[When(pk=pk, then=Value(date)) for pk, date in dates.items()],
+                output_field=DateTimeField(),
+            )
+        }
+    )
+
+
+class Importer:
+    """
+    Загружает выгрузку пачками через bulk_create. Авторы и группы ищутся
+    по username и slug в словарях, прочитанных из базы один раз; группа с
+    уже существующим slug не создаётся заново. Первичные ключи назначает
+    база, а ссылки комментариев на посты переводятся через словарь
+    «id в выгрузке → новый id». Каждая пачка — отдельная транзакция,
+    после неё номер записи сохраняется в файл контрольной точки, и
+    прерванную загрузку можно продолжить.
+
+    Новые id постов дописываются в файл id_map. Он не зависит от
+    контрольной точки и не удаляется в конце, поэтому комментарии из
+    отдельного CSV находят посты, загруженные предыдущим запуском. В
+    статистике — только действительно вставленные строки; записи без
+    автора, поста или с неразборчивой датой пропускаются.
+    """
+
+    def __init__(
+        self, batch_size=IMPORT_BATCH_SIZE, checkpoint=None, id_map=None
+    ):
+        self.batch_size = batch_size
+        self.checkpoint = checkpoint
+        self.id_map = id_map
+        self.users = dict(User.objects.values_list("username", "pk"))
+        self.groups = dict(Group.objects.values_list("slug", "pk"))
+        self.post_ids = {}
+        self.new_post_ids = {}
+        self.buffers = {name: [] for name in EXPORT_MODELS}
+        self.stats = {name: 0 for name in EXPORT_MODELS}
+        self.stats["skipped"] = 0
+        self.position = 0
+
+    def load_ids(self):
+        # более поздние строки (повторная загрузка постов) важнее
+        if not self.id_map or not os.path.exists(self.id_map):
+            return
+        with open(self.id_map) as ids:
+            for line in ids:
+                source_id, post_id = line.split()
+                self.post_ids[source_id] = int(post_id)
+
+    def save_ids(self):
+        if not self.id_map or not self.new_post_ids:
+            return
+        with open(self.id_map, "a") as ids:
+            for source_id, post_id in self.new_post_ids.items():
+                ids.write(f"{source_id} {post_id}\n")
+
+    def load_checkpoint(self):
+        if not self.checkpoint or not os.path.exists(self.checkpoint):
+            return 0
+        with open(self.checkpoint) as checkpoint:
+            return json.load(checkpoint)["position"]
+
+    def save_checkpoint(self):
+        if not self.checkpoint:
+            return
+        tmp_path = f"{self.checkpoint}.tmp"
+        with open(tmp_path, "w") as checkpoint:
+            json.dump({"position": self.position}, checkpoint)
+        os.replace(tmp_path, self.checkpoint)
+
+    def restart(self):
+        if self.checkpoint and os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+
+    def run(self, records):
+        self.load_ids()
+        start = self.load_checkpoint()
+        for self.position, record in enumerate(records, 1):
+            if self.position <= start:
+                continue
+            self.buffers[record["model"]].append(record)
+            if sum(map(len, self.buffers.values())) >= self.batch_size:
+                self.flush()
+        self.flush()
+        self.finish()
+        return self.stats
+
+    def flush(self):
+        # модели пишутся в порядке зависимостей: группы раньше постов,
+        # посты раньше комментариев
+        self.new_post_ids = {}
+        with transaction.atomic():
+            for name in EXPORT_MODELS:
+                records, self.buffers[name] = self.buffers[name], []
+                if records:
+                    getattr(self, f"create_{name}")(records)
+        self.post_ids.update(self.new_post_ids)
+        self.save_ids()
+        self.save_checkpoint()
+
+    def bulk_create(self, name, model, objects):
+        """
+        Вставляет строки и возвращает их новые первичные ключи в том же
+        порядке.
+        """
+        if not objects:
+            return []
+        model._base_manager.bulk_create(objects, batch_size=self.batch_size)
+        self.stats[name] += len(objects)
+        if objects[0].pk is not None:
+            return [obj.pk for obj in objects]
+        return rows_inserted(model, len(objects))
+
+    def create_group(self, records):
+        groups = {}
+        for record in records:
+            if record["slug"] in self.groups or record["slug"] in groups:
+                self.stats["skipped"] += 1
+                continue
+            groups[record["slug"]] = Group(
+                title=record["title"],
+                slug=record["slug"],
+                description=record.get("description") or "",
+            )
+        pks = self.bulk_create("group", Group, list(groups.values()))
+        self.groups.update(zip(groups, pks))
+
+    def create_post(self, records):
+        posts, source_ids, dates = [], [], []
+        for record in records:
+            author_id = self.users.get(record["author"])
+            pub_date = self.parse_date(record.get("pub_date"))
+            if author_id is None or pub_date is None:
+                self.stats["skipped"] += 1
+                continue
+            posts.append(
+                Post(
+                    text=record["text"],
+                    author_id=author_id,
+                    group_id=self.groups.get(record.get("group")),
+                    image=record.get("image") or None,
+                )
+            )
+            source_ids.append(record.get("id"))
+            dates.append(pub_date)
+        pks = self.bulk_create("post", Post, posts)
+        set_dates(Post, "pub_date", dict(zip(pks, dates)))
+        for source_id, pk in zip(source_ids, pks):
+            if source_id is not None:
+                self.new_post_ids[str(source_id)] = pk
+
+    def find_post(self, source_id):
+        source_id = str(source_id)
+        return self.new_post_ids.get(source_id, self.post_ids.get(source_id))
+
+    def create_comment(self, records):
+        comments, dates = [], []
+        for record in records:
+            author_id = self.users.get(record["author"])
+            post_id = self.find_post(record["post"])
+            created = self.parse_date(record.get("created"))
+            if author_id is None or post_id is None or created is None:
+                self.stats["skipped"] += 1
+                continue
+            comments.append(
+                Comment(
+                    post_id=post_id, author_id=author_id, text=record["text"]
+                )
+            )
+            dates.append(created)
+        pks = self.bulk_create("comment", Comment, comments)
+        set_dates(Comment, "created", dict(zip(pks, dates)))
+
+    def create_follow(self, records):
+        pairs = set()
+        for record in records:
+            user_id = self.users.get(record["user"])
+            author_id = self.users.get(record["author"])
+            if user_id is None or author_id is None:
+                self.stats["skipped"] += 1
+                continue
+            pairs.add((user_id, author_id))
+        existing = set(
+            Follow.objects.filter(
+                user_id__in={user_id for user_id, _ in pairs}
+            ).values_list("user_id", "author_id")
+        )
+        self.stats["skipped"] += len(pairs & existing)
+        self.bulk_create(
+            "follow",
+            Follow,
+            [
+                Follow(user_id=user_id, author_id=author_id)
+                for user_id, author_id in sorted(pairs - existing)
+            ],
+        )
+
+    @staticmethod
+    def parse_date(value):
+        """
+        Дата из выгрузки; без даты — текущее время, для неразборчивой
+        даты — None.
+        """
+        if not value:
+            return timezone.now()
+        try:
+            date = parse_datetime(value)
+        except ValueError:
+            # формат верный, но такой даты нет, например 2020-13-01
+            return None
+        if date is None:
+            return None
+        if timezone.is_naive(date):
+            date = timezone.make_aware(date)
+        return date
+
+    def finish(self):
+        # кеши сбрасываются один раз, после всей загрузки
+        data_imported.send(sender=self.__class__, stats=self.stats)
+        self.restart()
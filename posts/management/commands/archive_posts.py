@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from posts.archive import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE, archive_posts
+
+
+class Command(BaseCommand):
+    help = "Переносит старые посты и их комментарии в архивные таблицы"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=ARCHIVE_AFTER_DAYS,
+            help="Архивировать посты старше стольких дней",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=ARCHIVE_BATCH_SIZE,
+            help="Постов в одной транзакции",
+        )
+
+    def handle(self, *args, **options):
+        moved = archive_posts(options["days"], options["batch_size"])
+        self.stdout.write(f"Перенесено в архив постов: {moved}")
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from posts.recommendations import CHUNK_SIZE, build_recommendations
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает рекомендации «Кого почитать»"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Пересчитать всех, а не только затронутых новыми подписками",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=CHUNK_SIZE,
+            help="Пользователей в одной пачке",
+        )
+
+    def handle(self, *args, **options):
+        run = build_recommendations(options["full"], options["chunk_size"])
+        kind = "полный" if run.full else "по новым подпискам"
+        self.stdout.write(
+            f"Пересчёт {kind}: пользователей {run.users}, "
+            f"подписки до id {run.last_follow_id}"
+        )
@@ -0,0 +1,49 @@
+import os
+import re
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+# уже обработанные файлы: копии с хешем и сжатые варианты
+DERIVED_NAME = re.compile(r"(\.[0-9a-f]{12}\.[^./]+|\.gz|\.br)$")
+
+
+class Command(BaseCommand):
+    help = (
+        "Собирает статику и обрабатывает весь STATIC_ROOT: имена с хешем, "
+        "манифест и сжатые варианты .gz/.br"
+    )
+
+    def handle(self, *args, **options):
+        call_command(
+            "collectstatic",
+            interactive=False,
+            post_process=False,
+            verbosity=options["verbosity"],
+        )
+        # часть статики (bootstrap, jquery) лежит прямо в STATIC_ROOT и в
+        # collectstatic не попадает, поэтому обрабатываются все файлы
+        paths = {
+            name: (staticfiles_storage, name) for name in self.static_files()
+        }
+        processed = 0
+        for name, hashed_name, done in staticfiles_storage.post_process(
+            paths
+        ):
+            if isinstance(done, Exception):
+                raise CommandError(f"{name}: {done}")
+            processed += bool(done)
+        self.stdout.write(f"Обработано файлов: {processed}")
+
+    def static_files(self):
+        root = staticfiles_storage.location
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, root).replace(os.sep, "/")
+                if name == staticfiles_storage.manifest_name:
+                    continue
+                if DERIVED_NAME.search(name) or name.endswith(".tmp"):
+                    continue
+                yield name
@@ -0,0 +1,55 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import (
+    EXPORT_CHUNK_SIZE,
+    EXPORT_MODELS,
+    FORMATS,
+    iter_encoded,
+    iter_export,
+)
+
+
+class Command(BaseCommand):
+    help = "Потоковая выгрузка групп, постов, комментариев и подписок"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            action="append",
+            choices=list(EXPORT_MODELS),
+            help="Модель для выгрузки (можно несколько, по умолчанию все)",
+        )
+        parser.add_argument("--format", choices=FORMATS, default="jsonl")
+        parser.add_argument(
+            "--gzip", action="store_true", help="Сжимать выгрузку gzip"
+        )
+        parser.add_argument(
+            "--output", default="-", help="Файл выгрузки, '-' — stdout"
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help="Строк, читаемых из базы за раз",
+        )
+
+    def handle(self, *args, **options):
+        names = options["model"] or list(EXPORT_MODELS)
+        try:
+            chunks = iter_export(
+                names, options["format"], options["chunk_size"]
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        blocks = iter_encoded(chunks, compress=options["gzip"])
+        if options["output"] == "-":
+            output = getattr(self.stdout._out, "buffer", sys.stdout.buffer)
+            for block in blocks:
+                output.write(block)
+            output.flush()
+            return
+        with open(options["output"], "wb") as output:
+            for block in blocks:
+                output.write(block)
@@ -0,0 +1,69 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import EXPORT_MODELS, FORMATS
+from posts.imports import (
+    IMPORT_BATCH_SIZE,
+    Importer,
+    open_source,
+    read_records,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает группы, посты, комментарии и подписки из выгрузки "
+        "export_data (JSON Lines или CSV, можно .gz)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл выгрузки")
+        parser.add_argument("--format", choices=FORMATS, default="jsonl")
+        parser.add_argument(
+            "--model",
+            choices=list(EXPORT_MODELS),
+            help="Модель в CSV-файле",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=IMPORT_BATCH_SIZE,
+            help="Записей в одной транзакции",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            help="Файл контрольной точки (по умолчанию <path>.checkpoint)",
+        )
+        parser.add_argument(
+            "--id-map",
+            help=(
+                "Файл соответствия id постов выгрузки и новых id, общий для "
+                "загрузок из одного каталога (по умолчанию import.ids рядом "
+                "с выгрузкой); сохраняется после загрузки, чтобы комментарии "
+                "из отдельного CSV нашли свои посты"
+            ),
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Начать заново, не продолжая с контрольной точки",
+        )
+
+    def handle(self, *args, **options):
+        if options["format"] == "csv" and not options["model"]:
+            raise CommandError("Для CSV укажите --model")
+        checkpoint = options["checkpoint"] or f"{options['path']}.checkpoint"
+        id_map = options["id_map"] or os.path.join(
+            os.path.dirname(os.path.abspath(options["path"])), "import.ids"
+        )
+        importer = Importer(options["batch_size"], checkpoint, id_map)
+        if options["restart"]:
+            importer.restart()
+        with open_source(options["path"]) as source:
+            stats = importer.run(
+                read_records(source, options["format"], options["model"])
+            )
+        self.stdout.write(
+            ", ".join(f"{name}: {count}" for name, count in stats.items())
+        )
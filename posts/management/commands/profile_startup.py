@@ -0,0 +1,86 @@
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SETUP_CODE = (
+    "import os, django; "
+    "os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings'); "
+    "django.setup()"
+)
+
+
+def parse_importtime(output):
+    """
+    Строки вывода python -X importtime в список
+    (модуль, собственное время, время с вложенными импортами) в мкс.
+    """
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        imports.append(
+            (fields[2].strip(), int(fields[0]), int(fields[1]))
+        )
+    return imports
+
+
+class Command(BaseCommand):
+    help = (
+        "Показывает, сколько стоит импорт и инициализация каждого модуля "
+        "при запуске Django или команды manage.py"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "manage_command",
+            nargs="*",
+            help="Команда manage.py для замера (по умолчанию django.setup())",
+        )
+        parser.add_argument(
+            "--limit", type=int, default=20, help="Строк в каждой таблице"
+        )
+
+    def handle(self, *args, **options):
+        if options["manage_command"]:
+            argv = ["manage.py", *options["manage_command"]]
+        else:
+            argv = ["-c", SETUP_CODE]
+        started = time.perf_counter()
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", *argv],
+            cwd=settings.BASE_DIR,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        elapsed = time.perf_counter() - started
+        imports = parse_importtime(process.stderr)
+        if not imports:
+            raise CommandError(process.stderr[-2000:])
+
+        limit = options["limit"]
+        packages = defaultdict(int)
+        for name, own, _ in imports:
+            packages[name.split(".")[0]] += own
+        self.stdout.write(f"Запуск целиком: {elapsed * 1000:.0f} мс")
+        self.stdout.write(
+            f"Импорт: {sum(own for _, own, _ in imports) / 1000:.0f} мс, "
+            f"модулей: {len(imports)}"
+        )
+        self.stdout.write("\nПакеты (собственное время модулей):")
+        for name, own in sorted(
+            packages.items(), key=lambda item: -item[1]
+        )[:limit]:
+            self.stdout.write(f"{own / 1000:9.1f} мс  {name}")
+        self.stdout.write("\nМодули (вместе с вложенными импортами):")
+        for name, _, cumulative in sorted(
+            imports, key=lambda item: -item[2]
+        )[:limit]:
+            self.stdout.write(f"{cumulative / 1000:9.1f} мс  {name}")
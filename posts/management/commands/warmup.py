@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from yatube.warmup import format_report, warm_up
+
+
+class Command(BaseCommand):
+    help = (
+        "Прогревает кеши процесса так же, как wsgi.py перед fork, и "
+        "показывает, сколько стоит каждый шаг (повторный прогон — сколько "
+        "стоит он же на уже прогретом процессе)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat",
+            action="store_true",
+            help="Прогреть второй раз и показать время на тёплом процессе",
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Холодный процесс:")
+        self.stdout.write(format_report(warm_up()))
+        if options["repeat"]:
+            self.stdout.write("Прогретый процесс:")
+            self.stdout.write(format_report(warm_up()))
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.28 on 2026-10-19 01:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_auto_20210107_1825'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='hidden',
+            field=models.BooleanField(default=False, editable=False, verbose_name='скрыт'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 2.2.28 on 2026-10-19 02:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'пост'), ('group', 'группа')], max_length=10, verbose_name='тип')),
+                ('rank', models.PositiveIntegerField(verbose_name='место')),
+                ('object_id', models.IntegerField(verbose_name='id')),
+                ('score', models.FloatField(verbose_name='оценка')),
+                ('computed', models.DateTimeField(verbose_name='дата расчёта')),
+            ],
+            options={
+                'verbose_name': 'Популярное',
+                'verbose_name_plural': 'Популярное',
+                'ordering': ['kind', 'rank'],
+                'unique_together': {('kind', 'rank')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ActivityCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('post_id', models.IntegerField(verbose_name='пост')),
+                ('group_id', models.IntegerField(blank=True, null=True, verbose_name='группа')),
+                ('kind', models.CharField(choices=[('view', 'просмотр'), ('comment', 'комментарий')], max_length=10, verbose_name='событие')),
+                ('hour', models.DateTimeField(db_index=True, verbose_name='час')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='количество')),
+            ],
+            options={
+                'verbose_name': 'Счётчик активности',
+                'verbose_name_plural': 'Счётчики активности',
+                'unique_together': {('post_id', 'kind', 'hour')},
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 2.2.28 on 2026-10-19 02:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0013_views'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecommendationRun',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started', models.DateTimeField(auto_now_add=True, verbose_name='начало')),
+                ('finished', models.DateTimeField(blank=True, null=True, verbose_name='окончание')),
+                ('full', models.BooleanField(default=False, verbose_name='полный')),
+                ('last_follow_id', models.IntegerField(default=0, verbose_name='последняя подписка')),
+                ('users', models.PositiveIntegerField(default=0, verbose_name='пользователей')),
+            ],
+            options={
+                'verbose_name': 'Пересчёт рекомендаций',
+                'verbose_name_plural': 'Пересчёты рекомендаций',
+                'ordering': ['-pk'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Recommendation',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='оценка')),
+                ('via_follows', models.PositiveIntegerField(default=0, verbose_name='через подписки')),
+                ('shared_groups', models.PositiveIntegerField(default=0, verbose_name='общие группы')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recommendations', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Рекомендация',
+                'verbose_name_plural': 'Рекомендации',
+                'ordering': ['-score'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recommendation',
+            index=models.Index(fields=['user', '-score'], name='posts_recom_user_id_777301_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='recommendation',
+            unique_together={('user', 'author')},
+        ),
+    ]
@@ -17,6 +17,17 @@ class Group(models.Model):
         verbose_name_plural = "Группы"
 
 
+class VisiblePostManager(models.Manager):
+    """
+    Посты без скрытых: скрытые ждут фонового удаления и нигде не
+    показываются. Связанные объекты (comment.post) по-прежнему
+    доступны через базовый менеджер.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(hidden=False)
+
+
 class Post(models.Model):
     class Meta:
         verbose_name = "Пост"
@@ -44,6 +55,14 @@ class Post(models.Model):
     image = models.ImageField(
         upload_to="posts/", blank=True, null=True, verbose_name="Изображение"
     )
+    hidden = models.BooleanField("скрыт", default=False, editable=False)
+    # копится в posts.activity.view_buffer и записывается пачками
+    views = models.PositiveIntegerField(
+        "просмотры", default=0, editable=False
+    )
+
+    objects = VisiblePostManager()
+    all_objects = models.Manager()
 
     def __str__(self):
         return self.text
@@ -78,3 +97,157 @@ class Follow(models.Model):
     author = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="following"
     )
+
+
+class ArchivedPost(models.Model):
+    """
+    Старый пост, перенесённый из горячей таблицы командой archive_posts.
+    Первичный ключ совпадает с исходным, поэтому адреса постов не меняются.
+    """
+
+    class Meta:
+        verbose_name = "Архивный пост"
+        verbose_name_plural = "Архивные посты"
+        ordering = ["-pub_date"]
+
+    id = models.IntegerField(primary_key=True)
+    text = models.TextField("Текст")
+    pub_date = models.DateTimeField("дата публикации", db_index=True)
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="archived_posts",
+        verbose_name="Автор",
+    )
+    group = models.ForeignKey(
+        Group,
+        on_delete=models.SET_NULL,
+        related_name="archived_posts",
+        blank=True,
+        null=True,
+        verbose_name="Группа",
+    )
+    image = models.ImageField(
+        upload_to="posts/", blank=True, null=True, verbose_name="Изображение"
+    )
+    views = models.PositiveIntegerField(
+        "просмотры", default=0, editable=False
+    )
+    archived = models.DateTimeField("дата архивации", auto_now_add=True)
+
+    def __str__(self):
+        return self.text
+
+
+class ArchivedComment(models.Model):
+    class Meta:
+        verbose_name = "Архивный комментарий"
+        verbose_name_plural = "Архивные комментарии"
+        ordering = ["-created"]
+
+    id = models.IntegerField(primary_key=True)
+    post = models.ForeignKey(
+        ArchivedPost,
+        on_delete=models.CASCADE,
+        related_name="comments",
+        verbose_name="Пост",
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="archived_comments",
+        verbose_name="Автор",
+    )
+    text = models.TextField(verbose_name="Текст")
+    created = models.DateTimeField("Дата публикации")
+
+
+class ActivityCounter(models.Model):
+    """
+    Почасовой счётчик просмотров или комментариев поста. Пишется пачками
+    из posts.activity; пост не связан внешним ключом, чтобы пакетное
+    удаление постов не упиралось в счётчики — они сами устаревают.
+    """
+
+    VIEW = "view"
+    COMMENT = "comment"
+    KINDS = ((VIEW, "просмотр"), (COMMENT, "комментарий"))
+
+    class Meta:
+        verbose_name = "Счётчик активности"
+        verbose_name_plural = "Счётчики активности"
+        unique_together = ("post_id", "kind", "hour")
+
+    post_id = models.IntegerField("пост")
+    group_id = models.IntegerField("группа", blank=True, null=True)
+    kind = models.CharField("событие", max_length=10, choices=KINDS)
+    hour = models.DateTimeField("час", db_index=True)
+    count = models.PositiveIntegerField("количество", default=0)
+
+
+class TrendingEntry(models.Model):
+    """
+    Место поста или группы в рейтинге популярного. Таблица целиком
+    пересчитывается задачей posts.activity.refresh_trending.
+    """
+
+    POST = "post"
+    GROUP = "group"
+    KINDS = ((POST, "пост"), (GROUP, "группа"))
+
+    class Meta:
+        verbose_name = "Популярное"
+        verbose_name_plural = "Популярное"
+        ordering = ["kind", "rank"]
+        unique_together = ("kind", "rank")
+
+    kind = models.CharField("тип", max_length=10, choices=KINDS)
+    rank = models.PositiveIntegerField("место")
+    object_id = models.IntegerField("id")
+    score = models.FloatField("оценка")
+    computed = models.DateTimeField("дата расчёта")
+
+
+class Recommendation(models.Model):
+    """
+    Автор, которого стоит предложить пользователю в «Кого почитать».
+    Строится пачками задачами posts.recommendations, читается одним
+    запросом по индексу (user, -score).
+    """
+
+    class Meta:
+        verbose_name = "Рекомендация"
+        verbose_name_plural = "Рекомендации"
+        ordering = ["-score"]
+        unique_together = ("user", "author")
+        indexes = [models.Index(fields=["user", "-score"])]
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="recommendations"
+    )
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="+"
+    )
+    score = models.FloatField("оценка")
+    # через скольких авторов из подписок и сколько общих групп
+    via_follows = models.PositiveIntegerField("через подписки", default=0)
+    shared_groups = models.PositiveIntegerField("общие группы", default=0)
+
+
+class RecommendationRun(models.Model):
+    """
+    Запуск пересчёта рекомендаций. last_follow_id — наибольший id
+    подписки на момент запуска: следующий пересчёт обновит только тех,
+    кого касаются более новые подписки.
+    """
+
+    class Meta:
+        verbose_name = "Пересчёт рекомендаций"
+        verbose_name_plural = "Пересчёты рекомендаций"
+        ordering = ["-pk"]
+
+    started = models.DateTimeField("начало", auto_now_add=True)
+    finished = models.DateTimeField("окончание", blank=True, null=True)
+    full = models.BooleanField("полный", default=False)
+    last_follow_id = models.IntegerField("последняя подписка", default=0)
+    users = models.PositiveIntegerField("пользователей", default=0)
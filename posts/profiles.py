@@ -0,0 +1,140 @@
+from django.core.paginator import Paginator
+from django.db.models import (
+    BooleanField,
+    Count,
+    Exists,
+    IntegerField,
+    OuterRef,
+    Prefetch,
+    Subquery,
+    Value,
+)
+from django.db.models.functions import Coalesce
+
+from .models import ArchivedComment, ArchivedPost, Comment, Follow, Post, User
+
+PROFILE_PAGE_SIZE = 4
+
+
+class PostsWithArchive:
+    """
+    Посты автора, а за ними его архивные посты. Архивные всегда старше,
+    поэтому общий порядок по -pub_date сохраняется. Срез для страницы
+    читает только ту таблицу, которой касается (на стыке — обе).
+    """
+
+    def __init__(self, posts, archived, posts_count, archived_count):
+        self.posts = posts
+        self.archived = archived
+        self.posts_count = posts_count
+        self.total = posts_count + archived_count
+
+    def count(self):
+        return self.total
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, index):
+        start, stop, _ = index.indices(self.total)
+        hot = self.posts_count
+        page = []
+        if start < hot:
+            page += list(self.posts[start : min(stop, hot)])
+        if stop > hot:
+            page += list(self.archived[max(start - hot, 0) : stop - hot])
+        return page
+
+
+def _count(queryset, field):
+    # COUNT по связанной таблице как подзапрос, без GROUP BY по пользователю
+    counted = (
+        queryset.filter(**{field: OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counted, output_field=IntegerField()), 0)
+
+
+def profile_counters(author, viewer=None):
+    """
+    Число постов (в том числе архивных), подписчиков и подписок автора и
+    признак подписки зрителя на автора — одним запросом.
+    """
+    if viewer is not None and viewer.is_authenticated:
+        is_following = Exists(
+            Follow.objects.filter(user=viewer, author=OuterRef("pk"))
+        )
+    else:
+        is_following = Value(False, output_field=BooleanField())
+    counters = (
+        User.objects.filter(pk=author.pk)
+        .annotate(
+            hot_count=_count(Post.objects, "author"),
+            archived_count=_count(ArchivedPost.objects, "author"),
+            followers_count=_count(Follow.objects, "author"),
+            following_count=_count(Follow.objects, "user"),
+            is_following=is_following,
+        )
+        .values(
+            "hot_count",
+            "archived_count",
+            "followers_count",
+            "following_count",
+            "is_following",
+        )
+        .get()
+    )
+    counters["posts_count"] = (
+        counters["hot_count"] + counters["archived_count"]
+    )
+    return counters
+
+
+def latest_comments(queryset, size):
+    """
+    Не больше size последних комментариев каждого поста. Лимит
+    применяется в базе коррелированным подзапросом, так что у популярного
+    поста не читаются все комментарии ради нескольких.
+    """
+    latest = (
+        queryset.filter(post=OuterRef("post"))
+        .order_by("-created", "-pk")
+        .values("pk")[:size]
+    )
+    return queryset.filter(pk__in=Subquery(latest)).select_related("author")
+
+
+def build_profile(author, viewer=None, page_number=None, comments=0):
+    """
+    Данные страницы профиля, общие для HTML-страницы и API: счётчики и
+    страница постов. Запросов всегда два (счётчики и посты; на стыке с
+    архивом — три), плюс запрос комментариев, если они нужны: comments —
+    сколько последних комментариев загрузить к каждому посту.
+    """
+    counters = profile_counters(author, viewer)
+    posts = author.posts.all()
+    archived = author.archived_posts.all()
+    if comments:
+        posts = posts.prefetch_related(
+            Prefetch(
+                "comments",
+                queryset=latest_comments(Comment.objects, comments),
+            )
+        )
+        archived = archived.prefetch_related(
+            Prefetch(
+                "comments",
+                queryset=latest_comments(ArchivedComment.objects, comments),
+            )
+        )
+    posts = PostsWithArchive(
+        posts, archived, counters["hot_count"], counters["archived_count"]
+    )
+    paginator = Paginator(posts, PROFILE_PAGE_SIZE)
+    # число постов уже известно, отдельный COUNT не нужен
+    paginator.count = counters["posts_count"]
+    page = paginator.get_page(page_number)
+    return dict(counters, paginator=paginator, page=page)
@@ -0,0 +1,202 @@
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from tasks.queue import task
+
+from .models import Comment, Follow, Post, Recommendation, RecommendationRun
+
+User = get_user_model()
+
+CONFIG = getattr(settings, "RECOMMENDATIONS", {})
+SIZE = CONFIG.get("SIZE", 10)
+CHUNK_SIZE = CONFIG.get("CHUNK_SIZE", 500)
+FOLLOW_WEIGHT = CONFIG.get("FOLLOW_WEIGHT", 1.0)
+GROUP_WEIGHT = CONFIG.get("GROUP_WEIGHT", 0.5)
+REFRESH = CONFIG.get("REFRESH", 60 * 60)
+REBUILD = CONFIG.get("REBUILD", 60 * 60 * 24)
+
+
+def friends_of_friends(user_ids):
+    """
+    {пользователь: Counter({автор: через скольких его авторов})} —
+    на кого подписаны те, на кого подписан пользователь. Один
+    агрегирующий запрос на пачку.
+    """
+    paths = defaultdict(Counter)
+    rows = (
+        Follow.objects.filter(
+            user_id__in=user_ids, author__follower__isnull=False
+        )
+        .values_list("user_id", "author__follower__author_id")
+        .annotate(paths=Count("pk"))
+    )
+    for user_id, author_id, count in rows:
+        paths[user_id][author_id] += count
+    return paths
+
+
+def group_neighbours(user_ids):
+    """
+    {пользователь: Counter({автор: число общих групп})}: группы, где
+    пользователь писал посты или комментарии, и другие авторы этих групп.
+    """
+    groups = defaultdict(set)
+    for user_id, group_id in (
+        Post.objects.filter(author_id__in=user_ids, group__isnull=False)
+        .values_list("author_id", "group_id")
+        .distinct()
+    ):
+        groups[user_id].add(group_id)
+    for user_id, group_id in (
+        Comment.objects.filter(
+            author_id__in=user_ids, post__group__isnull=False
+        )
+        .values_list("author_id", "post__group_id")
+        .distinct()
+    ):
+        groups[user_id].add(group_id)
+    all_groups = set().union(*groups.values())
+    authors = defaultdict(set)
+    for group_id, author_id in (
+        Post.objects.filter(group_id__in=all_groups)
+        .values_list("group_id", "author_id")
+        .distinct()
+    ):
+        authors[group_id].add(author_id)
+    shared = defaultdict(Counter)
+    for user_id, user_groups in groups.items():
+        for group_id in user_groups:
+            shared[user_id].update(authors[group_id])
+    return shared
+
+
+def build_chunk(user_ids):
+    """
+    Пересчитывает рекомендации пачки пользователей: кандидаты из подписок
+    подписок и общих групп без самого пользователя, его подписок и
+    заблокированных авторов; остаются SIZE лучших.
+    """
+    paths = friends_of_friends(user_ids)
+    shared = group_neighbours(user_ids)
+    followed = defaultdict(set)
+    for user_id, author_id in Follow.objects.filter(
+        user_id__in=user_ids
+    ).values_list("user_id", "author_id"):
+        followed[user_id].add(author_id)
+    candidates = set()
+    for counters in (paths, shared):
+        for counter in counters.values():
+            candidates.update(counter)
+    active = set(
+        User.objects.filter(pk__in=candidates, is_active=True).values_list(
+            "pk", flat=True
+        )
+    )
+    recommendations = []
+    for user_id in user_ids:
+        skip = followed[user_id] | {user_id}
+        scores = {
+            author_id: FOLLOW_WEIGHT * paths[user_id][author_id]
+            + GROUP_WEIGHT * shared[user_id][author_id]
+            for author_id in set(paths[user_id]) | set(shared[user_id])
+            if author_id in active and author_id not in skip
+        }
+        best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        recommendations += [
+            Recommendation(
+                user_id=user_id,
+                author_id=author_id,
+                score=score,
+                via_follows=paths[user_id][author_id],
+                shared_groups=shared[user_id][author_id],
+            )
+            for author_id, score in best[:SIZE]
+        ]
+    with transaction.atomic():
+        Recommendation.objects.filter(user_id__in=user_ids).delete()
+        Recommendation.objects.bulk_create(recommendations)
+    return len(recommendations)
+
+
+def chunks(user_ids, size):
+    user_ids = sorted(user_ids)
+    for start in range(0, len(user_ids), size):
+        yield user_ids[start : start + size]
+
+
+def all_users(size):
+    # пачки по первичному ключу, без OFFSET
+    last = 0
+    while True:
+        user_ids = list(
+            User.objects.filter(pk__gt=last, is_active=True)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:size]
+        )
+        if not user_ids:
+            return
+        yield user_ids
+        last = user_ids[-1]
+
+
+def affected_users(watermark):
+    """
+    Пользователи, чьи рекомендации могли измениться из-за подписок с
+    id больше watermark: сами подписавшиеся и подписчики подписавшихся.
+    """
+    new = Follow.objects.filter(pk__gt=watermark)
+    users = set(new.values_list("user_id", flat=True))
+    users.update(
+        Follow.objects.filter(author_id__in=users).values_list(
+            "user_id", flat=True
+        )
+    )
+    return users
+
+
+def build_recommendations(full=False, chunk_size=CHUNK_SIZE):
+    """
+    Пересчитывает рекомендации. Без full обновляются только
+    пользователи, затронутые подписками с прошлого запуска; если
+    запусков ещё не было, пересчёт полный. Возвращает RecommendationRun.
+    """
+    previous = RecommendationRun.objects.exclude(finished=None).first()
+    full = full or previous is None
+    run = RecommendationRun.objects.create(
+        full=full,
+        last_follow_id=Follow.objects.aggregate(last=Max("pk"))["last"] or 0,
+    )
+    if full:
+        batches = all_users(chunk_size)
+    else:
+        users = affected_users(previous.last_follow_id)
+        batches = chunks(users, chunk_size)
+    for user_ids in batches:
+        build_chunk(user_ids)
+        run.users += len(user_ids)
+    run.finished = timezone.now()
+    run.save(update_fields=["users", "finished"])
+    return run
+
+
+@task(every=REFRESH)
+def refresh_recommendations():
+    build_recommendations()
+
+
+@task(every=REBUILD)
+def rebuild_recommendations():
+    # отписки и активность в группах учитываются только полным пересчётом
+    build_recommendations(full=True)
+
+
+def recommendations_for(user, limit=SIZE):
+    if not user.is_authenticated:
+        return []
+    recommendations = Recommendation.objects.filter(user=user)
+    return list(recommendations.select_related("author")[:limit])
@@ -0,0 +1,120 @@
+from django.contrib.auth import get_user_model
+from django.contrib.flatpages.models import FlatPage
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save,
+)
+from django.dispatch import Signal, receiver
+
+from .activity import record_activity
+from .caching import bump_post_cards
+from .flatpages import invalidate_flatpages, warm_flatpages
+from .models import ActivityCounter, Comment, Follow, Post, Recommendation
+from .tasks import generate_thumbnail
+from .usernames import (
+    AUTHOR_FIELDS,
+    forget_author,
+    forget_username,
+    remember_username,
+)
+
+User = get_user_model()
+
+# отправляется после массовой загрузки: bulk_create не вызывает post_save,
+# поэтому кеши, зависящие от постов, сбрасываются по этому сигналу
+data_imported = Signal(providing_args=["stats"])
+# отправляется, когда посты скрыты или удалены в обход Collector
+posts_removed = Signal(providing_args=["post_ids"])
+
+
+def username_changed(instance):
+    previous = getattr(instance, "_previous_username", None)
+    return previous is not None and previous != instance.username
+
+
+# запоминаем прежний username, чтобы после сохранения понять,
+# был ли пользователь переименован
+@receiver(pre_save, sender=User)
+def store_previous_username(sender, instance, update_fields=None, **kwargs):
+    instance._previous_username = None
+    if instance.pk is None:
+        return
+    if update_fields is not None and "username" not in update_fields:
+        return
+    instance._previous_username = (
+        User.objects.filter(pk=instance.pk)
+        .values_list("username", flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_card(sender, instance, **kwargs):
+    bump_post_cards([instance.pk])
+
+
+# миниатюра готовится в фоне, а не при первом показе поста
+@receiver(post_save, sender=Post)
+def schedule_thumbnail(sender, instance, **kwargs):
+    if instance.image:
+        generate_thumbnail.enqueue_on_commit(
+            instance.pk, key=f"thumbnail:{instance.pk}:{instance.image.name}"
+        )
+
+
+@receiver(post_save, sender=Comment)
+def count_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        record_activity(instance.post, ActivityCounter.COMMENT)
+
+
+# автор, на которого подписались, больше не предлагается; остальное
+# обновит следующий пересчёт рекомендаций
+@receiver(post_save, sender=Follow)
+def drop_recommendation(sender, instance, created, **kwargs):
+    if created:
+        Recommendation.objects.filter(
+            user_id=instance.user_id, author_id=instance.author_id
+        ).delete()
+
+
+@receiver(post_save, sender=User)
+def update_known_usernames(
+    sender, instance, created, update_fields=None, **kwargs
+):
+    if created or username_changed(instance):
+        remember_username(instance.username)
+    if username_changed(instance):
+        forget_username(instance._previous_username)
+    if update_fields is None or set(update_fields) & set(AUTHOR_FIELDS):
+        forget_author(instance.username)
+
+
+@receiver(post_delete, sender=User)
+def forget_deleted_username(sender, instance, **kwargs):
+    forget_username(instance.username)
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_cards(sender, instance, created, **kwargs):
+    if created or not username_changed(instance):
+        return
+    bump_post_cards(
+        Post.objects.filter(author=instance).values_list("pk", flat=True)
+    )
+
+
+# после правки страницы в админке сбрасываем кеш и прогреваем его заново,
+# когда транзакция (вместе с привязкой к сайтам) будет зафиксирована
+@receiver(post_save, sender=FlatPage)
+@receiver(post_delete, sender=FlatPage)
+@receiver(m2m_changed, sender=FlatPage.sites.through)
+def refresh_flatpages(sender, action=None, **kwargs):
+    if action is not None and not action.startswith("post_"):
+        return
+    invalidate_flatpages()
+    transaction.on_commit(warm_flatpages)
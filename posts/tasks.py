@@ -0,0 +1,17 @@
+from sorl.thumbnail import get_thumbnail
+
+from tasks.queue import task
+
+from .models import Post
+
+# параметры должны совпадать с тегом {% thumbnail %} в шаблонах,
+# иначе шаблон не найдёт готовую миниатюру
+THUMBNAIL_GEOMETRY = "960x339"
+THUMBNAIL_OPTIONS = {"crop": "center", "upscale": True}
+
+
+@task(priority=10)
+def generate_thumbnail(post_id):
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None and post.image:
+        get_thumbnail(post.image, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS)
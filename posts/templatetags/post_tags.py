@@ -0,0 +1,15 @@
+from django import template
+
+from posts.caching import POST_CARD_CACHE_TIMEOUT, post_card_version
+
+register = template.Library()
+
+
+@register.simple_tag
+def card_version(post):
+    return post_card_version(post.pk)
+
+
+@register.simple_tag
+def card_cache_timeout():
+    return POST_CARD_CACHE_TIMEOUT
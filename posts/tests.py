@@ -1,8 +1,78 @@
-from django.test import Client, TestCase
+import csv
+import gzip
+import json
+import os
+import tempfile
+import threading
+import zlib
+from datetime import timedelta
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.flatpages.models import FlatPage
+from django.contrib.sites.models import Site
+from django.http import HttpResponse, StreamingHttpResponse
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.core.cache import cache
-from posts.models import Group, Post, User, Follow, Comment
+from django.core.cache import cache, caches
+from django.core.paginator import Paginator
+from django.core.management import call_command
+from posts.activity import (
+    CounterBuffer,
+    activity_buffer,
+    refresh_trending,
+    save_activity,
+    save_views,
+    view_buffer,
+)
+from posts.admin import DeferredDeletionMixin, EstimatedCountPaginator
+from posts.deletion import (
+    purge_hidden_posts,
+    purge_user,
+    schedule_user_deletion,
+)
+from posts.export import iter_export
+from posts.imports import Importer, open_source, read_records
+from posts.management.commands.profile_startup import parse_importtime
+from posts.recommendations import build_recommendations
+from posts.models import (
+    ActivityCounter,
+    ArchivedComment,
+    ArchivedPost,
+    Group,
+    Post,
+    Recommendation,
+    User,
+    Follow,
+    Comment,
+    TrendingEntry,
+)
+from posts.throttling import SlidingWindowCounter
+from rest_framework.authtoken.models import Token
+from posts.signals import posts_removed
+from posts.usernames import BloomFilter
+from tasks.models import Task
+from yatube.db import check_connections
+from yatube.middleware import (
+    STICKY_COOKIE,
+    AdmissionController,
+    AdmissionControlMiddleware,
+    CompressionMiddleware,
+)
+from yatube.routers import ReplicaRouter, replica_reads
+from yatube.staticfiles import StaticFilesApplication
+from yatube.storage import CompressedManifestStaticFilesStorage
+from yatube.warmup import STEPS as WARMUP_STEPS, format_report, warm_up
+
+try:
+    import psycopg2
+except ImportError:  # пул соединений есть только для PostgreSQL
+    psycopg2 = None
 
 
 class ProfileTest(TestCase):
@@ -336,3 +406,1172 @@ class TestComment(TestCase):
                 text=self.test_text, author=self.second_author
             ).exists()
         )
+
+
+class TestPostCardCache(TestCase):
+    """
+    Проверка фрагментного кеширования карточек постов.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="sarah_card", password="12345"
+        )
+        self.reader = User.objects.create_user(
+            username="reader_card", password="12345"
+        )
+        self.post = Post.objects.create(author=self.user, text="card text")
+        self.url = reverse("profile", args=(self.user.username,))
+
+    def test_card_updated_after_edit(self):
+        """ Отредактированный пост сразу виден на странице профиля """
+        self.assertContains(self.client.get(self.url), "card text")
+        self.post.text = "edited card text"
+        self.post.save()
+        self.assertContains(self.client.get(self.url), "edited card text")
+
+    def test_card_updated_after_author_rename(self):
+        """ Новое имя автора попадает в закешированные карточки """
+        self.assertContains(self.client.get(self.url), "@sarah_card")
+        self.user.username = "sarah_renamed"
+        self.user.save()
+        response = self.client.get(
+            reverse("profile", args=(self.user.username,))
+        )
+        self.assertContains(response, "@sarah_renamed")
+
+    def test_edit_link_rendered_per_user(self):
+        """ Ссылка на редактирование не попадает в общий кеш """
+        author_client = Client()
+        author_client.force_login(self.user)
+        reader_client = Client()
+        reader_client.force_login(self.reader)
+        self.assertContains(author_client.get(self.url), "Редактировать")
+        self.assertNotContains(reader_client.get(self.url), "Редактировать")
+
+    def test_author_link_same_on_every_page(self):
+        """ Ссылка на автора в кешированной карточке не зависит от страницы """
+        Follow.objects.create(user=self.reader, author=self.user)
+        self.client.force_login(self.reader)
+        self.client.get(reverse("follow_index"))
+        response = self.client.get(self.url)
+        self.assertContains(response, f'<a href="{self.url}">')
+
+
+class TestFlatpageCache(TestCase):
+    """
+    Проверка кеширования статических страниц.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.flatpage = FlatPage.objects.create(
+            url="/about-us/", title="О нас", content="about us content"
+        )
+        self.flatpage.sites.add(Site.objects.get_current())
+        self.url = reverse("about")
+
+    def test_anonymous_page_served_from_cache(self):
+        """ Повторный запрос анонима не обращается к базе """
+        response = self.client.get(self.url)
+        self.assertContains(response, "about us content")
+        self.assertIn("public", response["Cache-Control"])
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertContains(response, "about us content")
+
+    def test_page_invalidated_on_save(self):
+        """ После сохранения страницы отдаётся новое содержимое """
+        self.client.get(self.url)
+        self.flatpage.content = "new about us content"
+        self.flatpage.save()
+        self.assertContains(self.client.get(self.url), "new about us content")
+
+    def test_authorized_page_is_private(self):
+        """ Страница с именем пользователя в шапке не кешируется публично """
+        user = User.objects.create_user(username="flat_user", password="1")
+        self.client.force_login(user)
+        response = self.client.get(self.url)
+        self.assertContains(response, "flat_user")
+        self.assertIn("private", response["Cache-Control"])
+
+
+class TestUnknownUsername(TestCase):
+    """
+    Проверка отсечения запросов к несуществующим пользователям.
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_bloom_filter(self):
+        """ Фильтр не теряет добавленные имена """
+        bloom = BloomFilter(100)
+        names = [f"user{i}" for i in range(100)]
+        for name in names:
+            bloom.add(name)
+        self.assertTrue(all(name in bloom for name in names))
+        misses = sum(f"bot{i}" in bloom for i in range(1000))
+        self.assertLess(misses, 50)
+
+    @override_settings(SHARED_CACHE=True)
+    def test_unknown_username_without_queries(self):
+        """ Неизвестное имя получает 404 без обращения к базе """
+        self.client.get("/warm-up/")
+        with self.assertNumQueries(0):
+            response = self.client.get("/wp-admin/")
+        self.assertEqual(response.status_code, 404)
+        self.assertContains(response, "/wp-admin/", status_code=404)
+
+    def test_unknown_username_checked_once(self):
+        """ Без общего кеша отсутствие имени проверяется по базе один раз """
+        self.client.get("/warm-up/")
+        with self.assertNumQueries(1):
+            response = self.client.get("/wp-admin/")
+        self.assertEqual(response.status_code, 404)
+        with self.assertNumQueries(0):
+            self.client.get("/wp-admin/")
+
+    def test_user_from_other_process_available(self):
+        """ Пользователь, которого нет в фильтре процесса, не получает 404 """
+        self.client.get("/warm-up/")
+        User.objects.bulk_create([User(username="elsewhere")])
+        response = self.client.get(reverse("profile", args=("elsewhere",)))
+        self.assertEqual(response.status_code, 200)
+
+    def test_new_user_profile_available(self):
+        """ Профиль только что зарегистрированного пользователя доступен """
+        self.client.get("/newcomer/")
+        User.objects.create_user(username="newcomer", password="12345")
+        response = self.client.get(reverse("profile", args=("newcomer",)))
+        self.assertEqual(response.status_code, 200)
+
+
+class TestAuthorCache(TestCase):
+    """
+    Проверка кеша соответствия имени пользователя и автора.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username="cached_author", password="12345"
+        )
+        self.other = User.objects.create_user(
+            username="other_author", password="12345"
+        )
+        self.post = Post.objects.create(author=self.user, text="cached")
+
+    def test_post_of_other_author_not_found(self):
+        """ Пост не открывается по имени чужого автора """
+        response = self.client.get(
+            reverse("post", args=(self.other.username, self.post.pk))
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_rename_invalidates_cache(self):
+        """ После переименования старое имя перестаёт работать """
+        old_url = reverse("profile", args=(self.user.username,))
+        self.assertEqual(self.client.get(old_url).status_code, 200)
+        self.user.username = "renamed_author"
+        self.user.save()
+        self.assertEqual(self.client.get(old_url).status_code, 404)
+        response = self.client.get(
+            reverse("post", args=(self.user.username, self.post.pk))
+        )
+        self.assertContains(response, "cached")
+
+    def test_full_name_change_visible(self):
+        """ Изменение имени и фамилии сразу видно на странице профиля """
+        url = reverse("profile", args=(self.user.username,))
+        self.client.get(url)
+        self.user.first_name = "Sarah"
+        self.user.last_name = "Connor"
+        self.user.save()
+        self.assertContains(self.client.get(url), "Sarah Connor")
+
+
+class TestReplicaRouting(TestCase):
+    """
+    Проверка распределения запросов между основной базой и репликами.
+    """
+
+    @override_settings(REPLICA_DATABASES=["replica_1"])
+    def test_reads_go_to_replica_until_write(self):
+        """ После записи чтение возвращается на основную базу """
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_read(Post), "default")
+        with replica_reads():
+            self.assertEqual(router.db_for_read(Post), "replica_1")
+            self.assertEqual(router.db_for_write(Post), "default")
+            self.assertEqual(router.db_for_read(Post), "default")
+
+    @override_settings(REPLICA_DATABASES=["default"])
+    def test_write_pins_client_to_primary(self):
+        """ После публикации поста клиент закрепляется за основной базой """
+        user = User.objects.create_user(username="replica", password="1")
+        self.client.force_login(user)
+        response = self.client.post(reverse("new_post"), {"text": "text"})
+        self.assertIn(STICKY_COOKIE, response.cookies)
+        response = self.client.get(reverse("profile", args=("replica",)))
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+
+class TestAdmissionControl(TestCase):
+    """
+    Проверка сброса нагрузки при превышении лимита запросов.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+
+    def test_controller_rejects_when_queue_full(self):
+        """ При заполненной очереди запрос отклоняется сразу """
+        controller = AdmissionController(1, 0, 1.0)
+        self.assertIsNone(controller.acquire(0))
+        self.assertIsNotNone(controller.acquire(0))
+        controller.release(0.01)
+        self.assertIsNone(controller.acquire(0))
+
+    @override_settings(ADMISSION_CONTROL={"CONCURRENCY": 1, "QUEUE_SIZE": 0})
+    def test_overload_returns_503_or_stale_feed(self):
+        """ Перегрузка: 503 с Retry-After, аноним получает копию ленты """
+        middleware = AdmissionControlMiddleware(
+            lambda request: HttpResponse("feed page")
+        )
+        middleware(self.factory.get("/"))
+        middleware.controller.acquire(0)
+        response = middleware(self.factory.get("/"))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "feed page")
+        response = middleware(self.factory.post("/new/"))
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("Retry-After", response)
+
+    @override_settings(ADMISSION_CONTROL={"STALE_ENTRIES": 2})
+    def test_stale_copies_bounded(self):
+        """ Копии ленты различаются только номером страницы """
+        middleware = AdmissionControlMiddleware(
+            lambda request: HttpResponse("feed page")
+        )
+        for query in ("?utm=1", "?utm=2", "?page=2", "?page=3", "?page=x"):
+            middleware(self.factory.get("/" + query))
+        self.assertEqual(
+            middleware.stale_key(self.factory.get("/?utm=1")),
+            middleware.stale_key(self.factory.get("/")),
+        )
+        self.assertEqual(
+            list(middleware.stale_saved),
+            [
+                middleware.stale_key(self.factory.get(f"/?page={page}"))
+                for page in (2, 3)
+            ],
+        )
+
+
+class TestThrottling(TestCase):
+    """
+    Проверка ограничения частоты запросов.
+    """
+
+    def setUp(self):
+        caches["throttle"].clear()
+        self.user = User.objects.create_user(username="spammer", password="1")
+        self.client.force_login(self.user)
+
+    def test_sliding_window_counter(self):
+        """ Запросы сверх лимита получают время ожидания """
+        counter = SlidingWindowCounter("test", "3/min")
+        for _ in range(3):
+            self.assertIsNone(counter.hit("client"))
+        wait = counter.hit("client")
+        self.assertGreater(wait, 0)
+        self.assertLessEqual(wait, 60)
+        self.assertIsNone(counter.hit("other client"))
+
+    def test_one_cache_call_per_check(self):
+        """ После первой проверки в окне запрос стоит одного incr """
+        counter = SlidingWindowCounter("test", "10/min")
+        throttle_cache = mock.Mock(wraps=caches["throttle"])
+        with mock.patch.object(
+            SlidingWindowCounter, "cache", throttle_cache
+        ), mock.patch("posts.throttling.time") as clock:
+            clock.time.return_value = 120.0
+            counter.hit("client")
+            self.assertEqual(len(throttle_cache.method_calls), 2)
+            throttle_cache.reset_mock()
+            counter.hit("client")
+        self.assertEqual(
+            [call[0] for call in throttle_cache.method_calls], ["incr"]
+        )
+
+    def test_counters_in_throttle_cache(self):
+        """ Счётчики хранятся в отдельном кеше throttle """
+        counter = SlidingWindowCounter("test", "3/min")
+        with mock.patch("posts.throttling.time") as clock:
+            clock.time.return_value = 120.0
+            counter.hit("client")
+        key = counter.key("client", 2)
+        self.assertEqual(caches["throttle"].get(key), 1)
+        cache.clear()
+        self.assertEqual(caches["throttle"].get(key), 1)
+
+    @override_settings(THROTTLE_RATES={"post_create": "1/min"})
+    def test_new_post_throttled(self):
+        """ Слишком частая публикация постов получает 429 """
+        self.client.post(reverse("new_post"), {"text": "first"})
+        response = self.client.post(reverse("new_post"), {"text": "second"})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+        self.assertFalse(Post.objects.filter(text="second").exists())
+
+    def test_token_endpoint_throttled(self):
+        """ Выдача токенов ограничена по IP """
+        rates = dict(settings.THROTTLE_RATES, login="1/min")
+        with self.settings(THROTTLE_RATES=rates):
+            credentials = {"username": "spammer", "password": "1"}
+            response = self.client.post("/api/v1/api-token-auth/", credentials)
+            self.assertEqual(response.status_code, 200)
+            response = self.client.post("/api/v1/api-token-auth/", credentials)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+
+
+class TestExport(TestCase):
+    """
+    Проверка потоковой выгрузки данных.
+    """
+
+    def setUp(self):
+        self.author = User.objects.create_user(username="writer", password="1")
+        group = Group.objects.create(title="g", slug="g", description="g")
+        self.post = Post.objects.create(
+            author=self.author, text="экспорт", group=group
+        )
+        Comment.objects.create(post=self.post, author=self.author, text="c")
+
+    def test_command_writes_gzipped_jsonl(self):
+        """ Команда пишет все модели в JSON Lines с естественными ключами """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "export.jsonl.gz")
+            call_command("export_data", "--gzip", "--output", path)
+            with gzip.open(path, "rt", encoding="utf-8") as export:
+                records = [json.loads(line) for line in export]
+        self.assertEqual(
+            [record["model"] for record in records],
+            ["group", "post", "comment"],
+        )
+        self.assertEqual(records[1]["author"], "writer")
+        self.assertEqual(records[1]["group"], "g")
+        self.assertEqual(records[1]["text"], "экспорт")
+
+    def test_endpoint_for_staff_only(self):
+        """ Выгрузка по HTTP доступна только персоналу и идёт потоком """
+        url = reverse("export_data")
+        self.client.force_login(self.author)
+        response = self.client.get(url, {"model": "post", "format": "csv"})
+        self.assertEqual(response.status_code, 302)
+        self.author.is_staff = True
+        self.author.save()
+        self.client.force_login(self.author)
+        response = self.client.get(url, {"model": "post", "format": "csv"})
+        self.assertTrue(response.streaming)
+        rows = list(
+            csv.reader(
+                b"".join(response.streaming_content).decode().splitlines()
+            )
+        )
+        self.assertEqual(rows[0][:2], ["id", "text"])
+        self.assertEqual(rows[1][1], "экспорт")
+
+    def test_import_round_trip(self):
+        """ Выгрузка загружается обратно с исходными датами и группами """
+        pub_date = self.post.pub_date
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "export.jsonl")
+            call_command("export_data", "--output", path)
+            Group.objects.all().delete()
+            Post.objects.all().delete()
+            call_command("import_data", path, "--batch-size", "2")
+            self.assertFalse(os.path.exists(f"{path}.checkpoint"))
+        post = Post.objects.get()
+        self.assertEqual(post.text, self.post.text)
+        self.assertEqual(post.pub_date, pub_date)
+        self.assertEqual(post.group.slug, "g")
+        self.assertEqual(post.comments.get().text, "c")
+
+    def test_import_with_colliding_ids(self):
+        """ Строки выгрузки с занятыми id получают новые id и свои связи """
+        User.objects.create_user(username="bob")
+        records = [
+            {
+                "model": "post",
+                "id": self.post.pk,
+                "text": "пост bob",
+                "author": "bob",
+                "pub_date": "2020-01-02T03:04:05+00:00",
+            },
+            {
+                "model": "comment",
+                "id": 1,
+                "post": self.post.pk,
+                "author": "bob",
+                "text": "ответ",
+                "created": "2020-01-02T04:00:00+00:00",
+            },
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "dump.jsonl")
+            with open(path, "w") as dump:
+                for record in records:
+                    dump.write(json.dumps(record) + "\n")
+            with open_source(path) as source:
+                stats = Importer().run(read_records(source))
+        self.assertEqual(stats["post"], 1)
+        self.assertEqual(stats["comment"], 1)
+        post = Post.objects.get(author__username="bob")
+        self.assertNotEqual(post.pk, self.post.pk)
+        self.assertEqual(post.pub_date.year, 2020)
+        self.assertEqual(post.comments.get().text, "ответ")
+        self.assertEqual(self.post.comments.get().text, "c")
+        self.assertTrue(Post._meta.get_field("pub_date").auto_now_add)
+
+    def test_export_archived_and_skips_hidden(self):
+        """ Архив выгружается, скрытые посты — без своих комментариев """
+        hidden = Post.objects.create(author=self.author, text="скрытый")
+        Comment.objects.create(post=hidden, author=self.author, text="h")
+        Post.all_objects.filter(pk=hidden.pk).update(hidden=True)
+        archived = ArchivedPost.objects.create(
+            id=hidden.pk + 1,
+            author=self.author,
+            text="архив",
+            pub_date=self.post.pub_date,
+        )
+        ArchivedComment.objects.create(
+            id=1000,
+            post=archived,
+            author=self.author,
+            text="a",
+            created=self.post.pub_date,
+        )
+        records = [
+            json.loads(line) for line in iter_export(["post", "comment"])
+        ]
+        self.assertEqual(
+            [(record["model"], record["text"]) for record in records],
+            [
+                ("post", "экспорт"),
+                ("post", "архив"),
+                ("comment", "c"),
+                ("comment", "a"),
+            ],
+        )
+
+    def test_import_csv_in_two_runs(self):
+        """ Комментарии из отдельного CSV находят посты прошлой загрузки """
+        with tempfile.TemporaryDirectory() as directory:
+            for model in ("post", "comment"):
+                path = os.path.join(directory, f"{model}s.csv")
+                call_command(
+                    "export_data",
+                    "--format=csv",
+                    f"--model={model}",
+                    f"--output={path}",
+                )
+            Post.objects.all().delete()
+            for model in ("post", "comment"):
+                call_command(
+                    "import_data",
+                    os.path.join(directory, f"{model}s.csv"),
+                    "--format=csv",
+                    f"--model={model}",
+                )
+        post = Post.objects.get()
+        self.assertNotEqual(post.pk, self.post.pk)
+        self.assertEqual(post.comments.get().text, "c")
+
+    def test_import_skips_malformed_date(self):
+        """ Запись с неразборчивой датой пропускается, пачка загружается """
+        records = [
+            {"model": "post", "id": number, "author": "writer", **record}
+            for number, record in enumerate(
+                [
+                    {"text": "плохая дата", "pub_date": "вчера"},
+                    {"text": "нет месяца", "pub_date": "2020-13-01T00:00"},
+                    {"text": "хорошая дата", "pub_date": "2020-01-02T03:04"},
+                ]
+            )
+        ]
+        stats = Importer().run(records)
+        self.assertEqual(stats["post"], 1)
+        self.assertEqual(stats["skipped"], 2)
+        self.assertTrue(Post.objects.filter(text="хорошая дата").exists())
+
+    def test_import_resumes_from_checkpoint(self):
+        """ Загрузка продолжается с записи после контрольной точки """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "export.jsonl")
+            call_command("export_data", "--output", path)
+            Group.objects.all().delete()
+            Post.objects.all().delete()
+            with open(f"{path}.checkpoint", "w") as checkpoint:
+                json.dump({"position": 1}, checkpoint)
+            call_command("import_data", path)
+        self.assertFalse(Group.objects.exists())
+        self.assertIsNone(Post.objects.get().group)
+
+
+class TestDeferredDeletion(TestCase):
+    """
+    Проверка фонового удаления постов и пользователей.
+    """
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username="admin", email="admin@yatube.ru", password="1"
+        )
+        self.author = User.objects.create_user(username="prolific")
+        self.reader = User.objects.create_user(username="reader")
+        Follow.objects.create(user=self.reader, author=self.author)
+        for number in range(3):
+            post = Post.objects.create(author=self.author, text=str(number))
+            Comment.objects.create(post=post, author=self.reader, text="c")
+        self.post = post
+
+    def test_admin_hides_post_until_purged(self):
+        """ Удалённый в админке пост скрыт сразу, а удаляется в фоне """
+        self.client.force_login(self.admin)
+        url = reverse("admin:posts_post_delete", args=[self.post.pk])
+        self.client.post(url, {"post": "yes"})
+        self.assertFalse(Post.objects.filter(pk=self.post.pk).exists())
+        self.assertTrue(Post.all_objects.filter(pk=self.post.pk).exists())
+        purge_hidden_posts()
+        self.assertFalse(Post.all_objects.filter(pk=self.post.pk).exists())
+        self.assertFalse(Comment.objects.filter(post_id=self.post.pk).exists())
+        self.assertEqual(Post.objects.count(), 2)
+
+    def test_purge_signals_only_removed_posts(self):
+        """ Сигнал об удалении отправляется, только если посты удалены """
+        handler = mock.Mock()
+        posts_removed.connect(handler)
+        self.addCleanup(posts_removed.disconnect, handler)
+        purge_hidden_posts()
+        handler.assert_not_called()
+        Post.all_objects.filter(pk=self.post.pk).update(hidden=True)
+        purge_hidden_posts()
+        self.assertEqual(handler.call_args[1]["post_ids"], [self.post.pk])
+
+    def test_mixin_deletes_without_scheduler(self):
+        """ Модель без фонового удаления удаляется из админки сразу """
+
+        class GroupAdmin(DeferredDeletionMixin, admin.ModelAdmin):
+            pass
+
+        group = Group.objects.create(title="g", slug="g")
+        GroupAdmin(Group, admin.site).delete_model(None, group)
+        self.assertFalse(Group.objects.exists())
+
+    def test_user_deleted_in_chunks(self):
+        """ Пользователь удаляется пачками за несколько запусков задачи """
+        schedule_user_deletion([self.author.pk])
+        self.author.refresh_from_db()
+        self.assertFalse(self.author.is_active)
+        self.assertFalse(Post.objects.filter(author=self.author).exists())
+        with mock.patch("posts.deletion.DELETE_CHUNK_SIZE", 1), mock.patch(
+            "posts.deletion.DELETE_CHUNKS_PER_RUN", 2
+        ):
+            purge_user(self.author.pk)
+            self.assertTrue(User.objects.filter(pk=self.author.pk).exists())
+            self.assertTrue(Task.objects.filter(name=purge_user.task_name))
+            for _ in range(5):
+                purge_user(self.author.pk)
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertFalse(Post.all_objects.exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Follow.objects.exists())
+
+
+class TestAdminChangelist(TestCase):
+    """
+    Проверка списков админки на больших таблицах.
+    """
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username="admin", email="admin@yatube.ru", password="1"
+        )
+        self.client.force_login(self.admin)
+
+    def create_comments(self, count):
+        for _ in range(count):
+            number = User.objects.count()
+            author = User.objects.create_user(username=f"user{number}")
+            post = Post.objects.create(author=author, text=str(number))
+            Comment.objects.create(post=post, author=author, text="c")
+            Follow.objects.create(user=self.admin, author=author)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def test_constant_number_of_queries(self):
+        """ Число запросов не зависит от числа строк на странице """
+        urls = [
+            reverse(f"admin:posts_{model}_changelist")
+            for model in ("post", "comment", "follow")
+        ]
+        self.create_comments(2)
+        # первый запрос ещё загружает сессию
+        self.count_queries(urls[0])
+        before = [self.count_queries(url) for url in urls]
+        self.create_comments(20)
+        after = [self.count_queries(url) for url in urls]
+        self.assertEqual(before, after)
+
+    def test_post_list_uses_estimate(self):
+        """ Без фильтров список постов показывает оценку числа строк """
+        url = reverse("admin:posts_post_changelist")
+        with mock.patch.object(
+            EstimatedCountPaginator, "estimated_count", return_value=20000
+        ):
+            response = self.client.get(url)
+            self.assertEqual(response.context["cl"].result_count, 20000)
+            response = self.client.get(url, {"q": "text"})
+            self.assertEqual(response.context["cl"].result_count, 0)
+
+    def test_keyset_page_matches_offset_page(self):
+        """ Страница, прочитанная от прошлой или по индексу, та же """
+        cache.clear()
+        author = User.objects.create_user(username="author")
+        for number in range(7):
+            Post.objects.create(author=author, text=str(number))
+        queryset = Post.objects.order_by("-pk")
+        expected = list(Paginator(queryset, 3).page(3))
+        self.assertEqual(
+            list(EstimatedCountPaginator(queryset, 3).page(3)), expected
+        )
+        cache.clear()
+        for number in (1, 2, 3):
+            paginator = EstimatedCountPaginator(queryset, 3)
+            with CaptureQueriesContext(connection) as queries:
+                page = list(paginator.page(number))
+            self.assertEqual(page, list(Paginator(queryset, 3).page(number)))
+            self.assertNotIn("OFFSET", queries[-1]["sql"])
+        self.assertEqual(page, expected)
+
+    def test_filtered_count_beyond_limit(self):
+        """ С фильтром число строк сверх точного подсчёта не урезается """
+        author = User.objects.create_user(username="author")
+        for number in range(5):
+            Post.objects.create(author=author, text=str(number))
+        queryset = Post.objects.filter(author=author)
+        with mock.patch("posts.admin.EXACT_COUNT_LIMIT", 2):
+            self.assertEqual(EstimatedCountPaginator(queryset, 2).count, 5)
+            with mock.patch.object(
+                EstimatedCountPaginator, "planned_count", return_value=40
+            ):
+                paginator = EstimatedCountPaginator(queryset, 2)
+                self.assertEqual(paginator.count, 40)
+
+
+class TestStaticPipeline(TestCase):
+    """
+    Проверка сборки и раздачи статики.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        self.storage = CompressedManifestStaticFilesStorage(
+            location=self.root, base_url="/static/"
+        )
+        with open(os.path.join(self.root, "site.css"), "w") as css:
+            css.write("body { color: black; }\n" * 200)
+
+    def get(self, path, **environ):
+        def django_app(environ, start_response):
+            start_response("404 Not Found", [])
+            return []
+
+        app = StaticFilesApplication(django_app, self.root, "/static/")
+        response = {}
+
+        def start_response(status, headers):
+            response["status"] = status
+            response["headers"] = dict(headers)
+
+        environ.update(REQUEST_METHOD="GET", PATH_INFO=path)
+        body = b"".join(app(environ, start_response))
+        return response["status"], response["headers"], body
+
+    def test_hashed_and_compressed(self):
+        """ Сборка даёт имя с хешем, манифест и сжатый вариант """
+        paths = {"site.css": (self.storage, "site.css")}
+        list(self.storage.post_process(paths))
+        hashed = self.storage.stored_name("site.css")
+        self.assertRegex(hashed, r"^site\.[0-9a-f]{12}\.css$")
+        self.assertTrue(self.storage.exists(hashed + ".gz"))
+
+        status, headers, body = self.get(
+            f"/static/{hashed}", HTTP_ACCEPT_ENCODING="gzip, deflate"
+        )
+        self.assertEqual(status, "200 OK")
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertIn("immutable", headers["Cache-Control"])
+        self.assertIn(b"color: black", gzip.decompress(body))
+
+        status, headers, _ = self.get(
+            f"/static/{hashed}", HTTP_ACCEPT_ENCODING="gzip;q=0"
+        )
+        self.assertNotIn("Content-Encoding", headers)
+
+    def test_missing_manifest_falls_back(self):
+        """ Без собранной статики шаблоны получают исходное имя """
+        self.assertEqual(self.storage.url("site.css"), "/static/site.css")
+        status, _, _ = self.get("/static/../settings.py")
+        self.assertEqual(status, "404 Not Found")
+
+
+class TestCompression(TestCase):
+    """
+    Проверка сжатия ответов.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING="gzip")
+
+    def process(self, response):
+        return CompressionMiddleware(lambda request: response)(self.request)
+
+    def test_page_compressed(self):
+        """ Страница профиля отдаётся сжатой, если клиент принимает gzip """
+        user = User.objects.create_user(username="reader")
+        response = self.client.get(
+            reverse("profile", args=[user.username]),
+            HTTP_ACCEPT_ENCODING="gzip",
+        )
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        self.assertIn("reader", gzip.decompress(response.content).decode())
+
+    def test_small_and_encoded_skipped(self):
+        """ Маленькие и уже сжатые ответы не сжимаются повторно """
+        response = self.process(HttpResponse("short"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+        response = HttpResponse(b"x" * 4096, content_type="application/gzip")
+        self.assertFalse(self.process(response).has_header("Content-Encoding"))
+
+    def test_stream_flushed_per_chunk(self):
+        """ Каждое событие потока можно распаковать сразу по получении """
+        events = [f"data: {number}\n\n".encode() for number in range(3)]
+        response = self.process(
+            StreamingHttpResponse(
+                iter(events), content_type="text/event-stream"
+            )
+        )
+        decompressor = zlib.decompressobj(31)
+        for event, chunk in zip(events, response.streaming_content):
+            self.assertEqual(decompressor.decompress(chunk), event)
+
+    def test_cached_compression(self):
+        """ Сжатое тело ответа с max-age берётся из кеша """
+        response = HttpResponse(b"cached page " * 200)
+        response["Cache-Control"] = "max-age=20"
+        compressed = self.process(response).content
+        with mock.patch("yatube.middleware.compress_bytes") as compress:
+            response = HttpResponse(b"cached page " * 200)
+            response["Cache-Control"] = "max-age=20"
+            self.assertEqual(self.process(response).content, compressed)
+        compress.assert_not_called()
+
+
+class TestWarmup(TestCase):
+    """
+    Проверка прогрева процесса перед fork.
+    """
+
+    def test_steps_report(self):
+        """ Прогрев компилирует шаблоны проекта и отчитывается по шагам """
+        # соединение с базой внутри теста закрывать нельзя
+        with mock.patch("yatube.warmup.connections"):
+            report = warm_up()
+        results = {name: result for name, _, result in report}
+        self.assertEqual(set(results), {name for name, _ in WARMUP_STEPS})
+        errors = [
+            result
+            for result in results.values()
+            if isinstance(result, Exception)
+        ]
+        self.assertEqual(errors, [])
+        self.assertGreaterEqual(results["templates"], 20)
+        self.assertIn("всего", format_report(report))
+
+
+class TestStartupProfile(TestCase):
+    def test_parse_importtime(self):
+        """ Разбор вывода python -X importtime """
+        output = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |     django.conf\n"
+            "import time:        80 |        200 |   django\n"
+        )
+        self.assertEqual(
+            parse_importtime(output),
+            [("django.conf", 120, 120), ("django", 80, 200)],
+        )
+
+
+class TestDatabaseConnections(TestCase):
+    """
+    Проверка настройки и проверки соединений с базой.
+    """
+
+    def test_sqlite_pragmas(self):
+        """ Каждое соединение с SQLite получает PRAGMA из настроек """
+        if connection.vendor != "sqlite":
+            self.skipTest("PRAGMA есть только у SQLite")
+        with connection.cursor() as cursor:
+            cursor.execute("PRAGMA busy_timeout")
+            timeout = cursor.fetchone()[0]
+        self.assertEqual(timeout, settings.SQLITE_PRAGMAS["busy_timeout"])
+
+    def test_dead_connection_closed(self):
+        """ Неработающее постоянное соединение закрывается до запроса """
+        dead = mock.Mock(in_atomic_block=False, health_checked_at=0)
+        dead.is_usable.return_value = False
+        with mock.patch("yatube.db.connections") as connections:
+            connections.all.return_value = [dead]
+            check_connections()
+        dead.close.assert_called_once_with()
+
+    @skipUnless(psycopg2, "нужен psycopg2")
+    def test_pool_waits_and_is_per_process(self):
+        """ Пул ждёт свободное соединение, а после fork заводится новый """
+        from yatube.db_pool import base
+
+        connect = mock.Mock(return_value=mock.Mock(closed=False))
+        with mock.patch("psycopg2.pool.psycopg2.connect", connect):
+            pool = base.BlockingConnectionPool(0, 1, 0.05)
+            first = pool.getconn()
+            with self.assertRaises(psycopg2.OperationalError):
+                pool.getconn()
+            threading.Timer(0.01, pool.putconn, (first,)).start()
+            pool.timeout = 5
+            self.assertIs(pool.getconn(), first)
+
+            wrapper = mock.Mock(alias="pooled", settings_dict={"OPTIONS": {}})
+            with mock.patch.dict(base._pools, clear=True):
+                parent = base.DatabaseWrapper.get_pool(wrapper, {})
+                with mock.patch("os.getpid", return_value=-1):
+                    child = base.DatabaseWrapper.get_pool(wrapper, {})
+                    self.assertEqual(base.current_pools(), {"pooled": child})
+                self.assertIsNot(parent, child)
+
+    def test_stats_for_staff(self):
+        """ Статистика соединений доступна персоналу """
+        admin = User.objects.create_superuser(
+            username="admin", email="admin@yatube.ru", password="1"
+        )
+        self.client.force_login(admin)
+        stats = self.client.get(reverse("db_stats")).json()
+        self.assertEqual(stats["default"]["vendor"], connection.vendor)
+
+
+class TestArchive(TestCase):
+    """
+    Проверка переноса старых постов в архив.
+    """
+
+    def setUp(self):
+        self.author = User.objects.create_user(username="veteran")
+        self.reader = User.objects.create_user(username="reader")
+        self.old = Post.objects.create(author=self.author, text="old post")
+        Comment.objects.create(post=self.old, author=self.reader, text="c")
+        Post.objects.filter(pk=self.old.pk).update(
+            pub_date=timezone.now() - timedelta(days=800)
+        )
+        for number in range(4):
+            Post.objects.create(author=self.author, text=f"fresh {number}")
+        call_command("archive_posts", days=365, batch_size=1)
+
+    def test_old_posts_moved(self):
+        """ Старый пост с комментариями переезжает в архив """
+        self.assertFalse(Post.all_objects.filter(pk=self.old.pk).exists())
+        self.assertFalse(Comment.objects.filter(post_id=self.old.pk).exists())
+        archived = ArchivedPost.objects.get(pk=self.old.pk)
+        self.assertEqual(archived.comments.get().author, self.reader)
+        self.assertEqual(Post.objects.count(), 4)
+
+    def test_archived_post_readable(self):
+        """ Архивный пост открывается по старому адресу, без формы """
+        response = self.client.get(
+            reverse("post", args=(self.author.username, self.old.pk))
+        )
+        self.assertContains(response, "old post")
+        self.assertEqual(response.context["comments"].count(), 1)
+        self.client.force_login(self.reader)
+        response = self.client.get(
+            reverse("post", args=(self.author.username, self.old.pk))
+        )
+        self.assertNotContains(response, "<form")
+
+    def test_profile_continues_into_archive(self):
+        """ Последняя страница профиля показывает архивные посты """
+        url = reverse("profile", args=(self.author.username,))
+        response = self.client.get(url, {"page": 2})
+        self.assertEqual(response.context["count"], 5)
+        self.assertEqual(
+            list(response.context["page"]),
+            [ArchivedPost.objects.get(pk=self.old.pk)],
+        )
+
+    def test_api_retrieve_falls_back(self):
+        """ API отдаёт архивный пост по прежнему id """
+        response = self.client.get(
+            reverse("posts-detail", args=(self.old.pk,))
+        )
+        self.assertEqual(response.json()["text"], "old post")
+
+    def test_user_purge_removes_archive(self):
+        """ Удаление пользователя удаляет и его архив """
+        purge_user(self.author.pk)
+        self.assertFalse(ArchivedPost.objects.exists())
+        self.assertFalse(ArchivedComment.objects.exists())
+
+
+class TestTrending(TestCase):
+    """
+    Проверка счётчиков активности и рейтинга популярного.
+    """
+
+    def setUp(self):
+        # приращения, накопленные другими тестами, не нужны
+        activity_buffer.counts.clear()
+        view_buffer.counts.clear()
+        self.author = User.objects.create_user(username="star")
+        self.group = Group.objects.create(title="Хиты", slug="hits")
+        self.hit = Post.objects.create(
+            author=self.author, group=self.group, text="hit"
+        )
+        self.quiet = Post.objects.create(author=self.author, text="quiet")
+        self.stale = Post.objects.create(author=self.author, text="stale")
+        self.hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+
+    def count(self, post, kind):
+        return ActivityCounter.objects.get(post_id=post.pk, kind=kind).count
+
+    def test_activity_buffered(self):
+        """ Просмотры и комментарии пишутся в базу пачкой """
+        url = reverse("post", args=(self.author.username, self.hit.pk))
+        with mock.patch.object(activity_buffer, "interval", 3600):
+            self.client.get(url)
+            self.client.get(url)
+            Comment.objects.create(post=self.hit, author=self.author, text="c")
+            self.assertFalse(ActivityCounter.objects.exists())
+            with CaptureQueriesContext(connection) as queries:
+                activity_buffer.flush()
+        updates = [
+            query for query in queries if query["sql"].startswith("UPDATE")
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.count(self.hit, ActivityCounter.VIEW), 2)
+        self.assertEqual(self.count(self.hit, ActivityCounter.COMMENT), 1)
+        self.assertEqual(
+            ActivityCounter.objects.get(kind="view").group_id, self.group.pk
+        )
+
+    def test_buffer_flush_triggers(self):
+        """ Буфер сбрасывается по размеру и сохраняет данные при ошибке """
+        save = mock.Mock()
+        buffer = CounterBuffer(save, max_size=2, interval=3600)
+        buffer.add("a")
+        save.assert_not_called()
+        buffer.add("b", 3)
+        save.assert_called_once_with({"a": 1, "b": 3})
+        save.side_effect = ValueError
+        buffer.add("a")
+        buffer.flush()
+        self.assertEqual(buffer.counts, {"a": 1})
+
+    def test_flush_in_batches(self):
+        """ Больше 1000 счётчиков сохраняются пачками по max_size """
+        buffer = CounterBuffer(save_activity, max_size=500, interval=3600)
+        for hours in range(1200):
+            hour = self.hour - timedelta(hours=hours)
+            buffer.counts[(self.hit.pk, self.group.pk, "view", hour)] = 2
+        self.assertEqual(buffer.flush(), 1200)
+        self.assertEqual(ActivityCounter.objects.count(), 1200)
+        self.assertEqual(buffer.counts, {})
+
+    def test_flushers_not_started_on_load(self):
+        """ При загрузке приложения поток сброса не запускается """
+        buffer = CounterBuffer(save_views)
+        with mock.patch("posts.activity.threading.Thread") as thread:
+            with mock.patch("posts.activity.atexit.register"):
+                buffer.enable()
+                thread.assert_not_called()
+                buffer.add(self.hit.pk)
+        thread.assert_called_once()
+
+    def test_full_buffer_wakes_background_thread(self):
+        """ При фоновом сбросе запрос только будит поток """
+        save = mock.Mock()
+        buffer = CounterBuffer(save, max_size=1, interval=3600)
+        with mock.patch("posts.activity.threading.Thread"), mock.patch(
+            "posts.activity.atexit.register"
+        ):
+            buffer.start()
+        buffer.add("a")
+        save.assert_not_called()
+        self.assertTrue(buffer.wake.is_set())
+
+    def test_ranking(self):
+        """ Рейтинг учитывает веса и затухание, скрытые посты пропускает """
+        hidden = Post.objects.create(author=self.author, text="hidden")
+        Post.all_objects.filter(pk=hidden.pk).update(hidden=True)
+        for post, kind, hours, count in (
+            (self.hit, "comment", 0, 3),
+            (self.quiet, "view", 1, 10),
+            (self.stale, "view", 30, 100),
+            (hidden, "view", 0, 1000),
+            (self.stale, "view", 100, 1000),
+        ):
+            ActivityCounter.objects.create(
+                post_id=post.pk,
+                group_id=post.group_id,
+                kind=kind,
+                hour=self.hour - timedelta(hours=hours),
+                count=count,
+            )
+        refresh_trending()
+        self.assertEqual(ActivityCounter.objects.count(), 4)
+        ranking = [self.hit.pk, self.quiet.pk, self.stale.pk]
+        response = self.client.get(reverse("trending"))
+        self.assertEqual(
+            [post.pk for post in response.context["posts"]], ranking
+        )
+        self.assertEqual(list(response.context["groups"]), [self.group])
+        data = self.client.get(reverse("trending_api")).json()
+        self.assertEqual([post["id"] for post in data["posts"]], ranking)
+        self.assertEqual(
+            TrendingEntry.objects.get(kind="group").object_id, self.group.pk
+        )
+
+    def test_view_counts(self):
+        """ Просмотры видны сразу, а в базу пишутся одним UPDATE """
+        url = reverse("post", args=(self.author.username, self.hit.pk))
+        with mock.patch.object(view_buffer, "interval", 3600):
+            self.client.get(url)
+            response = self.client.get(url)
+            self.assertEqual(response.context["views"], 2)
+            self.assertContains(response, "Просмотров: 2")
+            data = self.client.get(
+                reverse("posts-detail", args=(self.hit.pk,))
+            ).json()
+            self.assertEqual(data["views"], 3)
+            self.hit.refresh_from_db()
+            self.assertEqual(self.hit.views, 0)
+            view_buffer.add(self.quiet.pk, 5)
+            with CaptureQueriesContext(connection) as queries:
+                view_buffer.flush()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(
+            dict(Post.objects.values_list("pk", "views")),
+            {self.hit.pk: 3, self.quiet.pk: 5, self.stale.pk: 0},
+        )
+
+    def test_background_flush_restarts_after_fork(self):
+        """ Фоновый сброс запускается заново в дочернем процессе """
+        buffer = CounterBuffer(save_views)
+        with mock.patch("posts.activity.atexit.register") as register:
+            with mock.patch("posts.activity.threading.Thread") as thread:
+                buffer.start()
+                buffer.start()
+                self.assertEqual(thread.call_count, 1)
+                with mock.patch("posts.activity.os.getpid", return_value=-1):
+                    buffer.add(self.hit.pk)
+                self.assertEqual(thread.call_count, 2)
+        register.assert_called_with(buffer.flush)
+
+
+class TestRecommendations(TestCase):
+    """
+    Проверка рекомендаций «Кого почитать».
+    """
+
+    def setUp(self):
+        users = {
+            name: User.objects.create_user(username=name)
+            for name in ("me", "a", "b", "c", "d", "e", "blocked")
+        }
+        users["blocked"].is_active = False
+        users["blocked"].save()
+        for user, author in (
+            ("me", "a"),
+            ("me", "b"),
+            ("a", "c"),
+            ("b", "c"),
+            ("a", "d"),
+            ("b", "me"),
+            ("a", "blocked"),
+        ):
+            Follow.objects.create(user=users[user], author=users[author])
+        group = Group.objects.create(title="Клуб", slug="club")
+        Post.objects.create(author=users["me"], group=group, text="мой")
+        Post.objects.create(author=users["e"], group=group, text="чужой")
+        self.users = users
+        call_command("build_recommendations")
+
+    def recommended(self, name):
+        return [
+            recommendation.author.username
+            for recommendation in Recommendation.objects.filter(
+                user=self.users[name]
+            ).select_related("author")
+        ]
+
+    def test_friends_of_friends_and_groups(self):
+        """ Подписки подписок и общие группы, без своих и заблокированных """
+        self.assertEqual(self.recommended("me"), ["c", "d", "e"])
+        scores = Recommendation.objects.filter(user=self.users["me"])
+        self.assertEqual(
+            list(scores.values_list("score", "via_follows", "shared_groups")),
+            [(2.0, 2, 0), (1.0, 1, 0), (0.5, 0, 1)],
+        )
+
+    def test_incremental_refresh(self):
+        """ Пересчёт затрагивает только тех, кого касаются новые подписки """
+        newcomer = User.objects.create_user(username="newcomer")
+        Follow.objects.create(user=self.users["a"], author=newcomer)
+        run = build_recommendations()
+        self.assertFalse(run.full)
+        self.assertEqual(run.users, 2)
+        self.assertIn("newcomer", self.recommended("me"))
+
+    def test_followed_author_dropped(self):
+        """ После подписки автор сразу пропадает из рекомендаций """
+        Follow.objects.create(user=self.users["me"], author=self.users["c"])
+        self.assertEqual(self.recommended("me"), ["d", "e"])
+
+    def test_widget_and_api(self):
+        """ Рекомендации видны владельцу профиля и в API """
+        me = self.users["me"]
+        self.client.force_login(me)
+        response = self.client.get(reverse("profile", args=("me",)))
+        self.assertContains(response, "Кого почитать")
+        self.assertEqual(len(response.context["recommendations"]), 3)
+        response = self.client.get(reverse("profile", args=("a",)))
+        self.assertEqual(response.context["recommendations"], [])
+        token = Token.objects.create(user=me)
+        data = self.client.get(
+            reverse("recommendations"),
+            HTTP_AUTHORIZATION=f"Token {token.key}",
+        ).json()
+        self.assertEqual(
+            [item["author"]["username"] for item in data], ["c", "d", "e"]
+        )
@@ -0,0 +1,161 @@
+import hashlib
+import math
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+
+DURATIONS = {"s": 1, "m": 60, "h": 60 * 60, "d": 60 * 60 * 24}
+
+# псевдоним кеша со счётчиками; если его нет в CACHES — кеш по умолчанию
+THROTTLE_CACHE = "throttle"
+
+
+def parse_rate(rate):
+    """
+    "30/min" -> (30, 60), как в THROTTLE_RATES и настройках DRF.
+    """
+    number, period = rate.split("/")
+    return int(number), DURATIONS[period[0]]
+
+
+class SlidingWindowCounter:
+    """
+    Счётчик скользящего окна: число запросов оценивается как счётчик
+    текущего окна плюс доля счётчика предыдущего, пропорциональная ещё не
+    прошедшей части окна. Текущий счётчик увеличивается атомарным incr,
+    а предыдущий окно уже не меняется и запоминается в процессе. Первая
+    проверка клиента в окне стоит двух обращений к кешу (get_many обоих
+    счётчиков и add или incr текущего), следующие — одного incr.
+
+    Лимит общий для всех процессов, только если кеш THROTTLE_CACHE общий
+    (memcached, redis); с кешем в памяти процесса каждый воркер считает
+    запросы сам.
+    """
+
+    def __init__(self, scope, rate):
+        self.scope = scope
+        self.limit, self.window = parse_rate(rate)
+        self.lock = threading.Lock()
+        self.previous_window = None
+        self.previous_counts = {}
+
+    @property
+    def cache(self):
+        if THROTTLE_CACHE in settings.CACHES:
+            return caches[THROTTLE_CACHE]
+        return caches["default"]
+
+    def key(self, ident, window):
+        return f"throttle:{self.scope}:{ident}:{window}"
+
+    def increment(self, key, exists):
+        if exists:
+            try:
+                return self.cache.incr(key)
+            except ValueError:
+                # счётчик успел истечь
+                pass
+        if self.cache.add(key, 1, self.window * 2):
+            return 1
+        # счётчик одновременно создал другой процесс
+        return self.cache.incr(key)
+
+    def known_previous(self, ident, window):
+        # предыдущий счётчик известен, если клиента уже проверяли в окне
+        with self.lock:
+            if self.previous_window != window - 1:
+                self.previous_window = window - 1
+                self.previous_counts = {}
+            return self.previous_counts.get(ident)
+
+    def count(self, ident, window):
+        """
+        (текущий счётчик после увеличения, счётчик предыдущего окна).
+        """
+        key = self.key(ident, window)
+        previous = self.known_previous(ident, window)
+        if previous is not None:
+            return self.increment(key, exists=True), previous
+        previous_key = self.key(ident, window - 1)
+        values = self.cache.get_many([key, previous_key])
+        previous = values.get(previous_key, 0)
+        with self.lock:
+            if self.previous_window == window - 1:
+                self.previous_counts[ident] = previous
+        return self.increment(key, exists=key in values), previous
+
+    def hit(self, ident):
+        """
+        Учитывает запрос. Возвращает None, если лимит не превышен, иначе
+        число секунд, через которое стоит повторить запрос.
+        """
+        now = time.time()
+        window = int(now // self.window)
+        count, previous = self.count(ident, window)
+        elapsed = now / self.window - window
+        if previous * (1 - elapsed) + count <= self.limit:
+            return None
+        if count > self.limit or not previous:
+            return self.window * (window + 1) - now
+        # через сколько вклад предыдущего окна опустится до лимита
+        allowed_at = 1 - (self.limit - count) / previous
+        return max((allowed_at - elapsed) * self.window, 1)
+
+
+_counters = {}
+_counters_lock = threading.Lock()
+
+
+def get_counter(scope):
+    rate = settings.THROTTLE_RATES[scope]
+    with _counters_lock:
+        counter = _counters.get((scope, rate))
+        if counter is None:
+            counter = _counters[(scope, rate)] = SlidingWindowCounter(
+                scope, rate
+            )
+    return counter
+
+
+def hashed(value):
+    return hashlib.sha256(value.encode()).hexdigest()[:32]
+
+
+def client_ident(request):
+    if request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    return f"ip:{request.META.get('REMOTE_ADDR')}"
+
+
+def too_many_requests(wait):
+    response = HttpResponse(
+        "Слишком много запросов, попробуйте позже.",
+        status=429,
+        content_type="text/plain; charset=utf-8",
+    )
+    response["Retry-After"] = max(1, math.ceil(wait))
+    return response
+
+
+def throttle(scope):
+    """
+    Ограничивает частоту POST-запросов к HTML-view по пользователю
+    (для анонимов — по IP) с лимитом THROTTLE_RATES[scope].
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method == "POST":
+                wait = get_counter(scope).hit(client_ident(request))
+                if wait is not None:
+                    return too_many_requests(wait)
+            return view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
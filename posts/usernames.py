@@ -0,0 +1,206 @@
+import hashlib
+import math
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DatabaseError, router
+from django.http import Http404, HttpResponseNotFound
+from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.html import escape
+
+User = get_user_model()
+
+# фильтр перестраивается не реже, чем раз в USERNAME_FILTER_TTL секунд,
+# отрицательный ответ для конкретного имени хранится USERNAME_MISSING_TTL
+USERNAME_FILTER_TTL = getattr(settings, "USERNAME_FILTER_TTL", 60 * 10)
+USERNAME_MISSING_TTL = getattr(settings, "USERNAME_MISSING_TTL", 60)
+USERNAME_FILTER_ERROR_RATE = 0.01
+AUTHOR_CACHE_TIMEOUT = getattr(settings, "AUTHOR_CACHE_TIMEOUT", 60 * 60)
+
+USERNAME_KEY = "username:exists:{}"
+AUTHOR_KEY = "username:author:{}"
+# поля пользователя, которые нужны шаблонам (в порядке полей модели)
+AUTHOR_FIELDS = ("id", "username", "first_name", "last_name")
+NOT_FOUND_PATH = "__not_found_path__"
+
+
+class BloomFilter:
+    """
+    Вероятностное множество: «нет» означает, что строки точно не было,
+    «да» — что она, скорее всего, была добавлена.
+    """
+
+    def __init__(self, capacity, error_rate=USERNAME_FILTER_ERROR_RATE):
+        capacity = max(capacity, 1)
+        self.size = int(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.size = max(self.size, 8)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        # двойное хеширование: k позиций из двух половин одного дайджеста
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return (
+            (first + i * second) % self.size for i in range(self.hashes)
+        )
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(value)
+        )
+
+
+_lock = threading.Lock()
+_filter = None
+_built_at = 0.0
+_not_found_page = None
+
+
+def _hash(username):
+    # в ключ попадает хеш: имя может содержать пробелы и быть длинным
+    return hashlib.md5(username.encode()).hexdigest()
+
+
+def _key(username):
+    return USERNAME_KEY.format(_hash(username))
+
+
+def _author_key(username):
+    return AUTHOR_KEY.format(_hash(username))
+
+
+def build_username_filter():
+    """
+    Строит фильтр по всем существующим именам пользователей.
+    Запас по ёмкости оставлен под регистрации до следующей перестройки.
+    """
+    global _filter, _built_at
+    usernames = User.objects.values_list("username", flat=True)
+    bloom = BloomFilter(usernames.count() * 2 + 1000)
+    for username in usernames.iterator():
+        bloom.add(username)
+    with _lock:
+        _filter, _built_at = bloom, time.monotonic()
+    return bloom
+
+
+def get_username_filter():
+    if _filter is not None and time.monotonic() - _built_at < (
+        USERNAME_FILTER_TTL
+    ):
+        return _filter
+    try:
+        return build_username_filter()
+    except DatabaseError:
+        return None
+
+
+def remember_username(username):
+    """
+    Регистрирует новое имя. Фильтр локален для процесса, поэтому имя
+    дополнительно попадает в кеш до перестройки фильтров в остальных
+    (другим процессам это помогает, только если кеш общий).
+    """
+    if _filter is not None:
+        with _lock:
+            _filter.add(username)
+    cache.set(_key(username), True, USERNAME_FILTER_TTL * 2)
+
+
+def forget_username(username):
+    cache.delete_many([_key(username), _author_key(username)])
+
+
+def forget_author(username):
+    cache.delete(_author_key(username))
+
+
+def mark_missing(username):
+    cache.set(_key(username), False, USERNAME_MISSING_TTL)
+
+
+def username_may_exist(username):
+    """
+    Отрицательный ответ фильтра — только подсказка: имя, добавленное в
+    другом процессе, попадает в его фильтр и кеш. Если кеш не общий
+    (SHARED_CACHE), отсутствие имени проверяется по базе, а результат
+    кешируется на USERNAME_MISSING_TTL.
+    """
+    known = cache.get(_key(username))
+    if known is not None:
+        return known
+    bloom = get_username_filter()
+    if bloom is None or username in bloom:
+        return True
+    if getattr(settings, "SHARED_CACHE", False):
+        return False
+    if User.objects.filter(username=username).exists():
+        remember_username(username)
+        return True
+    mark_missing(username)
+    return False
+
+
+def get_author_or_404(username):
+    """
+    Возвращает пользователя по имени. Из базы (или кеша) загружаются только
+    AUTHOR_FIELDS, остальные поля подгрузятся при первом обращении.
+    """
+    values = cache.get(_author_key(username))
+    if values is None:
+        values = (
+            User.objects.filter(username=username)
+            .values_list(*AUTHOR_FIELDS)
+            .first()
+        )
+        if values is None:
+            mark_missing(username)
+            raise Http404
+        cache.set(_author_key(username), values, AUTHOR_CACHE_TIMEOUT)
+    return User.from_db(router.db_for_read(User), AUTHOR_FIELDS, values)
+
+
+def not_found(request):
+    """
+    Ответ 404 для неизвестного имени. Анонимам (в том числе ботам)
+    отдаётся заранее отрисованная страница без обращения к базе.
+    """
+    global _not_found_page
+    if request.user.is_authenticated:
+        return render(
+            request, "misc/404.html", {"path": request.path}, status=404
+        )
+    if _not_found_page is None:
+        _not_found_page = render_to_string(
+            "misc/404.html", {"path": NOT_FOUND_PATH}
+        )
+    return HttpResponseNotFound(
+        _not_found_page.replace(NOT_FOUND_PATH, escape(request.path))
+    )
+
+
+def known_username(view):
+    """
+    Отсекает запросы к несуществующим пользователям до вызова view.
+    Ложные срабатывания фильтра запоминает get_author_or_404.
+    """
+
+    @wraps(view)
+    def wrapper(request, username, *args, **kwargs):
+        if not username_may_exist(username):
+            return not_found(request)
+        return view(request, username, *args, **kwargs)
+
+    return wrapper
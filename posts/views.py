@@ -1,16 +1,49 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import (
+    Http404,
+    HttpResponseBadRequest,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.contrib.auth import get_user_model
 from django.views.decorators.cache import cache_page
 
-from .models import Post, Group, Follow
+from yatube.db import connection_stats
+
+from .activity import (
+    record_view,
+    trending_groups,
+    trending_posts,
+    view_count,
+)
+from .export import EXPORT_MODELS, FORMATS, iter_encoded, iter_export
+from .models import ArchivedPost, Post, Group, Follow
 from .forms import PostForm, CommentForm
+from .profiles import build_profile, profile_counters
+from .recommendations import recommendations_for
+from .throttling import throttle
+from .usernames import get_author_or_404, known_username
 
 
 User = get_user_model()
 
 
+def get_post_or_404(username, post_id, archived=False):
+    # автор берётся из кеша имён, сам пост выбирается по первичному ключу;
+    # для чтения старый пост ищется и в архиве под тем же id
+    author = get_author_or_404(username)
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None and archived:
+        post = ArchivedPost.objects.filter(pk=post_id).first()
+    if post is None or post.author_id != author.pk:
+        raise Http404
+    post.author = author
+    return post
+
+
 @cache_page(20)
 def index(request):
     latest = Post.objects.all()
@@ -37,6 +70,7 @@ def group_posts(request, slug):
 
 
 @login_required
+@throttle("post_create")
 def new_post(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
@@ -47,53 +81,60 @@ def new_post(request):
     return render(request, "new_post.html", {"form": form})
 
 
+@known_username
 def profile(request, username):
-    post_author = get_object_or_404(User, username=username)
-    latest = post_author.posts.all()
-    count = post_author.posts.count()
-    paginator = Paginator(latest, 4)
-    page_number = request.GET.get("page")
-    page = paginator.get_page(page_number)
-    following = None
-    if request.user.is_authenticated:
-        following = post_author.following.filter(user=request.user)
+    post_author = get_author_or_404(username)
+    profile_data = build_profile(
+        post_author, request.user, request.GET.get("page")
+    )
+    # «Кого почитать» видит только владелец профиля
+    recommendations = []
+    if request.user == post_author:
+        recommendations = recommendations_for(request.user)
     return render(
         request,
         "profile.html",
         {
-            "page": page,
-            "paginator": paginator,
+            "page": profile_data["page"],
+            "paginator": profile_data["paginator"],
             "post_author": post_author,
-            "count": count,
-            "follower_count": post_author.following.count(),
-            "following_count": post_author.follower.count(),
-            "following": following,
+            "count": profile_data["posts_count"],
+            "follower_count": profile_data["followers_count"],
+            "following_count": profile_data["following_count"],
+            "following": profile_data["is_following"],
+            "recommendations": recommendations,
         },
     )
 
 
+@known_username
 def post_view(request, username, post_id):
-    post = get_object_or_404(Post, author__username=username, pk=post_id)
-    count = Post.objects.filter(author=post.author).count()
-    comments = post.comments.all()
+    post = get_post_or_404(username, post_id, archived=True)
+    archived = isinstance(post, ArchivedPost)
+    if not archived:
+        record_view(post)
+    counters = profile_counters(post.author, request.user)
+    comments = post.comments.select_related("author")
     form = CommentForm()
     return render(
         request,
         "post.html",
         {
-            "count": count,
+            "count": counters["posts_count"],
             "post_author": post.author,
             "post": post,
+            "archived": archived,
+            "views": view_count(post),
             "form": form,
             "comments": comments,
-            "follower_count": post.author.following.count(),
-            "following_count": post.author.follower.count(),
+            "follower_count": counters["followers_count"],
+            "following_count": counters["following_count"],
         },
     )
 
 
 def post_edit(request, username, post_id):
-    post = get_object_or_404(Post, author__username=username, pk=post_id)
+    post = get_post_or_404(username, post_id)
     if request.user == post.author:
         form = PostForm(
             request.POST or None, files=request.FILES or None, instance=post
@@ -120,8 +161,9 @@ def server_error(request):
 
 
 @login_required
+@throttle("comment_create")
 def add_comment(request, username, post_id):
-    post = get_object_or_404(Post, author__username=username, pk=post_id)
+    post = get_post_or_404(username, post_id)
     form = CommentForm(request.POST or None, files=request.FILES or None)
     if form.is_valid():
         form.instance.author = request.user
@@ -142,6 +184,16 @@ def add_comment(request, username, post_id):
     )
 
 
+# популярные за последние часы посты и группы
+def trending(request):
+    # рейтинг заранее посчитан задачей refresh_trending
+    return render(
+        request,
+        "trending.html",
+        {"posts": trending_posts(), "groups": trending_groups(10)},
+    )
+
+
 # вывод постов авторов, на которых подписан текущий пользователь.
 @login_required
 def follow_index(request):
@@ -157,7 +209,7 @@ def follow_index(request):
 # подписка на интересного автора
 @login_required
 def profile_follow(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_author_or_404(username)
     if request.user != author:
         Follow.objects.get_or_create(user=request.user, author=author)
     return redirect("profile", username=username)
@@ -166,8 +218,48 @@ def profile_follow(request, username):
 # отписка от надоевшего графомана
 @login_required
 def profile_unfollow(request, username):
-    profile_to_unfollow = get_object_or_404(User, username=username)
+    profile_to_unfollow = get_author_or_404(username)
     Follow.objects.filter(user=request.user).filter(
         author=profile_to_unfollow
     ).delete()
     return redirect("profile", username=username)
+
+
+@staff_member_required
+def export_data(request):
+    """
+    Потоковая выгрузка данных для аналитики и резервных копий:
+    ?model=post&model=comment (по умолчанию все), ?format=jsonl|csv,
+    ?gzip=1. Ответ формируется по мере чтения базы, память не растёт
+    с объёмом данных.
+    """
+    names = request.GET.getlist("model") or list(EXPORT_MODELS)
+    fmt = request.GET.get("format", "jsonl")
+    if (
+        fmt not in FORMATS
+        or any(name not in EXPORT_MODELS for name in names)
+        or (fmt == "csv" and len(names) != 1)
+    ):
+        return HttpResponseBadRequest(
+            "Неизвестный формат или модель; CSV выгружает одну модель."
+        )
+    compress = bool(request.GET.get("gzip"))
+    filename = f"yatube-{'-'.join(names)}.{fmt}"
+    content_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    if compress:
+        filename += ".gz"
+        content_type = "application/gzip"
+    response = StreamingHttpResponse(
+        iter_encoded(iter_export(names, fmt), compress=compress),
+        content_type=content_type,
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@staff_member_required
+def db_stats(request):
+    """
+    Соединения с базами этого процесса и заполненность пулов.
+    """
+    return JsonResponse(connection_stats())
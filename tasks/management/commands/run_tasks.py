@@ -0,0 +1,102 @@
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from tasks.queue import schedule_periodic
+from tasks.worker import claim, execute, requeue_abandoned
+from yatube.sentry import init_sentry
+
+
+def setup_process():
+    django.setup()
+    init_sentry()
+
+
+class Command(BaseCommand):
+    help = "Запускает обработчик фоновых задач из очереди в базе данных"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="Сколько задач выполнять одновременно",
+        )
+        parser.add_argument(
+            "--processes",
+            action="store_true",
+            help="Выполнять задачи в пуле процессов вместо пула потоков",
+        )
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=1.0,
+            help="Пауза в секундах, когда очередь пуста",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Выполнить готовые задачи и завершиться",
+        )
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        name = f"{socket.gethostname()}:{os.getpid()}"
+        init_sentry(required=True)
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        if options["processes"]:
+            # процессы запускаются заново, а не через fork, чтобы не
+            # унаследовать открытое соединение с базой
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=setup_process,
+            )
+        else:
+            pool = ThreadPoolExecutor(max_workers=workers)
+
+        running = set()
+        done_count = 0
+        last_maintenance = 0.0
+        with pool:
+            while not self.stopping:
+                if time.monotonic() - last_maintenance > 10:
+                    requeue_abandoned()
+                    schedule_periodic()
+                    last_maintenance = time.monotonic()
+                free = workers - len(running)
+                claimed = claim(name, free) if free else []
+                running.update(pool.submit(execute, pk) for pk in claimed)
+                close_old_connections()
+                if not running:
+                    if options["once"]:
+                        break
+                    time.sleep(options["poll"])
+                    continue
+                finished, running = wait(
+                    running,
+                    timeout=options["poll"],
+                    return_when=FIRST_COMPLETED,
+                )
+                done_count += len(finished)
+            done, _ = wait(running)
+            done_count += len(done)
+        self.stdout.write(f"Обработано задач: {done_count}")
+
+    def stop(self, signum, frame):
+        self.stopping = True
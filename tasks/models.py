@@ -0,0 +1,48 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (QUEUED, "В очереди"),
+        (RUNNING, "Выполняется"),
+        (DONE, "Выполнена"),
+        (FAILED, "Ошибка"),
+    )
+
+    class Meta:
+        verbose_name = "Задача"
+        verbose_name_plural = "Задачи"
+        ordering = ["-priority", "run_at"]
+        indexes = [models.Index(fields=["status", "run_at"])]
+
+    name = models.CharField("Задача", max_length=200)
+    payload = models.TextField("Аргументы", default="{}")
+    priority = models.SmallIntegerField("Приоритет", default=0)
+    status = models.CharField(
+        "Статус", max_length=10, choices=STATUS_CHOICES, default=QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField("Попыток", default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        "Максимум попыток", default=5
+    )
+    run_at = models.DateTimeField("Запустить не раньше", default=timezone.now)
+    idempotency_key = models.CharField(
+        "Ключ идемпотентности",
+        max_length=200,
+        unique=True,
+        null=True,
+        blank=True,
+    )
+    worker = models.CharField("Обработчик", max_length=100, blank=True)
+    last_error = models.TextField("Последняя ошибка", blank=True)
+    created = models.DateTimeField("Создана", auto_now_add=True)
+    started = models.DateTimeField("Запущена", null=True, blank=True)
+    finished = models.DateTimeField("Завершена", null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} #{self.pk}"
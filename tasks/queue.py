@@ -0,0 +1,84 @@
+import json
+import time
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Task
+
+registry = {}
+periodic = {}
+
+
+def task(name=None, priority=0, max_attempts=5, every=None):
+    """
+    Регистрирует функцию как фоновую задачу. Функция остаётся обычной:
+    её можно вызвать напрямую, а в очередь поставить через fn.enqueue()
+    или fn.enqueue_on_commit(). Аргументы должны сериализоваться в JSON.
+    Задачу с every (в секундах) обработчик сам ставит в очередь раз в период.
+    """
+
+    def decorator(func):
+        task_name = name or f"{func.__module__}.{func.__name__}"
+        func.task_name = task_name
+        func.priority = priority
+        func.max_attempts = max_attempts
+        func.enqueue = lambda *args, **kwargs: enqueue(func, *args, **kwargs)
+        func.enqueue_on_commit = lambda *args, **kwargs: enqueue_on_commit(
+            func, *args, **kwargs
+        )
+        registry[task_name] = func
+        if every:
+            periodic[task_name] = every
+        return func
+
+    return decorator
+
+
+def enqueue(func, *args, key=None, priority=None, delay=None, **kwargs):
+    """
+    Ставит задачу в очередь. Задача с уже известным ключом key повторно не
+    создаётся: возвращается существующая запись.
+    """
+    name = func if isinstance(func, str) else func.task_name
+    func = registry[name]
+    if key is not None:
+        existing = Task.objects.filter(idempotency_key=key).first()
+        if existing is not None:
+            return existing
+    run_at = timezone.now()
+    if delay:
+        run_at += timedelta(seconds=delay)
+    try:
+        with transaction.atomic():
+            return Task.objects.create(
+                name=name,
+                payload=json.dumps({"args": args, "kwargs": kwargs}),
+                priority=func.priority if priority is None else priority,
+                max_attempts=func.max_attempts,
+                run_at=run_at,
+                idempotency_key=key,
+            )
+    except IntegrityError:
+        # ключ успели занять параллельно
+        return Task.objects.get(idempotency_key=key)
+
+
+def enqueue_on_commit(func, *args, **kwargs):
+    """
+    Ставит задачу в очередь только после фиксации текущей транзакции,
+    чтобы обработчик не увидел незаписанных данных и не получил задачу
+    от откатившегося запроса.
+    """
+    transaction.on_commit(lambda: enqueue(func, *args, **kwargs))
+
+
+def schedule_periodic():
+    """
+    Ставит в очередь периодические задачи текущего периода. Ключ включает
+    номер периода, поэтому несколько обработчиков не создадут дублей.
+    """
+    now = time.time()
+    for name, every in periodic.items():
+        enqueue(name, key=f"periodic:{name}:{int(now // every)}")
@@ -0,0 +1,17 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Task
+from .queue import task
+
+# выполненные задачи хранятся неделю: по ним видно историю и ключи
+# идемпотентности не дают поставить ту же работу повторно
+KEEP_DONE_DAYS = getattr(settings, "TASKS_KEEP_DONE_DAYS", 7)
+
+
+@task(every=60 * 60 * 24)
+def purge_finished_tasks():
+    deadline = timezone.now() - timedelta(days=KEEP_DONE_DAYS)
+    Task.objects.filter(status=Task.DONE, finished__lt=deadline).delete()
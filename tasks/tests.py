@@ -0,0 +1,79 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from tasks.models import Task
+from tasks.queue import enqueue, task
+from tasks.worker import claim, execute
+from yatube.sentry import init_sentry
+
+calls = []
+
+
+@task(name="tests.record")
+def record(value):
+    calls.append(value)
+
+
+@task(name="tests.broken", max_attempts=2)
+def broken():
+    raise RuntimeError("broken")
+
+
+class TestQueue(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_idempotency_key(self):
+        """ Задача с тем же ключом не ставится в очередь дважды """
+        first = record.enqueue(1, key="record:1")
+        second = enqueue("tests.record", 1, key="record:1")
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Task.objects.count(), 1)
+
+    def test_priority_order(self):
+        """ Задачи с большим приоритетом забираются первыми """
+        low = record.enqueue(1)
+        high = record.enqueue(2, priority=10)
+        self.assertEqual(claim("test", 2), [high.pk, low.pk])
+        self.assertEqual(claim("test", 2), [])
+
+    def test_retry_with_backoff(self):
+        """ Упавшая задача откладывается, а после всех попыток помечается """
+        broken_task = broken.enqueue()
+        claim("test", 1)
+        self.assertEqual(execute(broken_task.pk), Task.QUEUED)
+        broken_task.refresh_from_db()
+        self.assertGreater(broken_task.run_at, broken_task.started)
+        self.assertIn("RuntimeError", broken_task.last_error)
+        Task.objects.filter(pk=broken_task.pk).update(
+            run_at=broken_task.started
+        )
+        claim("test", 1)
+        self.assertEqual(execute(broken_task.pk), Task.FAILED)
+
+
+class TestWorkerCommand(TransactionTestCase):
+    def test_run_once(self):
+        """ Команда run_tasks --once выполняет все готовые задачи """
+        calls.clear()
+        for value in range(3):
+            record.enqueue(value)
+        call_command("run_tasks", "--once", "--workers", "2")
+        self.assertEqual(sorted(calls), [0, 1, 2])
+        done = Task.objects.filter(name="tests.record", status=Task.DONE)
+        self.assertEqual(done.count(), 3)
+
+    @override_settings(SENTRY_DSN="", SENTRY_REQUIRED=True)
+    def test_requires_sentry_dsn(self):
+        """ С SENTRY_REQUIRED без SENTRY_DSN обработчик не запускается """
+        with self.assertRaises(ImproperlyConfigured):
+            call_command("run_tasks", "--once")
+
+
+class TestSentry(TestCase):
+    @override_settings(SENTRY_DSN="", SENTRY_REQUIRED=False)
+    def test_optional_by_default(self):
+        """ Без SENTRY_DSN приложение загружается с предупреждением """
+        with self.assertLogs("yatube.sentry", "WARNING"):
+            self.assertFalse(init_sentry(required=True))
@@ -0,0 +1,91 @@
+import json
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+from .queue import registry
+
+logger = logging.getLogger(__name__)
+
+# первая повторная попытка через TASKS_RETRY_DELAY секунд, дальше задержка
+# удваивается, но не превышает TASKS_MAX_RETRY_DELAY
+RETRY_DELAY = getattr(settings, "TASKS_RETRY_DELAY", 10)
+MAX_RETRY_DELAY = getattr(settings, "TASKS_MAX_RETRY_DELAY", 60 * 60)
+# задача, которая выполняется дольше, считается брошенной упавшим
+# обработчиком и возвращается в очередь
+LEASE_SECONDS = getattr(settings, "TASKS_LEASE_SECONDS", 60 * 15)
+
+
+def retry_delay(attempts):
+    delay = min(RETRY_DELAY * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim(worker, limit):
+    """
+    Забирает до limit готовых задач в порядке приоритета. Захват делается
+    условным UPDATE, поэтому несколько обработчиков не возьмут одну задачу
+    ни на PostgreSQL, ни на SQLite.
+    """
+    now = timezone.now()
+    candidates = Task.objects.filter(
+        status=Task.QUEUED, run_at__lte=now
+    ).values_list("pk", flat=True)[: limit * 2]
+    claimed = []
+    for pk in candidates:
+        updated = Task.objects.filter(pk=pk, status=Task.QUEUED).update(
+            status=Task.RUNNING,
+            worker=worker,
+            started=now,
+            attempts=F("attempts") + 1,
+        )
+        if updated:
+            claimed.append(pk)
+            if len(claimed) == limit:
+                break
+    return claimed
+
+
+def requeue_abandoned():
+    deadline = timezone.now() - timedelta(seconds=LEASE_SECONDS)
+    return Task.objects.filter(
+        status=Task.RUNNING, started__lt=deadline
+    ).update(status=Task.QUEUED, worker="")
+
+
+def execute(pk):
+    """
+    Выполняет захваченную задачу. При ошибке задача возвращается в очередь
+    с экспоненциальной задержкой, после max_attempts попыток помечается
+    как неудавшаяся.
+    """
+    try:
+        task = Task.objects.get(pk=pk)
+        payload = json.loads(task.payload)
+        try:
+            registry[task.name](*payload["args"], **payload["kwargs"])
+        except Exception:
+            logger.exception("Задача %s завершилась с ошибкой", task)
+            task.last_error = traceback.format_exc()
+            if task.attempts >= task.max_attempts:
+                task.status = Task.FAILED
+                task.finished = timezone.now()
+            else:
+                task.status = Task.QUEUED
+                task.run_at = timezone.now() + retry_delay(task.attempts)
+        else:
+            task.status = Task.DONE
+            task.finished = timezone.now()
+        task.save(
+            update_fields=("status", "finished", "run_at", "last_error")
+        )
+        return task.status
+    finally:
+        close_old_connections()
@@ -1,3 +1,22 @@
 from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.admin import UserAdmin
 
-# Register your models here.
+from posts.admin import DeferredDeletionMixin
+from posts.deletion import schedule_user_deletion
+
+User = get_user_model()
+
+
+class YatubeUserAdmin(DeferredDeletionMixin, UserAdmin):
+    """
+    Удаление пользователя блокирует его сразу, а посты, комментарии и
+    подписки удаляются в фоне пачками.
+    """
+
+    def schedule_deletion(self, pks):
+        schedule_user_deletion(pks)
+
+
+admin.site.unregister(User)
+admin.site.register(User, YatubeUserAdmin)
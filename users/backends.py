@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+User = get_user_model()
+
+USER_KEY = "auth:user:{}"
+AUTH_USER_CACHE_TIMEOUT = getattr(
+    settings, "AUTH_USER_CACHE_TIMEOUT", 60 * 15
+)
+
+
+def get_cached_user(user_id):
+    """
+    Пользователь по первичному ключу из кеша. Запись сбрасывается при любом
+    сохранении или удалении пользователя и при выходе из аккаунта.
+    """
+    key = USER_KEY.format(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = User._default_manager.filter(pk=user_id).first()
+        if user is None:
+            return None
+        cache.set(key, user, AUTH_USER_CACHE_TIMEOUT)
+    return user
+
+
+def forget_user(user_id):
+    cache.delete(USER_KEY.format(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend, который загружает пользователя сессии из кеша, поэтому
+    AuthenticationMiddleware не делает запрос к базе на каждой странице.
+    """
+
+    def get_user(self, user_id):
+        user = get_cached_user(user_id)
+        if user is not None and self.user_can_authenticate(user):
+            return user
+        return None
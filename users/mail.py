@@ -0,0 +1,141 @@
+import logging
+import os
+import pickle
+import time
+import uuid
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+logger = logging.getLogger(__name__)
+
+
+def spool_dirs():
+    root = settings.EMAIL_SPOOL_DIR
+    return {
+        name: os.path.join(root, name) for name in ("tmp", "new", "dead")
+    }
+
+
+class SpoolEmailBackend(BaseEmailBackend):
+    """
+    Вместо отправки складывает письма в локальный каталог EMAIL_SPOOL_DIR.
+    Запрос платит только за запись файла, доставку выполняет команда
+    manage.py send_spooled_mail через EMAIL_DELIVERY_BACKEND.
+    """
+
+    def __init__(self, fail_silently=False, **kwargs):
+        super().__init__(fail_silently=fail_silently, **kwargs)
+        self.dirs = spool_dirs()
+        for path in self.dirs.values():
+            os.makedirs(path, exist_ok=True)
+
+    def send_messages(self, email_messages):
+        sent = 0
+        for message in email_messages:
+            try:
+                self.spool(message)
+            except OSError:
+                if not self.fail_silently:
+                    raise
+            else:
+                sent += 1
+        return sent
+
+    def spool(self, message):
+        # пишем во временный файл и переносим его в new/ одной операцией,
+        # чтобы отправитель никогда не увидел недописанное письмо
+        message.connection = None
+        name = f"{time.time():.6f}-{uuid.uuid4().hex}.0.msg"
+        tmp_path = os.path.join(self.dirs["tmp"], name)
+        with open(tmp_path, "wb") as spool_file:
+            pickle.dump(message, spool_file)
+            spool_file.flush()
+            os.fsync(spool_file.fileno())
+        os.replace(tmp_path, os.path.join(self.dirs["new"], name))
+
+
+class SpoolSender:
+    """
+    Доставляет письма из очереди пачками по одному соединению, не быстрее
+    EMAIL_SPOOL_RATE писем в секунду. Неудачная отправка откладывается
+    (время следующей попытки хранится в mtime файла), после
+    EMAIL_SPOOL_MAX_ATTEMPTS попыток письмо переносится в dead/.
+    """
+
+    def __init__(self, batch_size=None, rate=None, max_attempts=None):
+        self.dirs = spool_dirs()
+        for path in self.dirs.values():
+            os.makedirs(path, exist_ok=True)
+        self.batch_size = batch_size or settings.EMAIL_SPOOL_BATCH_SIZE
+        self.rate = rate or settings.EMAIL_SPOOL_RATE
+        self.max_attempts = max_attempts or settings.EMAIL_SPOOL_MAX_ATTEMPTS
+        self.retry_delay = settings.EMAIL_SPOOL_RETRY_DELAY
+
+    def pending(self):
+        now = time.time()
+        with os.scandir(self.dirs["new"]) as entries:
+            ready = [
+                entry.name
+                for entry in entries
+                if entry.name.endswith(".msg") and entry.stat().st_mtime <= now
+            ]
+        return sorted(ready)[: self.batch_size]
+
+    def send_batch(self):
+        """
+        Отправляет одну пачку писем и возвращает число доставленных.
+        Если соединение не открылось, все письма пачки откладываются, как
+        при неудачной отправке.
+        """
+        names = self.pending()
+        if not names:
+            return 0
+        connection = get_connection(settings.EMAIL_DELIVERY_BACKEND)
+        delivered = 0
+        interval = 1.0 / self.rate
+        try:
+            try:
+                connection.open()
+            except Exception:
+                logger.exception("Не удалось подключиться для отправки писем")
+                for name in names:
+                    self.defer(name)
+                return 0
+            for name in names:
+                started = time.monotonic()
+                if self.deliver(connection, name):
+                    delivered += 1
+                pause = interval - (time.monotonic() - started)
+                if pause > 0:
+                    time.sleep(pause)
+        finally:
+            connection.close()
+        return delivered
+
+    def deliver(self, connection, name):
+        path = os.path.join(self.dirs["new"], name)
+        try:
+            with open(path, "rb") as spool_file:
+                message = pickle.load(spool_file)
+            connection.send_messages([message])
+        except Exception:
+            logger.exception("Не удалось отправить письмо %s", name)
+            self.defer(name)
+            return False
+        os.remove(path)
+        return True
+
+    def defer(self, name):
+        stem, attempts, suffix = name.rsplit(".", 2)
+        attempts = int(attempts) + 1
+        path = os.path.join(self.dirs["new"], name)
+        if attempts >= self.max_attempts:
+            os.replace(path, os.path.join(self.dirs["dead"], name))
+            return
+        retry_name = f"{stem}.{attempts}.{suffix}"
+        retry_path = os.path.join(self.dirs["new"], retry_name)
+        os.replace(path, retry_path)
+        retry_at = time.time() + self.retry_delay * 2 ** (attempts - 1)
+        os.utime(retry_path, (retry_at, retry_at))
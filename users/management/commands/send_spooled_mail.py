@@ -0,0 +1,47 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.mail import SpoolSender
+
+
+class Command(BaseCommand):
+    help = "Доставляет письма, накопленные SpoolEmailBackend"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, help="Писем в пачке")
+        parser.add_argument(
+            "--rate", type=float, help="Не больше писем в секунду"
+        )
+        parser.add_argument(
+            "--poll",
+            type=float,
+            default=5.0,
+            help="Пауза в секундах, когда очередь пуста",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Отправить готовые письма и завершиться",
+        )
+
+    def handle(self, *args, **options):
+        sender = SpoolSender(
+            batch_size=options["batch_size"], rate=options["rate"]
+        )
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        total = 0
+        while not self.stopping:
+            delivered = sender.send_batch()
+            total += delivered
+            if not sender.pending():
+                if options["once"]:
+                    break
+                time.sleep(options["poll"])
+        self.stdout.write(f"Отправлено писем: {total}")
+
+    def stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .backends import forget_user
+
+User = get_user_model()
+
+
+# смена пароля, блокировка и удаление сохраняют модель, поэтому кеш
+# сбрасывается при любом изменении пользователя
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    forget_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def forget_logged_out_user(sender, user=None, **kwargs):
+    if user is not None:
+        forget_user(user.pk)
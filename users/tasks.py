@@ -0,0 +1,12 @@
+from importlib import import_module
+
+from django.conf import settings
+
+from tasks.queue import task
+
+
+# сессии с истёкшим сроком сами из базы не удаляются
+@task(every=60 * 60 * 24)
+def clear_expired_sessions():
+    engine = import_module(settings.SESSION_ENGINE)
+    engine.SessionStore.clear_expired()
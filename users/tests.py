@@ -1,3 +1,124 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+from api.authentication import CachedTokenAuthentication
+from users.backends import CachedModelBackend
+from users.mail import SpoolSender
+
+User = get_user_model()
+
+
+class FailingBackend(mail.backends.base.BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError("smtp is down")
+
+
+class UnreachableBackend(mail.backends.base.BaseEmailBackend):
+    def open(self):
+        raise ConnectionRefusedError("smtp is unreachable")
+
+
+class TestMailSpool(TestCase):
+    def setUp(self):
+        self.spool_dir = tempfile.mkdtemp()
+        self.settings = override_settings(
+            EMAIL_SPOOL_DIR=self.spool_dir,
+            EMAIL_DELIVERY_BACKEND="django.core.mail.backends.locmem."
+            "EmailBackend",
+        )
+        self.settings.enable()
+
+    def tearDown(self):
+        self.settings.disable()
+        shutil.rmtree(self.spool_dir)
+
+    def spool_message(self):
+        connection = mail.get_connection("users.mail.SpoolEmailBackend")
+        mail.send_mail(
+            "Тема",
+            "Текст",
+            "from@yatube.ru",
+            ["to@yatube.ru"],
+            connection=connection,
+        )
+
+    def test_spooled_message_delivered(self):
+        """ Письмо из очереди доставляется отправителем """
+        self.spool_message()
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(SpoolSender().send_batch(), 1)
+        self.assertEqual(mail.outbox[0].subject, "Тема")
+        self.assertEqual(SpoolSender().pending(), [])
+
+    @override_settings(EMAIL_DELIVERY_BACKEND="users.tests.FailingBackend")
+    def test_failed_message_moves_to_dead_letters(self):
+        """ После всех попыток письмо переносится в dead/ """
+        self.spool_message()
+        sender = SpoolSender(max_attempts=2)
+        sender.retry_delay = 0
+        self.assertEqual(sender.send_batch(), 0)
+        self.assertEqual(len(sender.pending()), 1)
+        sender.send_batch()
+        self.assertEqual(sender.pending(), [])
+        self.assertEqual(len(os.listdir(sender.dirs["dead"])), 1)
+
+    @override_settings(EMAIL_DELIVERY_BACKEND="users.tests.UnreachableBackend")
+    def test_connection_failure_defers_batch(self):
+        """ Если сервер недоступен, письма пачки откладываются """
+        self.spool_message()
+        sender = SpoolSender(max_attempts=3)
+        self.assertEqual(sender.send_batch(), 0)
+        self.assertEqual(sender.pending(), [])
+        names = os.listdir(sender.dirs["new"])
+        self.assertEqual([name.rsplit(".", 2)[1] for name in names], ["1"])
+
+
+class TestCachedAuthentication(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="cached", password="1")
+        self.token = Token.objects.create(user=self.user)
+
+    def test_session_user_from_cache(self):
+        """ Повторная загрузка пользователя сессии не обращается к базе """
+        backend = CachedModelBackend()
+        self.assertEqual(backend.get_user(self.user.pk), self.user)
+        with self.assertNumQueries(0):
+            self.assertEqual(backend.get_user(self.user.pk), self.user)
+
+    def test_password_change_invalidates_cache(self):
+        """ После смены пароля из кеша не берётся старый хеш пароля """
+        backend = CachedModelBackend()
+        backend.get_user(self.user.pk)
+        self.user.set_password("new password")
+        self.user.save()
+        cached = backend.get_user(self.user.pk)
+        self.assertTrue(cached.check_password("new password"))
+
+    def test_token_from_cache(self):
+        """ Токен проверяется без запроса к базе, отозванный не принимается """
+        authentication = CachedTokenAuthentication()
+        key = self.token.key
+        user, _ = authentication.authenticate_credentials(key)
+        self.assertEqual(user, self.user)
+        with self.assertNumQueries(0):
+            authentication.authenticate_credentials(key)
+        self.token.delete()
+        with self.assertRaises(AuthenticationFailed):
+            authentication.authenticate_credentials(key)
+
+    def test_session_with_old_backend_path(self):
+        """ Сессия, созданная с ModelBackend, не сбрасывается """
+        self.client.force_login(
+            self.user, backend="django.contrib.auth.backends.ModelBackend"
+        )
+        response = self.client.get("/")
+        self.assertEqual(response.wsgi_request.user, self.user)
@@ -0,0 +1,70 @@
+import time
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+HEALTH_CHECK_INTERVAL = getattr(settings, "DB_HEALTH_CHECK_INTERVAL", 10)
+STATEMENT_TIMEOUT = getattr(settings, "DB_STATEMENT_TIMEOUT", 0)
+SQLITE_PRAGMAS = getattr(settings, "SQLITE_PRAGMAS", {})
+
+
+@receiver(connection_created)
+def setup_session(sender, connection, **kwargs):
+    """
+    Настройка каждого нового соединения: в PostgreSQL — ограничение
+    времени запроса, в SQLite — журнал WAL и прочие PRAGMA.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql" and STATEMENT_TIMEOUT:
+            cursor.execute(
+                "SET statement_timeout = %s", [int(STATEMENT_TIMEOUT)]
+            )
+        elif connection.vendor == "sqlite":
+            for name, value in SQLITE_PRAGMAS.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+
+
+@receiver(request_started)
+def check_connections(**kwargs):
+    """
+    Постоянное соединение могло умереть между запросами (перезапуск базы,
+    таймаут на сервере). Раз в HEALTH_CHECK_INTERVAL секунд оно
+    проверяется перед запросом и при необходимости закрывается, чтобы
+    запрос открыл новое, а не получил ошибку.
+    """
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+        checked = getattr(connection, "health_checked_at", 0)
+        if now - checked < HEALTH_CHECK_INTERVAL:
+            continue
+        connection.health_checked_at = now
+        if not connection.is_usable():
+            connection.close()
+
+
+def connection_stats():
+    """
+    Состояние соединений по базам: время жизни, открыто ли соединение в
+    текущем потоке и, для баз с пулом, заполненность пула.
+    """
+    stats = {}
+    for connection in connections.all():
+        stats[connection.alias] = {
+            "vendor": connection.vendor,
+            "conn_max_age": connection.settings_dict["CONN_MAX_AGE"],
+            "connected": connection.connection is not None,
+        }
+    if any(
+        connection.settings_dict["ENGINE"] == "yatube.db_pool"
+        for connection in connections.all()
+    ):
+        from yatube.db_pool.base import pool_stats
+
+        for alias, pool in pool_stats().items():
+            stats[alias]["pool"] = pool
+    return stats
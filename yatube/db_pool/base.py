@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+
+from django.db.backends.postgresql import base
+from psycopg2 import OperationalError
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+# пулы по (pid, alias): после fork дочерний процесс не трогает сокеты
+# родителя, а заводит свои. Чужие пулы остаются в словаре и не
+# закрываются: закрытие из дочернего процесса оборвало бы соединения
+# родителя.
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class BlockingConnectionPool(ThreadedConnectionPool):
+    """
+    Пул, который при исчерпании до timeout секунд ждёт освободившееся
+    соединение, а не сразу бросает PoolError. Если ждать не дождались —
+    OperationalError, как при недоступной базе.
+    """
+
+    def __init__(self, minconn, maxconn, timeout, *args, **kwargs):
+        self.timeout = timeout
+        self.released = threading.Condition()
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def getconn(self, key=None):
+        deadline = time.monotonic() + self.timeout
+        with self.released:
+            while True:
+                try:
+                    return super().getconn(key)
+                except PoolError:
+                    remaining = deadline - time.monotonic()
+                    if self.closed or remaining <= 0:
+                        raise OperationalError(
+                            f"Нет свободных соединений в пуле ({self.maxconn})"
+                        )
+                    self.released.wait(remaining)
+
+    def putconn(self, conn=None, key=None, close=False):
+        super().putconn(conn, key, close)
+        with self.released:
+            self.released.notify()
+
+
+def current_pools():
+    pid = os.getpid()
+    with _pools_lock:
+        return {
+            alias: pool
+            for (owner, alias), pool in _pools.items()
+            if owner == pid
+        }
+
+
+def close_pools():
+    """
+    Закрывает пулы текущего процесса. Вызывается в главном процессе
+    gunicorn перед запуском воркеров: соединения, открытые при прогреве,
+    не должны достаться воркерам по наследству.
+    """
+    pid = os.getpid()
+    with _pools_lock:
+        for key in [key for key in _pools if key[0] == pid]:
+            _pools.pop(key).closeall()
+
+
+def pool_stats():
+    """
+    Заполненность пулов этого процесса: занято, свободно, максимум.
+    """
+    return {
+        alias: {
+            "in_use": len(pool._used),
+            "idle": len(pool._pool),
+            "max": pool.maxconn,
+        }
+        for alias, pool in current_pools().items()
+    }
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL с пулом соединений внутри процесса для воркеров с потоками:
+    вместо нового соединения берётся свободное из пула, а close()
+    возвращает его обратно (незавершённая транзакция откатывается).
+    Размер задаётся OPTIONS["POOL_MIN"] и OPTIONS["POOL_MAX"], ожидание
+    свободного соединения — OPTIONS["POOL_TIMEOUT"] секунд.
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for option in ("POOL_MIN", "POOL_MAX", "POOL_TIMEOUT"):
+            params.pop(option, None)
+        return params
+
+    def get_pool(self, conn_params):
+        options = self.settings_dict["OPTIONS"]
+        key = (os.getpid(), self.alias)
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                pool = _pools[key] = BlockingConnectionPool(
+                    options.get("POOL_MIN", 1),
+                    options.get("POOL_MAX", 10),
+                    options.get("POOL_TIMEOUT", 10),
+                    **conn_params,
+                )
+        return pool
+
+    def get_new_connection(self, conn_params):
+        pool = self.get_pool(conn_params)
+        connection = pool.getconn()
+        while connection.closed:
+            # сервер закрыл соединение, пока оно лежало в пуле
+            pool.putconn(connection, close=True)
+            connection = pool.getconn()
+        self.isolation_level = connection.isolation_level
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        pool = current_pools().get(self.alias)
+        with self.wrap_database_errors:
+            if pool is None:
+                return self.connection.close()
+            pool.putconn(self.connection, close=bool(self.connection.closed))
@@ -0,0 +1,359 @@
+import hashlib
+import heapq
+import itertools
+import math
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_max_age, patch_vary_headers
+
+from .routers import replica_databases, replica_reads
+from .staticfiles import accepted_encodings
+
+try:
+    import brotli
+except ImportError:  # без brotli ответы сжимаются только gzip
+    brotli = None
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+STICKY_COOKIE = getattr(settings, "REPLICA_STICKY_COOKIE", "use_primary")
+STICKY_SECONDS = getattr(settings, "REPLICA_STICKY_SECONDS", 10)
+
+
+class ReplicaMiddleware:
+    """
+    Безопасные запросы читают данные с реплик. Клиент, который только что
+    что-то записал, на REPLICA_STICKY_SECONDS закрепляется за основной базой
+    (через cookie), чтобы после редиректа с new_post или add_comment увидеть
+    свои изменения, даже если реплика ещё отстаёт.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_databases():
+            return self.get_response(request)
+        if request.method in SAFE_METHODS and (
+            STICKY_COOKIE not in request.COOKIES
+        ):
+            with replica_reads() as state:
+                response = self.get_response(request)
+            wrote = state.wrote
+        else:
+            response = self.get_response(request)
+            wrote = request.method not in SAFE_METHODS
+        if wrote:
+            response.set_cookie(
+                STICKY_COOKIE,
+                "1",
+                max_age=STICKY_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+class AdmissionController:
+    """
+    Ограничивает число одновременно обрабатываемых запросов в процессе.
+    Лишние запросы ждут в ограниченной очереди; освободившееся место
+    достаётся ожидающему с наименьшим номером приоритета. Если очередь
+    заполнена или ожидание превысит бюджет, запрос сразу отклоняется.
+    """
+
+    def __init__(self, concurrency, queue_size, wait_budget):
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.wait_budget = wait_budget
+        self.active = 0
+        self.waiting = []
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+        # скользящее среднее времени обработки запроса, секунды
+        self.service_time = 0.05
+
+    def expected_wait(self, priority):
+        ahead = sum(1 for waiter in self.waiting if waiter[0] <= priority)
+        return (ahead + 1) * self.service_time / self.concurrency
+
+    def acquire(self, priority):
+        """
+        Возвращает None, если запрос допущен, или рекомендуемую паузу
+        в секундах для заголовка Retry-After.
+        """
+        with self.lock:
+            if self.active < self.concurrency and not self.waiting:
+                self.active += 1
+                return None
+            expected = self.expected_wait(priority)
+            if len(self.waiting) >= self.queue_size or (
+                expected > self.wait_budget
+            ):
+                return expected
+            waiter = (priority, next(self.counter), threading.Event())
+            heapq.heappush(self.waiting, waiter)
+        if waiter[2].wait(self.wait_budget):
+            return None
+        with self.lock:
+            # место могли передать одновременно с истечением ожидания
+            if waiter[2].is_set():
+                return None
+            self.waiting.remove(waiter)
+            heapq.heapify(self.waiting)
+            return self.expected_wait(priority)
+
+    def release(self, elapsed):
+        with self.lock:
+            self.service_time = 0.9 * self.service_time + 0.1 * elapsed
+            if self.waiting:
+                # место переходит ожидающему, active не меняется
+                heapq.heappop(self.waiting)[2].set()
+            else:
+                self.active -= 1
+
+
+class AdmissionControlMiddleware:
+    """
+    Сбрасывает нагрузку при всплесках трафика: вместо бесконечной очереди
+    в воркере запрос получает 503 с Retry-After. Первыми обслуживаются
+    дешёвые чтения, затем записи (например new_post с картинкой), затем API.
+    Анонимным читателям лент вместо отказа отдаётся последняя сохранённая
+    копия страницы.
+    """
+
+    PRIORITIES = {"read": 0, "write": 1, "api": 2}
+    FEED_PREFIXES = ("/group/",)
+    STALE_KEY = "admission:stale:{}"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        config = getattr(settings, "ADMISSION_CONTROL", {})
+        self.controller = AdmissionController(
+            concurrency=config.get("CONCURRENCY", 1),
+            queue_size=config.get("QUEUE_SIZE", 32),
+            wait_budget=config.get("WAIT_BUDGET", 2.0),
+        )
+        self.stale_timeout = config.get("STALE_TIMEOUT", 60 * 60)
+        self.stale_refresh = config.get("STALE_REFRESH", 10)
+        self.stale_entries = config.get("STALE_ENTRIES", 1000)
+        # когда копия страницы сохранялась последний раз, не больше
+        # stale_entries последних страниц
+        self.stale_saved = OrderedDict()
+        self.stale_lock = threading.Lock()
+
+    def route_class(self, request):
+        if request.path.startswith("/api/"):
+            return "api"
+        if request.method in SAFE_METHODS:
+            return "read"
+        return "write"
+
+    def is_anonymous_feed(self, request):
+        # сессию не загружаем: анонимом считаем клиента без cookie сессии;
+        # из параметров копия зависит только от номера страницы
+        return (
+            request.method == "GET"
+            and settings.SESSION_COOKIE_NAME not in request.COOKIES
+            and request.GET.get("page", "1").isdigit()
+            and (
+                request.path == "/"
+                or request.path.startswith(self.FEED_PREFIXES)
+            )
+        )
+
+    def __call__(self, request):
+        retry_after = self.controller.acquire(
+            self.PRIORITIES[self.route_class(request)]
+        )
+        feed = self.is_anonymous_feed(request)
+        if retry_after is not None:
+            stale = feed and cache.get(self.stale_key(request))
+            if stale:
+                content, content_type = stale
+                response = HttpResponse(content, content_type=content_type)
+                response["Warning"] = '110 - "Response is Stale"'
+                return response
+            response = HttpResponse(
+                "Сервер перегружен, попробуйте позже.",
+                status=503,
+                content_type="text/plain; charset=utf-8",
+            )
+            response["Retry-After"] = max(1, math.ceil(retry_after))
+            return response
+        started = time.monotonic()
+        try:
+            response = self.get_response(request)
+        finally:
+            self.controller.release(time.monotonic() - started)
+        if feed and response.status_code == 200:
+            self.save_stale(request, response)
+        return response
+
+    def stale_key(self, request):
+        page = f"{request.path}?page={request.GET.get('page', '1')}"
+        return self.STALE_KEY.format(hashlib.md5(page.encode()).hexdigest())
+
+    def save_stale(self, request, response):
+        if response.streaming:
+            return
+        key = self.stale_key(request)
+        now = time.monotonic()
+        with self.stale_lock:
+            if now - self.stale_saved.get(key, 0) < self.stale_refresh:
+                return
+            self.stale_saved[key] = now
+            self.stale_saved.move_to_end(key)
+            if len(self.stale_saved) > self.stale_entries:
+                self.stale_saved.popitem(last=False)
+        cache.set(
+            key,
+            (response.content, response["Content-Type"]),
+            self.stale_timeout,
+        )
+
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "application/x-ndjson",
+    "image/svg+xml",
+)
+COMPRESSED_KEY = "compressed:{}:{}:{}"
+
+
+class Compressor:
+    """
+    Потоковый компрессор gzip или brotli с единым интерфейсом.
+    """
+
+    def __init__(self, encoding, level):
+        if encoding == "br":
+            self.compressor = brotli.Compressor(quality=level)
+            self.compress = self.compressor.process
+            self.flush = self.compressor.flush
+            self.finish = self.compressor.finish
+        else:
+            self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+            self.compress = self.compressor.compress
+            self.flush = lambda: self.compressor.flush(zlib.Z_SYNC_FLUSH)
+            self.finish = self.compressor.flush
+
+
+def compress_bytes(data, encoding, level):
+    compressor = Compressor(encoding, level)
+    return compressor.compress(data) + compressor.finish()
+
+
+def compress_stream(chunks, encoding, level):
+    # каждый кусок сбрасывается сразу, иначе события SSE и начало
+    # выгрузки застрянут в буфере компрессора
+    compressor = Compressor(encoding, level)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware:
+    """
+    Сжимает HTML, JSON и другие текстовые ответы brotli или gzip по
+    Accept-Encoding. Маленькие и уже сжатые ответы не трогает, потоковые
+    сжимает по кускам. Уровень сжатия снижается, когда средняя загрузка
+    процессора приближается к числу ядер. Сжатые байты ответов с max-age
+    кешируются по хешу содержимого, так что страница из cache_page
+    сжимается один раз за время жизни кеша.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        config = getattr(settings, "COMPRESSION", {})
+        self.min_size = config.get("MIN_SIZE", 1024)
+        self.levels = config.get(
+            "LEVELS", {"br": (5, 3, 1), "gzip": (6, 4, 1)}
+        )
+        self.busy = config.get("BUSY_LOAD", 0.7)
+        self.overloaded = config.get("OVERLOADED_LOAD", 1.0)
+        self.pressure = 0.0
+        self.pressure_checked = 0.0
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        encoding = self.choose_encoding(request, response)
+        if encoding is None:
+            return response
+        level = self.level(encoding)
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                response.streaming_content, encoding, level
+            )
+            if response.has_header("Content-Length"):
+                del response["Content-Length"]
+        else:
+            compressed = self.compress_content(response, encoding, level)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response["Content-Length"] = str(len(compressed))
+        patch_vary_headers(response, ("Accept-Encoding",))
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            # сжатое тело отличается побайтно, сильный ETag неверен
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = encoding
+        return response
+
+    def choose_encoding(self, request, response):
+        if response.has_header("Content-Encoding"):
+            return None
+        content_type = response.get("Content-Type", "")
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return None
+        if not response.streaming and len(response.content) < self.min_size:
+            return None
+        accepted = accepted_encodings(
+            request.META.get("HTTP_ACCEPT_ENCODING", "")
+        )
+        if brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    def level(self, encoding):
+        now = time.monotonic()
+        if now - self.pressure_checked > 1:
+            try:
+                load = os.getloadavg()[0]
+            except OSError:
+                load = 0.0
+            self.pressure = load / (os.cpu_count() or 1)
+            self.pressure_checked = now
+        idle, busy, overloaded = self.levels[encoding]
+        if self.pressure >= self.overloaded:
+            return overloaded
+        if self.pressure >= self.busy:
+            return busy
+        return idle
+
+    def compress_content(self, response, encoding, level):
+        max_age = get_max_age(response)
+        if not max_age:
+            return compress_bytes(response.content, encoding, level)
+        digest = hashlib.md5(response.content).hexdigest()
+        key = COMPRESSED_KEY.format(encoding, level, digest)
+        compressed = cache.get(key)
+        if compressed is None:
+            compressed = compress_bytes(response.content, encoding, level)
+            cache.set(key, compressed, max_age)
+        return compressed
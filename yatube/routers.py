@@ -0,0 +1,54 @@
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+PRIMARY_DATABASE = "default"
+
+_state = threading.local()
+
+
+def replica_databases():
+    return getattr(settings, "REPLICA_DATABASES", [])
+
+
+@contextmanager
+def replica_reads():
+    """
+    Внутри блока чтение идёт с реплик, пока в нём не случится запись:
+    после неё все чтения до конца блока возвращаются на основную базу.
+    """
+    _state.replica, _state.wrote = True, False
+    try:
+        yield _state
+    finally:
+        _state.replica = False
+
+
+class ReplicaRouter:
+    """
+    Направляет чтение на случайную реплику из REPLICA_DATABASES, а запись —
+    на основную базу. Вне replica_reads() всё идёт на основную базу, поэтому
+    команды manage.py и фоновые задачи видят свежие данные.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = replica_databases()
+        if not replicas or not getattr(_state, "replica", False):
+            return PRIMARY_DATABASE
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        if getattr(_state, "replica", False):
+            _state.replica, _state.wrote = False, True
+        return PRIMARY_DATABASE
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY_DATABASE, *replica_databases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return None
@@ -0,0 +1,31 @@
+import logging
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+logger = logging.getLogger(__name__)
+
+
+def init_sentry(required=False):
+    """
+    Подключает Sentry, если задан SENTRY_DSN. Вызывается долгоживущими
+    процессами (wsgi.py, run_tasks); импорт sentry_sdk и интеграций
+    происходит только здесь. Для долгоживущего процесса (required) без
+    SENTRY_DSN пишется предупреждение, а при SENTRY_REQUIRED процесс не
+    запускается.
+    """
+    if not settings.SENTRY_DSN:
+        if required and settings.SENTRY_REQUIRED:
+            raise ImproperlyConfigured(
+                "Не задан SENTRY_DSN, а SENTRY_REQUIRED включён"
+            )
+        if required:
+            logger.warning("SENTRY_DSN не задан, ошибки не попадут в Sentry")
+        return False
+    import sentry_sdk
+    from sentry_sdk.integrations.django import DjangoIntegration
+
+    sentry_sdk.init(
+        dsn=settings.SENTRY_DSN, integrations=[DjangoIntegration()]
+    )
+    return True
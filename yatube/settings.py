@@ -16,15 +16,12 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 import environ
 env = environ.Env()
 environ.Env.read_env()
-import sentry_sdk
-from sentry_sdk.integrations.django import DjangoIntegration
-
-# скопируйте dsn из вашего личного кабинета на Sentry:
-# Projects → <имя-проекта> → Client Keys
-sentry_sdk.init(
-    dsn="https://e29512106b7441f3916c4068445ef29d@o504260.ingest.sentry.io/5590776",
-    integrations=[DjangoIntegration()],
-)
+
+# скопируйте dsn из вашего личного кабинета на Sentry
+# (Projects → <имя-проекта> → Client Keys) в переменную окружения
+# SENTRY_DSN. Sentry подключается в wsgi.py и run_tasks, а не здесь,
+# чтобы тесты и короткие команды manage.py не платили за его импорт
+SENTRY_DSN = env("SENTRY_DSN", default="")
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
@@ -36,6 +33,10 @@ SECRET_KEY = "@k$xqn6fr^ew@v2(8nmltkk00=gf&poqbc4ncl-a4rh=%%y2_*"
 #DEBUG = True
 DEBUG = False
 
+# без SENTRY_DSN wsgi.py и run_tasks пишут в лог предупреждение; с
+# SENTRY_REQUIRED=True (например, в production) они не запускаются
+SENTRY_REQUIRED = env.bool("SENTRY_REQUIRED", default=False)
+
 ALLOWED_HOSTS = [
     "localhost",
     "127.0.0.1",
@@ -60,11 +61,12 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "sorl.thumbnail",
-#    "debug_toolbar",
     "rest_framework",
     "rest_framework.authtoken",
     "django_filters",
     "api",
+    "tasks",
+    "yatube",
 ]
 
 # Идентификатор текущего сайта
@@ -72,15 +74,48 @@ SITE_ID = 1
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "yatube.middleware.CompressionMiddleware",
+    "yatube.middleware.AdmissionControlMiddleware",
+    "yatube.middleware.ReplicaMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
-    "debug_toolbar.middleware.DebugToolbarMiddleware",
 ]
 
+# панель отладки нужна только при разработке
+if DEBUG:
+    INSTALLED_APPS += ["debug_toolbar"]
+    MIDDLEWARE += ["debug_toolbar.middleware.DebugToolbarMiddleware"]
+
+# Сжатие ответов: не меньше MIN_SIZE байт; уровни (обычный, под
+# нагрузкой, при перегрузке) выбираются по отношению средней загрузки
+# к числу ядер: BUSY_LOAD и OVERLOADED_LOAD
+COMPRESSION = {
+    "MIN_SIZE": 1024,
+    "LEVELS": {"br": (5, 3, 1), "gzip": (6, 4, 1)},
+    "BUSY_LOAD": 0.7,
+    "OVERLOADED_LOAD": 1.0,
+}
+
+# Ограничение нагрузки на процесс: не больше CONCURRENCY запросов
+# одновременно и QUEUE_SIZE в очереди; запрос, которому пришлось бы ждать
+# дольше WAIT_BUDGET секунд, сразу получает 503. Очередь возникает только
+# у воркеров с потоками (GUNICORN_THREADS > 1): синхронный воркер и так
+# обрабатывает один запрос за раз, поэтому CONCURRENCY равно числу потоков.
+ADMISSION_CONTROL = {
+    "CONCURRENCY": env.int("GUNICORN_THREADS", default=1),
+    "QUEUE_SIZE": 32,
+    "WAIT_BUDGET": 2.0,
+    # сколько хранится и как часто обновляется копия ленты для анонимов
+    "STALE_TIMEOUT": 60 * 60,
+    "STALE_REFRESH": 10,
+    # для скольких страниц помнить время последнего сохранения копии
+    "STALE_ENTRIES": 1000,
+}
+
 ROOT_URLCONF = "yatube.urls"
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
@@ -117,6 +152,102 @@ DATABASES = {
     'default': env.db(), # описываем, где искать настройки доступа к базе
 }
 
+# Реплики только для чтения перечисляются через запятую, например
+# REPLICA_DATABASE_URLS=sqlite:///replica1.db,sqlite:///replica2.db
+# В тестах реплики смотрят на тестовую копию основной базы.
+REPLICA_DATABASES = []
+for number, url in enumerate(env.list("REPLICA_DATABASE_URLS", default=[])):
+    alias = f"replica_{number + 1}"
+    DATABASES[alias] = env.db_url_config(url)
+    DATABASES[alias]["TEST"] = {"MIRROR": "default"}
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ["yatube.routers.ReplicaRouter"]
+
+# Соединения с базой живут CONN_MAX_AGE секунд и переиспользуются между
+# запросами; раз в DB_HEALTH_CHECK_INTERVAL секунд соединение проверяется
+# перед запросом. DB_POOL_SIZE > 0 включает для PostgreSQL пул соединений
+# внутри процесса (для воркеров с потоками), тогда соединение
+# возвращается в пул после каждого запроса; если свободных нет, запрос
+# ждёт до DB_POOL_TIMEOUT секунд.
+CONN_MAX_AGE = env.int("CONN_MAX_AGE", default=60)
+DB_HEALTH_CHECK_INTERVAL = 10
+DB_POOL_SIZE = env.int("DB_POOL_SIZE", default=0)
+DB_POOL_TIMEOUT = env.int("DB_POOL_TIMEOUT", default=10)
+# ограничение времени одного запроса в PostgreSQL, мс (0 — без него)
+DB_STATEMENT_TIMEOUT = env.int("DB_STATEMENT_TIMEOUT", default=30000)
+# настройки каждого соединения с SQLite: WAL позволяет читать во время
+# записи, busy_timeout — ждать блокировку вместо ошибки
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+}
+
+for config in DATABASES.values():
+    config["CONN_MAX_AGE"] = CONN_MAX_AGE
+    if DB_POOL_SIZE and config["ENGINE"] == "django.db.backends.postgresql":
+        config["ENGINE"] = "yatube.db_pool"
+        config["CONN_MAX_AGE"] = 0
+        config.setdefault("OPTIONS", {}).update(
+            POOL_MAX=DB_POOL_SIZE, POOL_TIMEOUT=DB_POOL_TIMEOUT
+        )
+
+# сколько секунд после записи клиент читает только из основной базы
+REPLICA_STICKY_SECONDS = 10
+
+
+# Connecting caching backend
+# По умолчанию кеш живёт в памяти процесса: у каждого воркера он свой, и
+# сброс записи (смена пароля, правка страницы) виден только воркеру, где
+# он произошёл. В production задайте общий кеш, например
+# CACHE_URL=memcache://127.0.0.1:11211 или rediscache://127.0.0.1:6379/1
+# (нужен django-redis); без него записи, которые сбрасываются при
+# изменениях, хранятся лишь несколько секунд.
+CACHE_URL = env("CACHE_URL", default="locmemcache://")
+CACHES = {"default": env.cache_url_config(CACHE_URL)}
+SHARED_CACHE = CACHES["default"]["BACKEND"] not in (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+# Счётчики лимитов частоты запросов. По умолчанию — тот же общий кеш,
+# без него — отдельная область в памяти процесса (см. THROTTLE_RATES).
+CACHES["throttle"] = env.cache_url_config(
+    env(
+        "THROTTLE_CACHE_URL",
+        default=CACHE_URL if SHARED_CACHE else "locmemcache://throttle",
+    )
+)
+
+# Сессии читаются из кеша и записываются одновременно в кеш и в базу,
+# пользователь сессии тоже берётся из кеша. ModelBackend остаётся в
+# списке: сессии, созданные до появления CachedModelBackend, хранят его
+# путь и без него были бы сброшены.
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+
+AUTHENTICATION_BACKENDS = [
+    "users.backends.CachedModelBackend",
+    "django.contrib.auth.backends.ModelBackend",
+]
+
+# без общего кеша блокировка или смена пароля в другом воркере должна
+# вступать в силу почти сразу
+AUTH_USER_CACHE_TIMEOUT = 60 * 15 if SHARED_CACHE else 5
+
+# Статические страницы сбрасываются сменой версии в кеше; с кешем в
+# памяти процесса другие воркеры её не увидят, поэтому страница живёт
+# в кеше минуту, а не сутки
+FLATPAGE_CACHE_TIMEOUT = 60 * 60 * 24 if SHARED_CACHE else 60
+
+# Карточки постов сбрасываются так же, сменой версии в кеше
+POST_CARD_CACHE_TIMEOUT = 60 * 60 if SHARED_CACHE else 10
+
+# Имя и поля автора сбрасываются из кеша при переименовании только в том
+# воркере, где оно произошло, отсутствие имени запоминается на время
+# USERNAME_MISSING_TTL
+AUTHOR_CACHE_TIMEOUT = 60 * 60 if SHARED_CACHE else 60
+USERNAME_MISSING_TTL = 60 if SHARED_CACHE else 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -150,11 +281,6 @@ USE_L10N = True
 
 USE_TZ = True
 
-# Connecting caching backend
-CACHES = {
-    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache",}
-}
-
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
@@ -165,6 +291,10 @@ STATIC_URL = "/static/"
 # задаём адрес директории, куда командой *collectstatic* будет собрана вся статика
 STATIC_ROOT = os.path.join(BASE_DIR, "static")
 
+# имена с хешем содержимого и заранее сжатые .gz/.br варианты;
+# собирается командой build_static
+STATICFILES_STORAGE = "yatube.storage.CompressedManifestStaticFilesStorage"
+
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
@@ -177,16 +307,95 @@ LOGIN_REDIRECT_URL = "index"
 # ользователя на главную страницу после того, как он разлогинится.
 
 
-EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
+# Фоновые задачи (manage.py run_tasks): задержка перед повторной попыткой
+# удваивается от TASKS_RETRY_DELAY до TASKS_MAX_RETRY_DELAY секунд
+TASKS_RETRY_DELAY = 10
+TASKS_MAX_RETRY_DELAY = 60 * 60
+TASKS_LEASE_SECONDS = 60 * 15
+
+# посты старше POST_ARCHIVE_AFTER_DAYS дней раз в сутки переносятся в
+# архивные таблицы (команда archive_posts делает то же вручную)
+POST_ARCHIVE_AFTER_DAYS = 365 * 2
+POST_ARCHIVE_BATCH_SIZE = 500
+
+# Популярное: просмотры и комментарии копятся в памяти процесса и
+# сбрасываются в почасовые счётчики (а просмотры ещё и в Post.views), когда
+# набралось FLUSH_SIZE ключей или прошло FLUSH_INTERVAL секунд; в воркерах
+# сброс по таймеру делает фоновый поток. Раз в REFRESH секунд задача
+# считает оценки за WINDOW_HOURS часов (вклад часа убывает вдвое за
+# HALF_LIFE_HOURS) и сохраняет SIZE лучших постов и групп.
+TRENDING = {
+    "FLUSH_SIZE": 500,
+    "FLUSH_INTERVAL": 30,
+    "WINDOW_HOURS": 48,
+    "HALF_LIFE_HOURS": 6,
+    "WEIGHTS": {"view": 1, "comment": 5},
+    "SIZE": 50,
+    "REFRESH": 60 * 10,
+}
+
+# «Кого почитать»: авторы из подписок подписок (вес FOLLOW_WEIGHT за
+# каждый путь) и из общих групп (GROUP_WEIGHT за группу), SIZE лучших на
+# пользователя. Раз в REFRESH секунд пересчитываются только пользователи,
+# которых касаются новые подписки, раз в REBUILD — все, пачками по
+# CHUNK_SIZE.
+RECOMMENDATIONS = {
+    "SIZE": 10,
+    "CHUNK_SIZE": 500,
+    "FOLLOW_WEIGHT": 1.0,
+    "GROUP_WEIGHT": 0.5,
+    "REFRESH": 60 * 60,
+    "REBUILD": 60 * 60 * 24,
+}
+
+
+# Письма складываются в локальную очередь, а доставляет их отдельный процесс
+# manage.py send_spooled_mail через EMAIL_DELIVERY_BACKEND
+EMAIL_BACKEND = "users.mail.SpoolEmailBackend"
+
+EMAIL_DELIVERY_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
+EMAIL_SPOOL_DIR = os.path.join(BASE_DIR, "mail_spool")
+EMAIL_SPOOL_BATCH_SIZE = 50
+# писем в секунду
+EMAIL_SPOOL_RATE = 10
+EMAIL_SPOOL_MAX_ATTEMPTS = 5
+# секунд до второй попытки, дальше задержка удваивается
+EMAIL_SPOOL_RETRY_DELAY = 60
+
+# Лимиты частоты запросов (скользящее окно в кеше "throttle"). Используются
+# и API, и HTML-формами new_post и add_comment. Без общего кеша счётчики
+# у каждого воркера свои: фактический лимит — значение ниже, умноженное
+# на число воркеров, а перезапуск процесса обнуляет счётчики.
+THROTTLE_RATES = {
+    "user": "600/min",
+    "token": "600/min",
+    "ip": "1200/min",
+    "login": "20/min",
+    "write": "60/min",
+    "post_create": "30/min",
+    "comment_create": "60/min",
+}
+
+# сколько секунд хранится ответ API для неавторизованных клиентов; без
+# общего кеша сброс после изменений виден только своему воркеру
+API_ANONYMOUS_CACHE_TIMEOUT = 60 * 5 if SHARED_CACHE else 5
+
 REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedJWTAuthentication",
+        "api.authentication.CachedTokenAuthentication",
+    ],
+    "DEFAULT_THROTTLE_CLASSES": [
+        "api.throttling.UserThrottle",
+        "api.throttling.TokenThrottle",
+        "api.throttling.IPThrottle",
+        "api.throttling.WriteThrottle",
     ],
+    "DEFAULT_THROTTLE_RATES": THROTTLE_RATES,
 }
@@ -0,0 +1,113 @@
+import mimetypes
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import unquote
+
+from django.conf import settings
+
+# имя вида bootstrap.min.3a1f9c0b2d4e.css — такой файл никогда не меняется
+HASHED_NAME = re.compile(r"\.[0-9a-f]{12}\.[^./]+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, max-age=60"
+# расширение варианта, значение Content-Encoding; в порядке предпочтения
+ENCODINGS = ((".br", "br"), (".gz", "gzip"))
+BLOCK_SIZE = 64 * 1024
+
+
+def accepted_encodings(header):
+    """
+    Кодировки из Accept-Encoding, которые клиент не запретил через q=0.
+    """
+    accepted = set()
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        params = params.replace(" ", "")
+        if coding and params not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(coding.lower())
+    return accepted
+
+
+def read_blocks(static_file):
+    with static_file:
+        yield from iter(lambda: static_file.read(BLOCK_SIZE), b"")
+
+
+class StaticFilesApplication:
+    """
+    WSGI-обёртка, которая отдаёт файлы из STATIC_ROOT, не доходя до
+    Django. Если клиент принимает br или gzip и рядом лежит заранее
+    сжатый вариант, отдаётся он. Файлы с хешем в имени кешируются
+    навсегда, остальные — ненадолго с проверкой по Last-Modified.
+    Тело передаётся через wsgi.file_wrapper, чтобы сервер мог
+    использовать sendfile.
+    """
+
+    def __init__(self, application, root=None, prefix=None):
+        self.application = application
+        self.root = os.path.realpath(root or settings.STATIC_ROOT)
+        self.prefix = prefix or settings.STATIC_URL
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "")
+        if environ["REQUEST_METHOD"] not in ("GET", "HEAD") or (
+            not path.startswith(self.prefix)
+        ):
+            return self.application(environ, start_response)
+        filename = self.resolve(path[len(self.prefix) :])
+        if filename is None:
+            return self.application(environ, start_response)
+        return self.serve(filename, environ, start_response)
+
+    def resolve(self, name):
+        filename = os.path.realpath(os.path.join(self.root, unquote(name)))
+        if not filename.startswith(self.root + os.sep):
+            return None
+        if not os.path.isfile(filename):
+            return None
+        return filename
+
+    def serve(self, filename, environ, start_response):
+        content_type, _ = mimetypes.guess_type(filename)
+        headers = [
+            ("Content-Type", content_type or "application/octet-stream"),
+            ("Vary", "Accept-Encoding"),
+        ]
+        if HASHED_NAME.search(filename):
+            headers.append(("Cache-Control", IMMUTABLE))
+        else:
+            headers.append(("Cache-Control", REVALIDATE))
+
+        accepted = accepted_encodings(environ.get("HTTP_ACCEPT_ENCODING", ""))
+        for suffix, encoding in ENCODINGS:
+            if encoding in accepted and os.path.isfile(filename + suffix):
+                filename += suffix
+                headers.append(("Content-Encoding", encoding))
+                break
+
+        stat = os.stat(filename)
+        modified = formatdate(stat.st_mtime, usegmt=True)
+        headers.append(("Last-Modified", modified))
+        if self.not_modified(environ, stat.st_mtime):
+            start_response("304 Not Modified", headers)
+            return []
+        headers.append(("Content-Length", str(stat.st_size)))
+        start_response("200 OK", headers)
+        if environ["REQUEST_METHOD"] == "HEAD":
+            return []
+        static_file = open(filename, "rb")
+        file_wrapper = environ.get("wsgi.file_wrapper")
+        if file_wrapper is not None:
+            return file_wrapper(static_file, BLOCK_SIZE)
+        return read_blocks(static_file)
+
+    @staticmethod
+    def not_modified(environ, mtime):
+        header = environ.get("HTTP_IF_MODIFIED_SINCE")
+        if not header:
+            return False
+        try:
+            since = parsedate_to_datetime(header).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since
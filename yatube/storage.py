@@ -0,0 +1,77 @@
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # brotli необязателен, без него будет только gzip
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (
+    ".css",
+    ".js",
+    ".json",
+    ".map",
+    ".svg",
+    ".txt",
+    ".xml",
+    ".html",
+    ".ico",
+    ".ttf",
+    ".eot",
+)
+# файлы меньше этого размера помещаются в один пакет и без сжатия
+MIN_COMPRESS_SIZE = 1024
+
+
+def compress_file(path):
+    """
+    Кладёт рядом с файлом path.gz и (если установлен brotli) path.br.
+    Вариант сохраняется, только если он действительно меньше оригинала.
+    Возвращает список созданных файлов.
+    """
+    with open(path, "rb") as source:
+        data = source.read()
+    if len(data) < MIN_COMPRESS_SIZE:
+        return []
+    variants = [(".gz", lambda: gzip.compress(data, 9, mtime=0))]
+    if brotli is not None:
+        variants.append((".br", lambda: brotli.compress(data, quality=11)))
+    created = []
+    for suffix, compress in variants:
+        compressed = compress()
+        if len(compressed) >= len(data):
+            continue
+        tmp_path = f"{path}{suffix}.tmp"
+        with open(tmp_path, "wb") as target:
+            target.write(compressed)
+        os.replace(tmp_path, path + suffix)
+        created.append(path + suffix)
+    return created
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Статика с хешем содержимого в имени файла (можно кешировать навсегда)
+    и заранее сжатыми вариантами .gz и .br для yatube.staticfiles.
+
+    Если статика не собрана или файла нет в манифесте, {% static %}
+    отдаёт исходное имя, а не падает: так работают тесты и свежий
+    checkout без build_static.
+    """
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS) and self.exists(name):
+                compress_file(self.path(name))
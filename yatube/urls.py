@@ -16,11 +16,13 @@ Including another URLconf
 
 from django.contrib import admin
 from django.urls import path, include
-from django.contrib.flatpages import views
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views.generic import TemplateView
 
+from posts.flatpages import cached_flatpage
+from posts.views import db_stats, export_data
+
 handler404 = "posts.views.page_not_found"  # noqa
 handler500 = "posts.views.server_error"  # noqa
 
@@ -28,33 +30,40 @@ handler500 = "posts.views.server_error"  # noqa
 urlpatterns = [
     path("auth/", include("users.urls")),
     path("auth/", include("django.contrib.auth.urls")),
+    path("admin/export/", export_data, name="export_data"),
+    path("admin/db-stats/", db_stats, name="db_stats"),
     path("admin/", admin.site.urls),
     path("api/", include("api.urls")),
     path(
         "redoc/",
         TemplateView.as_view(template_name="redoc.html"),
         name="redoc"),
-    path("", include("posts.urls")),
-    path("about/", include("django.contrib.flatpages.urls")),
 ]
 
+# статические страницы подключаются раньше posts.urls, иначе их адреса
+# перехватывает шаблон профиля <str:username>/
 urlpatterns += [
-    path("about-us/", views.flatpage, {"url": "/about-us/"}, name="about"),
-    path("terms/", views.flatpage, {"url": "/terms/"}, name="terms"),
+    path("about-us/", cached_flatpage, {"url": "/about-us/"}, name="about"),
+    path("terms/", cached_flatpage, {"url": "/terms/"}, name="terms"),
     path(
         "about-author/",
-        views.flatpage,
+        cached_flatpage,
         {"url": "/about-author/"},
         name="about-author",
     ),
     path(
         "about-spec/",
-        views.flatpage,
+        cached_flatpage,
         {"url": "/about-spec/"},
         name="about-spec",
     ),
 ]
 
+urlpatterns += [
+    path("", include("posts.urls")),
+    path("about/", include("django.contrib.flatpages.urls")),
+]
+
 
 if settings.DEBUG:
     urlpatterns += static(
@@ -0,0 +1,125 @@
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.contrib.auth.password_validation import (
+    get_default_password_validators,
+)
+from django.db import DatabaseError, connections
+from django.template import engines
+from django.template.utils import get_app_template_dirs
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+
+def warm_urls():
+    # первое обращение к reverse_dict разбирает все шаблоны URL
+    resolver = get_resolver()
+    resolver.reverse_dict
+    return len(resolver.url_patterns)
+
+
+def project_template_dirs(engine):
+    # шаблоны проекта и его приложений; шаблоны админки и DRF
+    # компилируются по первому запросу, как и раньше
+    dirs = list(engine.dirs)
+    if engine.app_dirs:
+        dirs += [
+            path
+            for path in get_app_template_dirs("templates")
+            if path.startswith(settings.BASE_DIR)
+        ]
+    return dirs
+
+
+def warm_templates():
+    """
+    Компилирует шаблоны проекта. При DEBUG = False Django использует
+    кеширующий загрузчик, и скомпилированные шаблоны остаются в памяти.
+    """
+    count = 0
+    for engine in engines.all():
+        for directory in project_template_dirs(engine.engine):
+            for root, _, filenames in os.walk(directory):
+                for filename in filenames:
+                    if not filename.endswith(".html"):
+                        continue
+                    path = os.path.join(root, filename)
+                    engine.get_template(os.path.relpath(path, directory))
+                    count += 1
+    return count
+
+
+def warm_password_validators():
+    # CommonPasswordValidator читает и распаковывает список из 20 000
+    # паролей при создании
+    return len(get_default_password_validators())
+
+
+def warm_database():
+    """
+    Загружает драйвер и проверяет доступность баз. Соединения сразу
+    закрываются: открытый сокет нельзя делить между процессами после fork.
+    """
+    available = 0
+    for connection in connections.all():
+        try:
+            connection.ensure_connection()
+        except DatabaseError:
+            logger.warning("База %s недоступна при прогреве", connection.alias)
+        else:
+            available += 1
+    connections.close_all()
+    return available
+
+
+def warm_flatpages():
+    from posts.flatpages import warm_flatpages
+
+    warm_flatpages()
+
+
+def warm_username_filter():
+    from posts.usernames import get_username_filter
+
+    return get_username_filter() is not None
+
+
+STEPS = (
+    ("urls", warm_urls),
+    ("templates", warm_templates),
+    ("password validators", warm_password_validators),
+    ("database", warm_database),
+    ("flatpages", warm_flatpages),
+    ("username filter", warm_username_filter),
+)
+
+
+def warm_up():
+    """
+    Выполняет то, что иначе досталось бы первым запросам каждого воркера.
+    Возвращает отчёт: список (шаг, секунды, результат). Ошибка одного шага
+    не мешает остальным и не ломает запуск.
+    """
+    report = []
+    for name, step in STEPS:
+        started = time.perf_counter()
+        try:
+            result = step()
+        except Exception as error:
+            logger.exception("Прогрев %s не удался", name)
+            result = error
+        report.append((name, time.perf_counter() - started, result))
+    return report
+
+
+def format_report(report):
+    lines = [
+        f"{name:<20} {seconds * 1000:8.1f} мс  {result}"
+        for name, seconds, result in report
+    ]
+    total = sum(seconds for _, seconds, _ in report)
+    lines.append(f"{'всего':<20} {total * 1000:8.1f} мс")
+    return "\n".join(lines)
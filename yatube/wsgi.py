@@ -13,4 +13,27 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "yatube.settings")
 
+from yatube.sentry import init_sentry  # noqa: E402
+
+init_sentry(required=True)
 application = get_wsgi_application()
+
+# статика из STATIC_ROOT отдаётся до Django, со сжатыми вариантами
+from yatube.staticfiles import StaticFilesApplication  # noqa: E402
+
+application = StaticFilesApplication(application)
+
+# прогреваем то, что иначе досталось бы первым запросам: URL, шаблоны,
+# валидаторы паролей, соединение с базой, статические страницы и фильтр
+# имён пользователей (см. gunicorn.conf.py)
+from yatube.warmup import warm_up  # noqa: E402
+
+warmup_report = warm_up()
+
+# просмотры и счётчики активности копятся в памяти воркера; фоновый поток
+# сбрасывает их в базу по таймеру, остаток записывается при выходе. Поток
+# запускается в воркере при первом приращении, а не здесь: с preload_app
+# этот код выполняется в главном процессе gunicorn
+from posts.activity import start_flushers  # noqa: E402
+
+start_flushers()